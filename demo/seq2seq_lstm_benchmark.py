@@ -0,0 +1,545 @@
+import asyncio
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import tensorflow.keras.backend as K
+from tensorflow.keras.losses import SparseCategoricalCrossentropy
+from tensorflow.keras.utils import OrderedEnqueuer
+
+try:
+    from seq2seq_lstm import Seq2SeqLSTM, Seq2SeqPredictor
+    from seq2seq_lstm.seq2seq_lstm import EncodedTexts, InferenceModelPool, TextPairCorpus, TextPairSequence
+    from seq2seq_lstm.serving import MicroBatcher
+    from seq2seq_lstm_demo import estimate, load_text_pairs
+except:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    sys.path.append(os.path.dirname(__file__))
+    from seq2seq_lstm import Seq2SeqLSTM, Seq2SeqPredictor
+    from seq2seq_lstm.seq2seq_lstm import EncodedTexts, InferenceModelPool, TextPairCorpus, TextPairSequence
+    from seq2seq_lstm.serving import MicroBatcher
+    from seq2seq_lstm_demo import estimate, load_text_pairs
+
+
+def load_or_fit_model(model_name, input_texts, target_texts):
+    """ Load the trained seq2seq model from the specified file or fit a small model if this file is not specified.
+
+    :param model_name: name of file containing the pickled `Seq2SeqLSTM` object (or None).
+    :param input_texts: input texts for training of the small model.
+    :param target_texts: target texts for training of the small model.
+
+    :return the trained `Seq2SeqLSTM` object.
+
+    """
+    if (model_name is not None) and os.path.isfile(model_name):
+        with open(model_name, 'rb') as fp:
+            seq2seq = pickle.load(fp)
+        assert isinstance(seq2seq, Seq2SeqLSTM), \
+            f'A sequence-to-sequence neural model cannot be loaded from file "{model_name}".'
+        return seq2seq
+    seq2seq = Seq2SeqLSTM(latent_dim=128, validation_split=None, epochs=10, lr=1e-2, lowercase=False, batch_size=64,
+                          random_state=42)
+    seq2seq.fit(input_texts, target_texts)
+    if model_name is not None:
+        with open(model_name, 'wb') as fp:
+            pickle.dump(seq2seq, fp)
+    return seq2seq
+
+
+def predict_by_keras_predict(seq2seq, input_texts):
+    """ Predict texts by the greedy decoding with a call of the Keras `Model.predict` at each output timestep.
+
+    It is the reference implementation of decoding, which was used in `Seq2SeqLSTM.predict` before the compiled
+    functions of encoder and decoder.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+
+    :return list of predicted texts.
+
+    """
+    texts = []
+    start_token_idx = seq2seq.target_token_index_['\t']
+    end_token_idx = seq2seq.target_token_index_['\n']
+    for batch_start in range(0, len(input_texts), seq2seq.batch_size):
+        batch_end = min(len(input_texts), batch_start + seq2seq.batch_size)
+        batch_size = batch_end - batch_start
+        input_seq = Seq2SeqLSTM.generate_data_for_prediction(
+            input_texts=input_texts, batch_start=batch_start, batch_end=batch_end,
+            max_encoder_seq_length=seq2seq.max_encoder_seq_length_, input_token_index=seq2seq.input_token_index_,
+            lowercase=seq2seq.lowercase, use_token_ids=(seq2seq.embedding_size is not None)
+        )
+        states_value = seq2seq.encoder_model_.predict(input_seq, verbose=0)
+        if seq2seq.embedding_size is None:
+            target_seq = np.zeros((batch_size, 1, len(seq2seq.target_token_index_)), dtype=np.float32)
+            target_seq[:, 0, start_token_idx] = 1.0
+        else:
+            target_seq = np.full((batch_size, 1), start_token_idx + 1, dtype=np.int32)
+        decoded_sentences = [[] for _ in range(batch_size)]
+        is_finished = np.zeros((batch_size,), dtype=bool)
+        while not np.all(is_finished):
+            output_tokens, h, c = seq2seq.decoder_model_.predict([target_seq] + states_value, verbose=0)
+            indices_of_sampled_tokens = np.argmax(output_tokens[:, -1, :], axis=1)
+            for text_idx in np.nonzero(np.logical_not(is_finished))[0]:
+                decoded_sentences[text_idx].append(seq2seq.reverse_target_char_index_[indices_of_sampled_tokens[text_idx]])
+                if (indices_of_sampled_tokens[text_idx] == end_token_idx) or \
+                        (len(decoded_sentences[text_idx]) > seq2seq.max_decoder_seq_length_):
+                    is_finished[text_idx] = True
+            if seq2seq.embedding_size is None:
+                target_seq[:, 0, :] = 0.0
+                target_seq[np.arange(batch_size), 0, indices_of_sampled_tokens] = 1.0
+            else:
+                target_seq[:, 0] = indices_of_sampled_tokens + 1
+            states_value = [h, c]
+        texts += [' '.join(cur) for cur in decoded_sentences]
+    return texts
+
+
+def generate_batch_by_tokenization(seq2seq, input_texts, target_texts, batch_start, batch_end):
+    """ Generate one-hot training data for a mini-batch with the tokenization of its texts.
+
+    It is the reference implementation of the mini-batch generation, which was used in `TextPairSequence` before the
+    pre-tokenized corpus (each text was tokenized and its tokens were looked up in the vocabulary at each epoch).
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts.
+    :param batch_start: index of the first text pair in the mini-batch.
+    :param batch_end: index of the text pair after the last one in the mini-batch.
+
+    :return the two-element tuple with input and output mini-batch data for the neural model training respectively.
+
+    """
+    batch_size = batch_end - batch_start
+    encoder_input_data = np.zeros((batch_size, seq2seq.max_encoder_seq_length_, len(seq2seq.input_token_index_)),
+                                  dtype=np.float32)
+    decoder_input_data = np.zeros((batch_size, seq2seq.max_decoder_seq_length_, len(seq2seq.target_token_index_)),
+                                  dtype=np.float32)
+    decoder_target_data = np.zeros((batch_size, seq2seq.max_decoder_seq_length_, len(seq2seq.target_token_index_)),
+                                   dtype=np.float32)
+    for idx_in_batch in range(batch_size):
+        input_tokens = Seq2SeqLSTM.tokenize_text(input_texts[batch_start + idx_in_batch], seq2seq.lowercase)
+        target_tokens = Seq2SeqLSTM.tokenize_text(target_texts[batch_start + idx_in_batch], seq2seq.lowercase)
+        for t, token in enumerate(input_tokens[0:seq2seq.max_encoder_seq_length_]):
+            if token in seq2seq.input_token_index_:
+                encoder_input_data[idx_in_batch, t, seq2seq.input_token_index_[token]] = 1.0
+        target_tokens = ['\t'] + [token for token in target_tokens if token in seq2seq.target_token_index_] + ['\n']
+        for t, token in enumerate(target_tokens[0:seq2seq.max_decoder_seq_length_]):
+            decoder_input_data[idx_in_batch, t, seq2seq.target_token_index_[token]] = 1.0
+            if t > 0:
+                decoder_target_data[idx_in_batch, t - 1, seq2seq.target_token_index_[token]] = 1.0
+    return [encoder_input_data, decoder_input_data], decoder_target_data
+
+
+def benchmark_corpus(seq2seq, input_texts, target_texts):
+    """ Compare the epoch time of mini-batch generation from raw texts against one from the pre-tokenized corpus.
+
+    Only the data pipeline is measured (without the neural model), because it is the part of each training epoch,
+    which depends on the corpus representation.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts.
+
+    """
+    n_epochs = 3
+    start_time = time.time()
+    for _ in range(n_epochs):
+        for batch_start in range(0, len(input_texts), seq2seq.batch_size):
+            generate_batch_by_tokenization(seq2seq, input_texts, target_texts, batch_start,
+                                           min(len(input_texts), batch_start + seq2seq.batch_size))
+    duration_1 = (time.time() - start_time) / n_epochs
+    start_time = time.time()
+    encoded_input_texts = EncodedTexts.encode(input_texts, seq2seq.input_token_index_, seq2seq.lowercase)
+    encoded_target_texts = EncodedTexts.encode(target_texts, seq2seq.target_token_index_, seq2seq.lowercase)
+    duration_of_encoding = time.time() - start_time
+    training_set_generator = TextPairSequence(
+        input_texts=encoded_input_texts, target_texts=encoded_target_texts, batch_size=seq2seq.batch_size,
+        max_encoder_seq_length=seq2seq.max_encoder_seq_length_, max_decoder_seq_length=seq2seq.max_decoder_seq_length_,
+        input_token_index=seq2seq.input_token_index_, target_token_index=seq2seq.target_token_index_,
+        lowercase=seq2seq.lowercase
+    )
+    start_time = time.time()
+    for _ in range(n_epochs):
+        for batch_idx in range(len(training_set_generator)):
+            training_set_generator[batch_idx]
+    duration_2 = (time.time() - start_time) / n_epochs
+    size_of_texts = sum([sys.getsizeof(cur) for cur in input_texts]) + sys.getsizeof(input_texts) + \
+        sum([sys.getsizeof(cur) for cur in target_texts]) + sys.getsizeof(target_texts)
+    size_of_corpus = encoded_input_texts.tokens.nbytes + encoded_input_texts.offsets.nbytes + \
+        encoded_target_texts.tokens.nbytes + encoded_target_texts.offsets.nbytes
+    print('')
+    print(f'{len(input_texts)} text pairs are split into mini-batches with the batch size {seq2seq.batch_size}.')
+    print('Epoch with the tokenization of raw texts: {0:.3f} sec.'.format(duration_1))
+    print('Epoch with the pre-tokenized corpus: {0:.3f} sec '
+          '(single encoding of the corpus takes {1:.3f} sec).'.format(duration_2, duration_of_encoding))
+    print('Speedup is {0:.2f}x.'.format(duration_1 / duration_2))
+    print(f'Raw texts take {size_of_texts} bytes, and the pre-tokenized corpus takes {size_of_corpus} bytes.')
+
+
+def benchmark_workers(seq2seq, input_texts, target_texts):
+    """ Measure the speed of mini-batch generation by different numbers of worker processes.
+
+    Encoded texts are placed in the shared memory, so the mini-batch generator is sent to worker processes without
+    copying of texts. The training set is repeated to make each epoch long enough for measurement.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts.
+
+    """
+    n_repeats = 10
+    n_epochs = 3
+    corpus = TextPairCorpus.create(input_texts * n_repeats, target_texts * n_repeats, seq2seq.lowercase)
+    shared_input_texts = corpus.input_texts.share()
+    shared_target_texts = corpus.target_texts.share()
+    try:
+        training_set_generator = TextPairSequence(
+            input_texts=shared_input_texts, target_texts=shared_target_texts, batch_size=seq2seq.batch_size,
+            max_encoder_seq_length=corpus.max_input_length, max_decoder_seq_length=corpus.max_target_length + 2,
+            input_token_index=dict([(char, i) for i, char in enumerate(corpus.input_vocabulary)]),
+            target_token_index=dict([(char, i) for i, char in enumerate(corpus.target_vocabulary)]),
+            lowercase=seq2seq.lowercase
+        )
+        print('')
+        print(f'{len(training_set_generator)} mini-batches with the batch size {seq2seq.batch_size} are generated '
+              f'at each epoch.')
+        duration_for_single_worker = None
+        for workers in [1, 2, 4, 8]:
+            enqueuer = OrderedEnqueuer(training_set_generator, use_multiprocessing=True, shuffle=True)
+            enqueuer.start(workers=workers, max_queue_size=2 * workers)
+            try:
+                output_generator = enqueuer.get()
+                next(output_generator)
+                start_time = time.time()
+                for _ in range(n_epochs * len(training_set_generator) - 1):
+                    next(output_generator)
+                duration = (time.time() - start_time) / n_epochs
+            finally:
+                enqueuer.stop()
+            if duration_for_single_worker is None:
+                duration_for_single_worker = duration
+            print('Number of worker processes is {0}: {1:.3f} sec per epoch, speedup is {2:.2f}x.'.format(
+                workers, duration, duration_for_single_worker / duration))
+    finally:
+        shared_input_texts.release()
+        shared_target_texts.release()
+
+
+def generate_target_texts(n_texts, vocabulary_size, random_state):
+    """ Generate synthetic target texts with the specified vocabulary size and the Zipf's distribution of tokens.
+
+    Each token of the vocabulary occurs in generated texts at least once, so the target vocabulary of the seq2seq model
+    has exactly the specified size.
+
+    :param n_texts: number of generated texts.
+    :param vocabulary_size: number of distinct tokens in generated texts.
+    :param random_state: the `numpy.random.RandomState` object.
+
+    :return list of generated texts.
+
+    """
+    text_length = max(8, (vocabulary_size + n_texts - 1) // n_texts)
+    token_indices = np.minimum(random_state.zipf(1.2, size=n_texts * text_length), vocabulary_size) - 1
+    token_indices[random_state.permutation(token_indices.shape[0])[0:vocabulary_size]] = np.arange(vocabulary_size)
+    return [' '.join([f'w{token_idx}' for token_idx in token_indices[pos:(pos + text_length)]])
+            for pos in range(0, token_indices.shape[0], text_length)]
+
+
+def benchmark_softmax(seq2seq, input_texts, target_texts):
+    """ Compare the training step time with the full softmax against one with the sampled softmax for some vocabularies.
+
+    Input texts are paired with synthetic target texts, whose vocabulary size is varied. The training model is built
+    by `Seq2SeqLSTM.build_neural_network` for each vocabulary size and each kind of the softmax, and only training
+    steps on prepared mini-batches are measured. The evaluation loss and the prediction always use the full softmax.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object (only its batch size and latent dimension are used).
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts (they are not used).
+
+    """
+    n_steps = 10
+    num_sampled = 64
+    random_state = np.random.RandomState(42)
+    print('')
+    print(f'Training steps with the batch size {seq2seq.batch_size} and {seq2seq.latent_dim} units in the LSTM layer.')
+    for vocabulary_size in [1000, 5000, 20000, 50000]:
+        corpus = TextPairCorpus.create(input_texts, generate_target_texts(len(input_texts), vocabulary_size,
+                                                                          random_state), lowercase=False)
+        durations = []
+        for sampled_softmax in [None, num_sampled]:
+            model = Seq2SeqLSTM(batch_size=seq2seq.batch_size, latent_dim=seq2seq.latent_dim, embedding_size=64,
+                                lowercase=False, sparse_targets=True, sampled_softmax=sampled_softmax,
+                                random_state=42)
+            model.input_token_index_ = dict([(char, i) for i, char in enumerate(corpus.input_vocabulary)])
+            model.target_token_index_ = dict([(char, i) for i, char in enumerate(corpus.target_vocabulary)])
+            target_token_frequencies = corpus.target_texts.count_tokens(len(model.target_token_index_))
+            target_token_frequencies[model.target_token_index_['\n']] += len(corpus)
+            training_set_generator = TextPairSequence(
+                input_texts=corpus.input_texts, target_texts=corpus.target_texts, batch_size=seq2seq.batch_size,
+                max_encoder_seq_length=corpus.max_input_length, max_decoder_seq_length=corpus.max_target_length + 2,
+                input_token_index=model.input_token_index_, target_token_index=model.target_token_index_,
+                lowercase=False, use_token_ids=True, sparse_targets=True,
+                targets_as_inputs=(sampled_softmax is not None)
+            )
+            K.clear_session()
+            neural_network, _, _ = model.build_neural_network(target_token_frequencies)
+            if sampled_softmax is None:
+                neural_network.compile(optimizer='adam', loss=SparseCategoricalCrossentropy(ignore_class=-1))
+            else:
+                neural_network.compile(optimizer='adam', loss=None)
+            batches = [training_set_generator[batch_idx % len(training_set_generator)]
+                       for batch_idx in range(n_steps + 1)]
+            neural_network.train_on_batch(*batches[0])
+            start_time = time.time()
+            for cur_batch in batches[1:]:
+                neural_network.train_on_batch(*cur_batch)
+            durations.append((time.time() - start_time) / n_steps)
+        print('Vocabulary size is {0}: full softmax {1:.4f} sec per step, sampled softmax ({2} negative tokens) '
+              '{3:.4f} sec per step, speedup is {4:.2f}x.'.format(len(corpus.target_vocabulary), durations[0],
+                                                                 num_sampled, durations[1],
+                                                                 durations[0] / durations[1]))
+
+
+def benchmark_loading(seq2seq, input_texts, target_texts):
+    """ Measure the loading of pickled models, which have the same architecture as the specified model.
+
+    The cold loading builds new inference models, and the warm loading takes inference models, which were released by
+    a deleted model, from the pool (see `InferenceModelPool`).
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts (they are used for checking of loaded models).
+    :param target_texts: list of target texts (they are not used).
+
+    """
+    n_models = 3
+    n_loads = 10
+    serialized = pickle.dumps(seq2seq)
+    predicted_texts = seq2seq.predict(input_texts[0:seq2seq.batch_size])
+    InferenceModelPool.clear()
+    loaded_models = []
+    start_time = time.time()
+    for _ in range(n_models):
+        loaded_models.append(pickle.loads(serialized))
+    duration_1 = (time.time() - start_time) / n_models
+    n_identical = sum([int(cur.predict(input_texts[0:seq2seq.batch_size]) == predicted_texts)
+                       for cur in loaded_models])
+    del loaded_models
+    start_time = time.time()
+    for _ in range(n_loads):
+        loaded_model = pickle.loads(serialized)
+        del loaded_model
+    duration_2 = (time.time() - start_time) / n_loads
+    print('')
+    print(f'The model with {seq2seq.latent_dim} units in the LSTM layer takes {len(serialized)} bytes.')
+    print('Cold loading of {0} models, which are alive simultaneously: {1:.4f} sec per model.'.format(n_models,
+                                                                                                    duration_1))
+    print('Warm loading with inference models from the pool: {0:.4f} sec per model.'.format(duration_2))
+    print('Speedup is {0:.2f}x.'.format(duration_1 / duration_2))
+    print(f'{n_identical} of {n_models} loaded models predict the same texts as the original model.')
+
+
+def benchmark_serving(seq2seq, input_texts, target_texts):
+    """ Compare the prediction of single-text requests one by one against the prediction with dynamic micro-batching.
+
+    All requests arrive simultaneously, so the micro-batcher groups them into batches of the model's batch size.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts (they are not used).
+
+    """
+    n_requests = min(len(input_texts), 8 * seq2seq.batch_size)
+    requests = input_texts[0:n_requests]
+    seq2seq.predict(requests[0:1])
+    start_time = time.time()
+    predicted_texts_1 = [seq2seq.predict([cur])[0] for cur in requests]
+    duration_1 = time.time() - start_time
+
+    async def serve_requests():
+        async with MicroBatcher(seq2seq, max_batch_size=seq2seq.batch_size, max_latency_ms=5.0) as batcher:
+            predicted_texts = await asyncio.gather(*[batcher.predict(cur) for cur in requests])
+            return list(predicted_texts), batcher.get_metrics()
+
+    start_time = time.time()
+    predicted_texts_2, metrics = asyncio.run(serve_requests())
+    duration_2 = time.time() - start_time
+    n_identical = sum([int(predicted_texts_1[idx] == predicted_texts_2[idx]) for idx in range(n_requests)])
+    print('')
+    print(f'{n_requests} single-text requests have been predicted.')
+    print('Prediction of requests one by one: {0:.3f} sec ({1:.1f} requests per sec).'.format(
+        duration_1, n_requests / duration_1))
+    print('Prediction with dynamic micro-batching: {0:.3f} sec ({1:.1f} requests per sec).'.format(
+        duration_2, n_requests / duration_2))
+    print('Speedup is {0:.2f}x.'.format(duration_1 / duration_2))
+    print('Metrics of the micro-batcher: {0}.'.format(
+        ', '.join([f'{name} = {value:.2f}' if isinstance(value, float) else f'{name} = {value}'
+                   for name, value in metrics.items()])))
+    print(f'{n_identical} of {n_requests} predicted texts are identical.')
+
+
+def benchmark_quantization(seq2seq, input_texts, target_texts):
+    """ Compare the quantized model with int8 weights against the float model by quality, latency and memory.
+
+    Quality of both models is estimated by the sentence, word and character correctness (see `estimate` in the demo).
+    The latency is measured for the prediction of single texts and for the prediction of all texts by mini-batches.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts, which are used for the estimation of quality.
+
+    """
+    n_single_texts = min(len(input_texts), 2 * seq2seq.batch_size)
+    quantized_seq2seq = seq2seq.quantize()
+    float_size = sum([cur.nbytes
+                      for cur in seq2seq.encoder_model_.get_weights() + seq2seq.decoder_model_.get_weights()])
+    quantized_size = quantized_seq2seq.inference_engine_.nbytes
+    results = []
+    for model in (seq2seq, quantized_seq2seq):
+        model.predict(input_texts[0:model.batch_size])
+        start_time = time.time()
+        for cur in input_texts[0:n_single_texts]:
+            model.predict([cur])
+        single_latency = (time.time() - start_time) / n_single_texts
+        start_time = time.time()
+        predicted_texts = model.predict(input_texts)
+        batch_duration = time.time() - start_time
+        results.append((predicted_texts, estimate(predicted_texts, target_texts), single_latency, batch_duration))
+    n_identical = sum([int(results[0][0][idx] == results[1][0][idx]) for idx in range(len(input_texts))])
+    print('')
+    print(f'{len(input_texts)} texts have been predicted with the batch size {seq2seq.batch_size}.')
+    for model_name, (_, (sentence_correct, word_correct, character_correct), single_latency, batch_duration) in \
+            zip(['Float model', 'Quantized model'], results):
+        print('{0}: sentence correct {1:.2%}, word correct {2:.2%}, character correct {3:.2%}, latency of a single '
+              'text {4:.4f} sec, {5:.3f} sec for all texts.'.format(model_name, sentence_correct, word_correct,
+                                                                     character_correct, single_latency, batch_duration))
+    print('Weights take {0} bytes in float32 and {1} bytes after the quantization ({2:.2f}x less).'.format(
+        float_size, quantized_size, float_size / quantized_size))
+    print(f'{n_identical} of {len(input_texts)} predicted texts are identical.')
+
+
+def measure_cold_start(model_name, texts_name, use_numpy):
+    """ Load the pickled model and predict texts in the new process, measuring its time and peak memory.
+
+    :param model_name: name of file containing the pickled `Seq2SeqLSTM` object.
+    :param texts_name: name of the JSON file with the list of input texts.
+    :param use_numpy: if True, then the model is loaded as `Seq2SeqPredictor`, else it is unpickled as `Seq2SeqLSTM`.
+
+    :return: 3-element tuple with the duration in seconds, the peak resident memory in kilobytes (it is read from
+    `/proc`, so the benchmark works on Linux only) and predicted texts.
+
+    """
+    if use_numpy:
+        loading_code = f'from seq2seq_lstm import Seq2SeqPredictor\n' \
+                       f'model = Seq2SeqPredictor.load_pickle({model_name!r})'
+    else:
+        loading_code = f'import pickle\nfrom seq2seq_lstm import Seq2SeqLSTM\n' \
+                       f'with open({model_name!r}, "rb") as fp:\n    model = pickle.load(fp)'
+    code = f'import json, sys, time\nstart_time = time.time()\nsys.path.insert(0, ' \
+           f'{os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")!r})\n{loading_code}\n' \
+           f'with open({texts_name!r}, "r") as fp:\n    predicted_texts = model.predict(json.load(fp))\n' \
+           f'duration = time.time() - start_time\nwith open("/proc/self/status", "r") as fp:\n' \
+           f'    peak_memory = int([cur for cur in fp if cur.startswith("VmHWM:")][0].split()[1])\n' \
+           f'print(json.dumps([duration, peak_memory, predicted_texts]))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL).stdout.decode('utf-8')
+    return tuple(json.loads(output.strip().split('\n')[-1]))
+
+
+def benchmark_numpy(seq2seq, input_texts, target_texts):
+    """ Compare the NumPy predictor without TensorFlow against `Seq2SeqLSTM` by the cold start, memory and latency.
+
+    The cold start is the time of a new process, which imports the package, loads the pickled model and predicts one
+    mini-batch of texts.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts (they are not used).
+
+    """
+    seq2seq.set_params(beam_size=1)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        model_name = os.path.join(temporary_dir, 'seq2seq_lstm.pkl')
+        texts_name = os.path.join(temporary_dir, 'input_texts.json')
+        with open(model_name, 'wb') as fp:
+            pickle.dump(seq2seq, fp)
+        with open(texts_name, 'w') as fp:
+            json.dump(input_texts[0:seq2seq.batch_size], fp)
+        cold_start_1 = measure_cold_start(model_name, texts_name, use_numpy=False)
+        cold_start_2 = measure_cold_start(model_name, texts_name, use_numpy=True)
+        predictor = Seq2SeqPredictor.load_pickle(model_name)
+    seq2seq.predict(input_texts[0:seq2seq.batch_size])
+    start_time = time.time()
+    predicted_texts_1 = seq2seq.predict(input_texts)
+    duration_1 = time.time() - start_time
+    start_time = time.time()
+    predicted_texts_2 = predictor.predict(input_texts)
+    duration_2 = time.time() - start_time
+    n_identical = sum([int(predicted_texts_1[idx] == predicted_texts_2[idx]) for idx in range(len(input_texts))])
+    print('')
+    print('Cold start with TensorFlow: {0:.3f} sec, peak memory {1:.1f} MB.'.format(cold_start_1[0],
+                                                                                   cold_start_1[1] / 1024.0))
+    print('Cold start with NumPy: {0:.3f} sec, peak memory {1:.1f} MB.'.format(cold_start_2[0],
+                                                                              cold_start_2[1] / 1024.0))
+    print('Speedup of the cold start is {0:.2f}x, memory is {1:.2f}x less.'.format(
+        cold_start_1[0] / cold_start_2[0], cold_start_1[1] / cold_start_2[1]))
+    print(f'{len(input_texts)} texts have been predicted with the batch size {seq2seq.batch_size}.')
+    print('Prediction with TensorFlow: {0:.3f} sec.'.format(duration_1))
+    print('Prediction with NumPy: {0:.3f} sec.'.format(duration_2))
+    print(f'{n_identical} of {len(input_texts)} predicted texts are identical.')
+    print('Texts of the cold start are {0}.'.format('identical' if cold_start_1[2] == cold_start_2[2] else 'different'))
+
+
+def benchmark_decoding(seq2seq, input_texts, target_texts):
+    """ Compare the decoding with the compiled single-step decoder against the decoding with `Model.predict`.
+
+    :param seq2seq: the trained `Seq2SeqLSTM` object.
+    :param input_texts: list of input texts.
+    :param target_texts: list of target texts (they are not used).
+
+    """
+    seq2seq.predict(input_texts[0:seq2seq.batch_size])
+    start_time = time.time()
+    predicted_texts_1 = predict_by_keras_predict(seq2seq, input_texts)
+    duration_1 = time.time() - start_time
+    start_time = time.time()
+    predicted_texts_2 = seq2seq.predict(input_texts)
+    duration_2 = time.time() - start_time
+    n_identical = sum([int(predicted_texts_1[idx] == predicted_texts_2[idx]) for idx in range(len(input_texts))])
+    print('')
+    print(f'{len(input_texts)} texts have been predicted with the batch size {seq2seq.batch_size}.')
+    print('Decoding with `Model.predict` at each timestep: {0:.3f} sec.'.format(duration_1))
+    print('Decoding with the compiled single-step decoder: {0:.3f} sec.'.format(duration_2))
+    print('Speedup is {0:.2f}x.'.format(duration_1 / duration_2))
+    print(f'{n_identical} of {len(input_texts)} predicted texts are identical.')
+
+
+def main():
+    benchmarks = {
+        'corpus': benchmark_corpus,
+        'decoding': benchmark_decoding,
+        'load': benchmark_loading,
+        'numpy': benchmark_numpy,
+        'quantization': benchmark_quantization,
+        'serving': benchmark_serving,
+        'softmax': benchmark_softmax,
+        'workers': benchmark_workers,
+    }
+    if (len(sys.argv) < 2) or (sys.argv[1] not in benchmarks):
+        print(f'Usage: python {os.path.basename(__file__)} {"|".join(sorted(benchmarks.keys()))} [model_file.pkl]')
+        sys.exit(1)
+    model_name = os.path.normpath(sys.argv[2].strip()) if len(sys.argv) > 2 else None
+    input_texts, target_texts = load_text_pairs(
+        os.path.join(os.path.dirname(__file__), '..', 'data', 'eng_rus_for_testing.txt')
+    )
+    seq2seq = load_or_fit_model(model_name, input_texts, target_texts)
+    benchmarks[sys.argv[1]](seq2seq, input_texts, target_texts)
+
+
+if __name__ == '__main__':
+    main()
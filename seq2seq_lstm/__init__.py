@@ -1,3 +1,18 @@
 __version__ = '0.1.6'
 __all__ = ['seq2seq_lstm']
-from .seq2seq_lstm import Seq2SeqLSTM
+
+import importlib
+
+from .inference import Seq2SeqPredictor
+
+
+LAZY_ATTRIBUTES = {'Seq2SeqLSTM': 'seq2seq_lstm', 'TextPairCorpus': 'seq2seq_lstm', 'ModelRegistry': 'registry'}
+
+
+def __getattr__(name):
+    """ Import classes, which depend on TensorFlow, at their first usage (`Seq2SeqPredictor` does not need it). """
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module('.' + LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,269 @@
+""" Caches of prediction results and loaded models
+
+The `LRUCache` is the thread-safe in-memory cache with the least recently used eviction policy, which is used for
+prediction results of `Seq2SeqLSTM` and for loaded models of `ModelRegistry`. The `DiskCache` is the persistent cache of
+prediction results in the SQLite database, which is shared by several processes (for example, workers of one server).
+This module does not depend on TensorFlow.
+
+"""
+
+from collections import OrderedDict
+import os
+import sqlite3
+import threading
+import time
+
+
+class LRUCache(object):
+    """ Thread-safe cache with the least recently used eviction policy.
+
+    Each item has its size (for example, one for the bounded number of items or a number of bytes for the memory
+    budget), and the least recently used items are evicted while the total size of items exceeds `max_size`. An item,
+    whose size is greater than `max_size`, is not stored.
+
+    """
+
+    def __init__(self, max_size):
+        """ Create the empty cache.
+
+        :param max_size: the maximal total size of stored items (positive number).
+
+        """
+        if (not isinstance(max_size, int)) and (not isinstance(max_size, float)):
+            raise ValueError(f'`max_size` is wrong! Expected `{type(3)}` or `{type(3.5)}`, got `{type(max_size)}`.')
+        if max_size <= 0:
+            raise ValueError(f'`max_size` is wrong! Expected a positive value, but {max_size} is not positive.')
+        self.max_size = max_size
+        self.total_size = 0
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0
+        self.items_ = OrderedDict()
+        self.lock_ = threading.Lock()
+
+    def __len__(self):
+        return len(self.items_)
+
+    def __contains__(self, key):
+        return key in self.items_
+
+    def keys(self):
+        """ Get keys of stored items from the least recently used one to the most recently used one. """
+        with self.lock_:
+            return list(self.items_.keys())
+
+    def get(self, key, default=None):
+        """ Get the stored item and mark it as the most recently used one.
+
+        :param key: the item key.
+        :param default: the value, which is returned if the item is not found.
+
+        :return: the stored value or `default`.
+
+        """
+        with self.lock_:
+            if key not in self.items_:
+                self.n_misses += 1
+                return default
+            self.n_hits += 1
+            self.items_.move_to_end(key)
+            return self.items_[key][0]
+
+    def put(self, key, value, size=1):
+        """ Store the item as the most recently used one and evict the least recently used items if necessary.
+
+        :param key: the item key.
+        :param value: the item value.
+        :param size: the item size (non-negative number).
+
+        :return: True, if the item is stored, and False, if it is greater than the cache.
+
+        """
+        if size < 0:
+            raise ValueError(f'`size` is wrong! Expected a non-negative value, but {size} is negative.')
+        with self.lock_:
+            if key in self.items_:
+                self.total_size -= self.items_.pop(key)[1]
+            if size > self.max_size:
+                return False
+            self.items_[key] = (value, size)
+            self.total_size += size
+            while self.total_size > self.max_size:
+                _, (_, evicted_size) = self.items_.popitem(last=False)
+                self.total_size -= evicted_size
+                self.n_evictions += 1
+            return True
+
+    def pop(self, key, default=None):
+        """ Remove the item from the cache.
+
+        :param key: the item key.
+        :param default: the value, which is returned if the item is not found.
+
+        :return: the removed value or `default`.
+
+        """
+        with self.lock_:
+            if key not in self.items_:
+                return default
+            value, size = self.items_.pop(key)
+            self.total_size -= size
+            return value
+
+    def clear(self):
+        """ Remove all items from the cache (counters of hits, misses and evictions are not reset). """
+        with self.lock_:
+            self.items_.clear()
+            self.total_size = 0
+
+
+class DiskCache(object):
+    """ Persistent cache of prediction results, which is shared by several processes via the SQLite database.
+
+    Each entry is keyed by the fingerprint of the model and the string key of the source text, so entries of another
+    model are never returned. The time of the last usage of each fingerprint (opening of the cache or saving of values)
+    is kept too, so the `invalidate` method can remove entries of models, which are not used for `STALE_MODEL_AGE`
+    seconds, and keep entries of other models, which are served from the same file now (for example, during a rolling
+    deploy). The database is opened in the write-ahead logging mode, which allows concurrent readers and one writer,
+    and it is re-opened in each forked process.
+
+    """
+    MAX_KEYS_PER_QUERY = 500
+    STALE_MODEL_AGE = 3600.0
+
+    def __init__(self, file_name, timeout=30.0):
+        """ Open the cache, creating the database file if it does not exist.
+
+        :param file_name: name of the SQLite database file.
+        :param timeout: time in seconds to wait for the lock of the database, which is held by another process.
+
+        """
+        self.file_name = file_name
+        self.timeout = timeout
+        self.n_hits = 0
+        self.n_misses = 0
+        self.connection_ = None
+        self.pid_ = None
+        self.lock_ = threading.Lock()
+        with self.lock_:
+            connection = self.get_connection()
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS predictions (fingerprint TEXT NOT NULL, '
+                                   'key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (fingerprint, key)) '
+                                   'WITHOUT ROWID')
+                connection.execute('CREATE TABLE IF NOT EXISTS models (fingerprint TEXT NOT NULL PRIMARY KEY, '
+                                   'last_used REAL NOT NULL) WITHOUT ROWID')
+
+    def __len__(self):
+        with self.lock_:
+            return self.get_connection().execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+    def __getstate__(self):
+        return {'file_name': self.file_name, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(state['file_name'], state['timeout'])
+
+    def get_connection(self):
+        """ Get the connection to the database of this process (the lock must be acquired by the caller). """
+        if (self.connection_ is None) or (self.pid_ != os.getpid()):
+            self.connection_ = sqlite3.connect(self.file_name, timeout=self.timeout, check_same_thread=False)
+            self.connection_.execute('PRAGMA journal_mode=WAL')
+            self.connection_.execute('PRAGMA synchronous=NORMAL')
+            self.pid_ = os.getpid()
+        return self.connection_
+
+    def get_many(self, fingerprint, keys):
+        """ Get cached values for the specified keys.
+
+        :param fingerprint: the model fingerprint.
+        :param keys: list of string keys.
+
+        :return: dictionary of found keys and their values.
+
+        """
+        found = dict()
+        with self.lock_:
+            connection = self.get_connection()
+            for start in range(0, len(keys), self.MAX_KEYS_PER_QUERY):
+                keys_of_query = keys[start:(start + self.MAX_KEYS_PER_QUERY)]
+                found.update(connection.execute(
+                    'SELECT key, value FROM predictions WHERE fingerprint = ? AND key IN ({0})'.format(
+                        ', '.join(['?' for _ in range(len(keys_of_query))])),
+                    [fingerprint] + list(keys_of_query)
+                ).fetchall())
+            self.n_hits += len(found)
+            self.n_misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, fingerprint, items):
+        """ Save values into the cache in one transaction.
+
+        :param fingerprint: the model fingerprint.
+        :param items: list of 2-element tuples (string key and string value).
+
+        """
+        if len(items) == 0:
+            return
+        with self.lock_:
+            connection = self.get_connection()
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO predictions (fingerprint, key, value) VALUES (?, ?, ?)',
+                                       [(fingerprint, key, value) for key, value in items])
+                connection.execute('INSERT OR REPLACE INTO models (fingerprint, last_used) VALUES (?, ?)',
+                                   (fingerprint, time.time()))
+
+    def invalidate(self, fingerprint, max_age=None):
+        """ Remove entries, which do not belong to the specified fingerprint, and mark this fingerprint as used now.
+
+        :param fingerprint: the fingerprint of the current model.
+        :param max_age: if it is None, then entries of all other fingerprints are removed, else only entries of
+        fingerprints, which are not used for `max_age` seconds (or whose usage is unknown), are removed.
+
+        :return: number of removed entries.
+
+        """
+        with self.lock_:
+            connection = self.get_connection()
+            with connection:
+                if max_age is None:
+                    n_removed = connection.execute('DELETE FROM predictions WHERE fingerprint != ?',
+                                                   (fingerprint,)).rowcount
+                    connection.execute('DELETE FROM models WHERE fingerprint != ?', (fingerprint,))
+                else:
+                    min_last_used = time.time() - max_age
+                    n_removed = connection.execute(
+                        'DELETE FROM predictions WHERE fingerprint != ? AND fingerprint NOT IN '
+                        '(SELECT fingerprint FROM models WHERE last_used >= ?)', (fingerprint, min_last_used)
+                    ).rowcount
+                    connection.execute('DELETE FROM models WHERE fingerprint != ? AND last_used < ?',
+                                       (fingerprint, min_last_used))
+                connection.execute('INSERT OR REPLACE INTO models (fingerprint, last_used) VALUES (?, ?)',
+                                   (fingerprint, time.time()))
+                return n_removed
+
+    def remove(self, fingerprints):
+        """ Remove all entries of the specified fingerprints.
+
+        :param fingerprints: list of fingerprints.
+
+        :return: number of removed entries.
+
+        """
+        n_removed = 0
+        with self.lock_:
+            connection = self.get_connection()
+            with connection:
+                for fingerprint in fingerprints:
+                    n_removed += connection.execute('DELETE FROM predictions WHERE fingerprint = ?',
+                                                    (fingerprint,)).rowcount
+                    connection.execute('DELETE FROM models WHERE fingerprint = ?', (fingerprint,))
+        return n_removed
+
+    def close(self):
+        """ Close the connection to the database. """
+        with self.lock_:
+            if (self.connection_ is not None) and (self.pid_ == os.getpid()):
+                self.connection_.close()
+            self.connection_ = None
+            self.pid_ = None
@@ -0,0 +1,520 @@
+""" Inference of the trained sequence-to-sequence model by NumPy
+
+The `InferenceEngine` runs the LSTM encoder, the single step of the LSTM decoder and the output projection with the
+softmax by NumPy. Its methods `encode` and `decode_step` take and return the same arrays as the compiled functions of
+`Seq2SeqLSTM`, so they are used by the same greedy and beam search decoding (see `Seq2SeqLSTM.quantize`).
+
+Matrices of weights (embeddings, input and recurrent kernels of both LSTM layers and the kernel of the output layer)
+can be quantized into int8 values with a separate float32 scale for each channel: each output unit of kernels and each
+token of embeddings. Biases are kept in float32, because they are small. Thus, weights of the quantized engine take
+about four times less memory than float32 weights. Inputs of all matrix products are not quantized, and products are
+calculated in float32, so the only error of the quantization is the rounding of weights. The int8 matrix is converted
+into float32 by blocks of rows (no more than `DEQUANTIZED_BLOCK_SIZE` bytes each), and products of these blocks are
+accumulated, so the full float32 copy of the matrix never exists, even temporarily.
+
+The `Seq2SeqPredictor` is the inference-only model, which predicts by the greedy decoding with the `InferenceEngine`.
+It is loaded from the model file, the pickled `Seq2SeqLSTM` object or its `dump_all` state. This module does not
+depend on TensorFlow, so the predictor starts much faster and takes much less memory than `Seq2SeqLSTM`:
+
+    from seq2seq_lstm import Seq2SeqPredictor
+
+    predictor = Seq2SeqPredictor.load('some_file.bin')  # or Seq2SeqPredictor.load_pickle('some_file.pkl')
+    predicted_texts = predictor.predict(input_texts)
+
+"""
+
+import pickle
+
+import numpy as np
+
+from .serialization import unpack_arrays
+
+
+ENCODER_WEIGHT_NAMES = ('encoder_kernel', 'encoder_recurrent_kernel', 'encoder_bias')
+DECODER_WEIGHT_NAMES = ('decoder_kernel', 'decoder_recurrent_kernel', 'decoder_bias', 'output_kernel', 'output_bias')
+EMBEDDING_WEIGHT_NAMES = ('encoder_embeddings', 'decoder_embeddings')
+SCALES_SUFFIX = '_scales'
+DEQUANTIZED_BLOCK_SIZE = 1024 * 1024
+
+
+def quantize_per_channel(matrix, axis=1):
+    """ Quantize the float matrix into int8 values with a separate scale for each channel (row or column).
+
+    The scale of each channel is its maximal absolute value divided by 127, so the zero is represented exactly, and all
+    values are in the symmetric range from -127 to 127.
+
+    :param matrix: 2-D float array.
+    :param axis: axis of channels: 1 if each column is a channel (kernels of layers), and 0 if each row is a channel
+    (embeddings of tokens).
+
+    :return: 2-element tuple with the int8 matrix of the same shape and the float32 vector of scales, so that the
+    source matrix is approximately equal to the product of the int8 matrix by scales along the axis of channels.
+
+    """
+    if (not isinstance(matrix, np.ndarray)) or (matrix.ndim != 2):
+        raise ValueError('`matrix` is wrong! Expected a 2-D array.')
+    if axis not in {0, 1}:
+        raise ValueError(f'`axis` is wrong! Expected 0 or 1, got {axis}.')
+    max_values = np.max(np.abs(matrix), axis=1 - axis).astype(np.float32)
+    scales = np.where(max_values > 0.0, max_values / 127.0, 1.0).astype(np.float32)
+    values = np.round(matrix.astype(np.float32) / np.expand_dims(scales, 1 - axis))
+    return np.clip(values, -127, 127).astype(np.int8), scales
+
+
+def sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+class InferenceEngine(object):
+    """ NumPy implementation of the encoder and the single step of the decoder of `Seq2SeqLSTM`.
+
+    All weights are kept in the dictionary by their names (see `ENCODER_WEIGHT_NAMES`, `DECODER_WEIGHT_NAMES` and
+    `EMBEDDING_WEIGHT_NAMES`). The quantized matrix is kept as int8 values under its name, and its scales are kept under
+    the same name with the `_scales` suffix.
+
+    """
+
+    def __init__(self, arrays):
+        """ Create the engine from named weights.
+
+        :param arrays: dictionary of weights (numpy arrays), which is created by the `quantize` method or restored from
+        the `get_weights` result.
+
+        """
+        if not isinstance(arrays, dict):
+            raise ValueError(f'`arrays` is wrong! Expected `{type({1: 2})}`, got `{type(arrays)}`.')
+        weight_names = set(ENCODER_WEIGHT_NAMES + DECODER_WEIGHT_NAMES)
+        if any([cur in arrays for cur in EMBEDDING_WEIGHT_NAMES]):
+            weight_names |= set(EMBEDDING_WEIGHT_NAMES)
+        if not (weight_names <= set(arrays.keys())):
+            raise ValueError('`arrays` does not contain all weights of the neural model!')
+        self.arrays = arrays
+        self.use_embeddings = (EMBEDDING_WEIGHT_NAMES[0] in arrays)
+        self.latent_dim = arrays['encoder_recurrent_kernel'].shape[0]
+
+    @staticmethod
+    def quantize(weights, n_encoder_weights):
+        """ Create the engine with int8 matrices from float weights of the Keras encoder and decoder.
+
+        :param weights: list of weights of the encoder model and the decoder model (see `Seq2SeqLSTM.prepare_artifact`).
+        :param n_encoder_weights: number of weights, which belong to the encoder (the first ones in the list).
+
+        :return: the `InferenceEngine` object.
+
+        """
+        return InferenceEngine.create(weights, n_encoder_weights, quantize=True)
+
+    @staticmethod
+    def create(weights, n_encoder_weights, quantize=False):
+        """ Create the engine from weights of the Keras encoder and decoder.
+
+        :param weights: list of weights of the encoder model and the decoder model (see `Seq2SeqLSTM.prepare_artifact`).
+        :param n_encoder_weights: number of weights, which belong to the encoder (the first ones in the list).
+        :param quantize: if True, then all matrices are quantized into int8 values, else weights are used as is.
+
+        :return: the `InferenceEngine` object.
+
+        """
+        if n_encoder_weights == len(ENCODER_WEIGHT_NAMES):
+            weight_names = ENCODER_WEIGHT_NAMES + DECODER_WEIGHT_NAMES
+        elif n_encoder_weights == (len(ENCODER_WEIGHT_NAMES) + 1):
+            weight_names = (EMBEDDING_WEIGHT_NAMES[0],) + ENCODER_WEIGHT_NAMES + (EMBEDDING_WEIGHT_NAMES[1],) + \
+                           DECODER_WEIGHT_NAMES
+        else:
+            weight_names = ()
+        if len(weights) != len(weight_names):
+            raise ValueError('`weights` do not correspond to the neural model!')
+        arrays = dict()
+        for name, value in zip(weight_names, weights):
+            if quantize and (value.ndim == 2):
+                arrays[name], arrays[name + SCALES_SUFFIX] = quantize_per_channel(
+                    value, axis=(0 if name in EMBEDDING_WEIGHT_NAMES else 1)
+                )
+            else:
+                arrays[name] = np.asarray(value, dtype=np.float32)
+        return InferenceEngine(arrays)
+
+    @property
+    def nbytes(self):
+        """ Total size of all weights in bytes. """
+        return sum([cur.nbytes for cur in self.arrays.values()])
+
+    def get_weights(self):
+        """ Get all weights for the serialization.
+
+        :return: 2-element tuple with the sorted list of weight names and the list of corresponding numpy arrays.
+
+        """
+        weight_names = sorted(self.arrays.keys())
+        return weight_names, [self.arrays[name] for name in weight_names]
+
+    def multiply(self, inputs, name):
+        """ Multiply the 2-D float matrix by the named matrix of weights (it is dequantized by its scales).
+
+        The quantized matrix is converted into float32 by blocks of rows, whose size does not exceed
+        `DEQUANTIZED_BLOCK_SIZE` bytes, so the memory of the product does not depend on the size of the matrix. Scales
+        are constant along rows, therefore they are applied once to the accumulated product.
+
+        :param inputs: 2-D float32 array.
+        :param name: name of the weight matrix.
+
+        :return: 2-D float32 array.
+
+        """
+        weights = self.arrays[name]
+        scales = self.arrays.get(name + SCALES_SUFFIX)
+        if scales is None:
+            return np.dot(inputs, weights)
+        n_rows, n_columns = weights.shape
+        block_size = max(1, DEQUANTIZED_BLOCK_SIZE // (4 * n_columns))
+        result = np.dot(inputs[:, 0:block_size], weights[0:block_size].astype(np.float32))
+        for block_start in range(block_size, n_rows, block_size):
+            block_end = min(block_start + block_size, n_rows)
+            result += np.dot(inputs[:, block_start:block_end], weights[block_start:block_end].astype(np.float32))
+        result *= scales
+        return result
+
+    def lookup(self, token_ids, name):
+        """ Look up the named embeddings by token indices (the zero index is the padding).
+
+        :param token_ids: integer array of any shape.
+        :param name: name of embeddings.
+
+        :return: float32 array, whose shape is the shape of `token_ids` with the additional last axis of embeddings.
+
+        """
+        embeddings = self.arrays[name][token_ids]
+        scales = self.arrays.get(name + SCALES_SUFFIX)
+        if scales is None:
+            return embeddings
+        return embeddings.astype(np.float32) * np.expand_dims(scales[token_ids], -1)
+
+    def run_lstm(self, prefix, inputs, mask, state_h, state_c):
+        """ Run the LSTM layer over all timesteps and return its final states.
+
+        Input projections of all timesteps are calculated by the single matrix product, and only the recurrent product
+        is calculated at each timestep. States of sequences are not changed at their masked timesteps (the same as in
+        the Keras LSTM layer with a masked input).
+
+        :param prefix: prefix of weight names (`encoder` or `decoder`).
+        :param inputs: 3-D float32 array of input vectors (batch size, timesteps, input size).
+        :param mask: 2-D boolean array (batch size, timesteps) of unmasked timesteps.
+        :param state_h: initial state `h` (2-D float32 array).
+        :param state_c: initial state `c` (2-D float32 array).
+
+        :return: final states `h` and `c`.
+
+        """
+        batch_size, n_steps = mask.shape
+        projected_inputs = self.multiply(inputs.reshape((batch_size * n_steps, inputs.shape[2])), prefix + '_kernel')
+        projected_inputs = projected_inputs.reshape((batch_size, n_steps, projected_inputs.shape[1])) + \
+            self.arrays[prefix + '_bias']
+        units = self.latent_dim
+        for time_step in range(n_steps):
+            step_mask = mask[:, time_step]
+            if not np.any(step_mask):
+                continue
+            z = projected_inputs[:, time_step] + self.multiply(state_h, prefix + '_recurrent_kernel')
+            new_state_c = sigmoid(z[:, units:(2 * units)]) * state_c + \
+                sigmoid(z[:, 0:units]) * np.tanh(z[:, (2 * units):(3 * units)])
+            new_state_h = sigmoid(z[:, (3 * units):]) * np.tanh(new_state_c)
+            if np.all(step_mask):
+                state_h, state_c = new_state_h, new_state_c
+            else:
+                step_mask = step_mask.reshape((batch_size, 1))
+                state_h = np.where(step_mask, new_state_h, state_h)
+                state_c = np.where(step_mask, new_state_c, state_c)
+        return state_h.astype(np.float32), state_c.astype(np.float32)
+
+    def prepare_inputs(self, input_seq, embeddings_name):
+        """ Convert the feature matrix of sequences into input vectors of the LSTM layer and the mask of timesteps.
+
+        :param input_seq: one-hot vectors of tokens (3-D array) or their indices for embeddings (2-D array).
+        :param embeddings_name: name of embeddings.
+
+        :return: 2-element tuple with the 3-D float32 array of input vectors and the 2-D boolean mask.
+
+        """
+        if self.use_embeddings:
+            return self.lookup(input_seq, embeddings_name), (input_seq != 0)
+        return input_seq.astype(np.float32), np.any(input_seq != 0.0, axis=2)
+
+    def encode(self, input_seq):
+        """ Calculate final LSTM states of the encoder.
+
+        :param input_seq: feature matrix of source sequences (see `Seq2SeqLSTM.generate_data_for_prediction`).
+
+        :return: 2-element list of LSTM states `h` and `c` (2-D arrays).
+
+        """
+        inputs, mask = self.prepare_inputs(input_seq, EMBEDDING_WEIGHT_NAMES[0])
+        initial_state = np.zeros((mask.shape[0], self.latent_dim), dtype=np.float32)
+        return list(self.run_lstm('encoder', inputs, mask, initial_state, initial_state))
+
+    def decode_step(self, target_seq, state_h, state_c):
+        """ Calculate probabilities of next tokens and new LSTM states of the decoder by previous tokens.
+
+        :param target_seq: previous tokens as one-hot vectors (3-D array) or indices for embeddings (2-D array).
+        :param state_h: LSTM state `h` (2-D array).
+        :param state_c: LSTM state `c` (2-D array).
+
+        :return: 3-element tuple with probabilities of next tokens (2-D array) and new LSTM states `h` and `c`.
+
+        """
+        inputs, mask = self.prepare_inputs(target_seq, EMBEDDING_WEIGHT_NAMES[1])
+        state_h, state_c = self.run_lstm('decoder', inputs, mask, np.asarray(state_h, dtype=np.float32),
+                                         np.asarray(state_c, dtype=np.float32))
+        logits = self.multiply(state_h, 'output_kernel') + self.arrays['output_bias']
+        probabilities = np.exp(logits - np.max(logits, axis=1, keepdims=True))
+        probabilities /= np.sum(probabilities, axis=1, keepdims=True)
+        return probabilities.astype(np.float32), state_h, state_c
+
+
+class PickledModelState(object):
+    """ Placeholder of the pickled `Seq2SeqLSTM` object, which keeps its state without importing TensorFlow. """
+
+    def __setstate__(self, state):
+        self.state = state
+
+
+class ModelUnpickler(pickle.Unpickler):
+    """ Unpickler, which restores the pickled `Seq2SeqLSTM` object as `PickledModelState`. """
+
+    def find_class(self, module, name):
+        if (module == 'seq2seq_lstm.seq2seq_lstm') and (name == 'Seq2SeqLSTM'):
+            return PickledModelState
+        return super().find_class(module, name)
+
+
+class Seq2SeqPredictor(object):
+    """ Inference-only sequence-to-sequence model, which predicts by the greedy decoding without TensorFlow.
+
+    Float weights of the trained `Seq2SeqLSTM` are used as is, so predictions are the same as predictions of
+    `Seq2SeqLSTM` with `beam_size` equal to 1 (up to rounding errors of float32). Quantized weights (see
+    `Seq2SeqLSTM.quantize`) are supported too.
+
+    """
+    UNKNOWN_TOKEN = '<unk>'
+
+    def __init__(self, inference_engine, input_vocabulary, target_vocabulary, max_encoder_seq_length,
+                 max_decoder_seq_length, lowercase=True, batch_size=64):
+        """ Create the predictor.
+
+        :param inference_engine: the `InferenceEngine` object.
+        :param input_vocabulary: list of input tokens, ordered by their indices.
+        :param target_vocabulary: list of target tokens, ordered by their indices (it contains the start token `\\t`
+        and the end token `\\n`).
+        :param max_encoder_seq_length: maximal length of source sequences (longer sequences are truncated).
+        :param max_decoder_seq_length: maximal length of resulting sequences.
+        :param lowercase: the need to bring all tokens of source sequences to the lowercase.
+        :param batch_size: maximal number of source sequences, which are decoded together.
+
+        """
+        if not isinstance(inference_engine, InferenceEngine):
+            raise ValueError(f'`inference_engine` is wrong! Expected `{InferenceEngine}`, got '
+                             f'`{type(inference_engine)}`.')
+        if ('\t' not in target_vocabulary) or ('\n' not in target_vocabulary):
+            raise ValueError('`target_vocabulary` is wrong! It does not contain the start and end tokens.')
+        self.inference_engine = inference_engine
+        self.input_token_index = dict((token, idx) for idx, token in enumerate(input_vocabulary))
+        self.target_vocabulary = np.array(list(target_vocabulary), dtype=object)
+        self.start_token_idx = list(target_vocabulary).index('\t')
+        self.end_token_idx = list(target_vocabulary).index('\n')
+        self.max_encoder_seq_length = int(max_encoder_seq_length)
+        self.max_decoder_seq_length = int(max_decoder_seq_length)
+        self.lowercase = lowercase
+        self.batch_size = batch_size
+
+    @staticmethod
+    def from_artifact(buffer):
+        """ Create the predictor from binary data in the single-file model format (see `Seq2SeqLSTM.save`).
+
+        :param buffer: binary data (`bytes`, `bytearray`, `np.memmap` or any other object with the buffer protocol).
+
+        :return: the `Seq2SeqPredictor` object.
+
+        """
+        weights, description = unpack_arrays(buffer)
+        if not isinstance(description.get('params'), dict):
+            raise ValueError('The buffer does not contain the sequence-to-sequence model!')
+        if 'inference_engine' in description:
+            inference_engine = InferenceEngine(dict(zip(description['inference_engine'], weights)))
+        elif 'n_encoder_weights' in description:
+            inference_engine = InferenceEngine.create(weights, description['n_encoder_weights'])
+        else:
+            raise ValueError('The sequence-to-sequence model is not trained!')
+        return Seq2SeqPredictor(inference_engine, description['input_vocabulary'], description['target_vocabulary'],
+                                description['max_encoder_seq_length_'], description['max_decoder_seq_length_'],
+                                lowercase=description['params'].get('lowercase', True),
+                                batch_size=description['params'].get('batch_size', 64))
+
+    @staticmethod
+    def from_state(state):
+        """ Create the predictor from the serialized state of `Seq2SeqLSTM`.
+
+        :param state: dictionary, which is created by `Seq2SeqLSTM.__getstate__` or `Seq2SeqLSTM.dump_all`.
+
+        :return: the `Seq2SeqPredictor` object.
+
+        """
+        if not isinstance(state, dict):
+            raise ValueError(f'`state` is wrong! Expected `{type({1: 2})}`, got `{type(state)}`.')
+        if 'artifact' in state:
+            return Seq2SeqPredictor.from_artifact(state['artifact'])
+        if state.get('weights') is None:
+            raise ValueError('The sequence-to-sequence model is not trained!')
+        weights, description = unpack_arrays(state['weights'])
+        if 'inference_engine' in description:
+            inference_engine = InferenceEngine(dict(zip(description['inference_engine'], weights)))
+        else:
+            inference_engine = InferenceEngine.create(weights, description.get('n_encoder_weights'))
+        return Seq2SeqPredictor(inference_engine,
+                                sorted(state['input_token_index_'], key=state['input_token_index_'].get),
+                                sorted(state['target_token_index_'], key=state['target_token_index_'].get),
+                                state['max_encoder_seq_length_'], state['max_decoder_seq_length_'],
+                                lowercase=state['lowercase'], batch_size=state['batch_size'])
+
+    @staticmethod
+    def load(file_name):
+        """ Load the predictor from the model file, which was created by `Seq2SeqLSTM.save`.
+
+        The file is mapped into memory, so weights are not copied, and processes share its physical pages.
+
+        :param file_name: name of the model file.
+
+        :return: the `Seq2SeqPredictor` object.
+
+        """
+        return Seq2SeqPredictor.from_artifact(np.memmap(file_name, dtype=np.uint8, mode='r'))
+
+    @staticmethod
+    def load_pickle(file_name):
+        """ Load the predictor from the file with the pickled `Seq2SeqLSTM` object without importing TensorFlow.
+
+        :param file_name: name of the file.
+
+        :return: the `Seq2SeqPredictor` object.
+
+        """
+        with open(file_name, 'rb') as fp:
+            pickled_model = ModelUnpickler(fp).load()
+        if not isinstance(pickled_model, PickledModelState):
+            raise ValueError(f'The file "{file_name}" does not contain the pickled sequence-to-sequence model!')
+        return Seq2SeqPredictor.from_state(pickled_model.state)
+
+    def tokenize_text(self, src):
+        """ Convert the source sequence into indices of its tokens (unknown tokens are replaced or skipped).
+
+        :param src: source sequence (unicode text composed from tokens separated by spaces).
+
+        :return: list of token indices in the input vocabulary, which is truncated to the maximal length.
+
+        """
+        unknown_token_idx = self.input_token_index.get(self.UNKNOWN_TOKEN)
+        indices_of_tokens = []
+        for cur_token in (src.strip().lower().split() if self.lowercase else src.strip().split()):
+            token_idx = self.input_token_index.get(cur_token, unknown_token_idx)
+            if token_idx is not None:
+                indices_of_tokens.append(token_idx)
+        return indices_of_tokens[0:self.max_encoder_seq_length]
+
+    def prepare_encoder_inputs(self, indices_of_tokens):
+        """ Prepare the feature matrix of source sequences for the encoder.
+
+        :param indices_of_tokens: list of source sequences, each of which is the list of token indices.
+
+        :return: one-hot vectors of tokens (3-D array) or their indices for embeddings (2-D array), which are padded by
+        zeros to the maximal length of sequences.
+
+        """
+        max_length = max(1, max([len(cur) for cur in indices_of_tokens]))
+        if self.inference_engine.use_embeddings:
+            input_seq = np.zeros((len(indices_of_tokens), max_length), dtype=np.int32)
+            for sample_idx, cur in enumerate(indices_of_tokens):
+                input_seq[sample_idx, 0:len(cur)] = np.array(cur, dtype=np.int32) + 1
+        else:
+            input_seq = np.zeros((len(indices_of_tokens), max_length, len(self.input_token_index)),
+                                 dtype=np.float32)
+            for sample_idx, cur in enumerate(indices_of_tokens):
+                input_seq[sample_idx, np.arange(len(cur), dtype=np.int32), cur] = 1.0
+        return input_seq
+
+    def prepare_decoder_inputs(self, indices_of_tokens):
+        """ Prepare inputs of the decoder for the single timestep by indices of previous tokens.
+
+        :param indices_of_tokens: 1-D array of indices of previous tokens in the target vocabulary.
+
+        :return: one-hot vectors of these tokens (3-D array) or their indices for embeddings (2-D array).
+
+        """
+        if self.inference_engine.use_embeddings:
+            return (indices_of_tokens.reshape((indices_of_tokens.shape[0], 1)) + 1).astype(np.int32)
+        target_seq = np.zeros((indices_of_tokens.shape[0], 1, self.target_vocabulary.shape[0]), dtype=np.float32)
+        target_seq[np.arange(indices_of_tokens.shape[0]), 0, indices_of_tokens] = 1.0
+        return target_seq
+
+    def decode_greedily(self, state_h, state_c):
+        """ Decode the mini-batch of sequences by the greedy search (as `Seq2SeqLSTM.decode_greedily`).
+
+        :param state_h: final LSTM state `h` of the encoder.
+        :param state_c: final LSTM state `c` of the encoder.
+
+        :return: list of decoded sequences, each of which is 1-D array of token indices in the target vocabulary.
+
+        """
+        batch_size = state_h.shape[0]
+        indices_of_sampled_tokens = np.full((batch_size,), self.start_token_idx, dtype=np.int32)
+        decoded_indices = np.zeros((batch_size, self.max_decoder_seq_length + 1), dtype=np.int32)
+        decoded_lengths = np.zeros((batch_size,), dtype=np.int32)
+        active_indices = np.arange(batch_size)
+        time_step = 0
+        while (active_indices.shape[0] > 0) and (time_step <= self.max_decoder_seq_length):
+            target_seq = self.prepare_decoder_inputs(indices_of_sampled_tokens)
+            output_tokens, state_h, state_c = self.inference_engine.decode_step(target_seq, state_h, state_c)
+            indices_of_sampled_tokens = np.argmax(output_tokens, axis=1)
+            decoded_indices[active_indices, time_step] = indices_of_sampled_tokens
+            decoded_lengths[active_indices] += 1
+            time_step += 1
+            is_active = (indices_of_sampled_tokens != self.end_token_idx)
+            if not np.all(is_active):
+                active_indices = active_indices[is_active]
+                indices_of_sampled_tokens = indices_of_sampled_tokens[is_active]
+                state_h = state_h[is_active]
+                state_c = state_c[is_active]
+        return [decoded_indices[text_idx, 0:decoded_lengths[text_idx]] for text_idx in range(batch_size)]
+
+    def predict(self, X):
+        """ Predict resulting sequences of tokens by source sequences.
+
+        Source sequences are sorted by their lengths before splitting into mini-batches, so each mini-batch is padded
+        to the maximal length of sequences in this mini-batch.
+
+        :param X: source sequences (list, tuple or 1-D numpy.ndarray of unicode texts composed from tokens separated by
+        spaces).
+
+        :return: resulting sequences, predicted for source sequences.
+
+        """
+        if (not isinstance(X, list)) and (not isinstance(X, tuple)) and (not isinstance(X, np.ndarray)):
+            raise ValueError(f'`{type(X)}` is wrong type for `X`.')
+        if isinstance(X, np.ndarray) and (len(X.shape) != 1):
+            raise ValueError('`X` must be a 1-D array!')
+        if len(X) == 0:
+            raise ValueError('X is empty!')
+        for sample_idx in range(len(X)):
+            if not hasattr(X[sample_idx], 'split'):
+                raise ValueError(f'Sample {sample_idx} of `X` is wrong! This sample have not the `split` method.')
+        indices_of_tokens = [self.tokenize_text(X[sample_idx]) for sample_idx in range(len(X))]
+        sorted_indices = np.argsort(np.array([len(cur) for cur in indices_of_tokens], dtype=np.int32), kind='stable')
+        texts = [None for _ in range(len(X))]
+        for batch_start in range(0, len(X), self.batch_size):
+            text_indices = sorted_indices[batch_start:(batch_start + self.batch_size)]
+            input_seq = self.prepare_encoder_inputs([indices_of_tokens[text_idx] for text_idx in text_indices])
+            state_h, state_c = self.inference_engine.encode(input_seq)
+            for text_idx, decoded_indices in zip(text_indices, self.decode_greedily(state_h, state_c)):
+                texts[text_idx] = ' '.join(self.target_vocabulary[decoded_indices])
+        if isinstance(X, tuple):
+            return tuple(texts)
+        if isinstance(X, np.ndarray):
+            return np.array(texts, dtype=object)
+        return texts
@@ -0,0 +1,100 @@
+""" Registry of several sequence-to-sequence models in one process
+
+This module allows serving of several `Seq2SeqLSTM` models (for example, different language pairs) from one process.
+Models are registered by their names and files (see `Seq2SeqLSTM.save`), they are loaded at the first request, and the
+least recently used models are evicted, when the total size of loaded models exceeds the memory budget. Loading of
+models does not reset the Keras session, so evicted models do not affect other loaded models, and inference models of an
+evicted model are reused by the next loaded model with the same architecture (see `InferenceModelPool`).
+
+"""
+
+import os
+import threading
+
+from .caching import LRUCache
+from .seq2seq_lstm import Seq2SeqLSTM
+
+
+class ModelRegistry(object):
+    """ Registry, which loads, caches and evicts `Seq2SeqLSTM` models by their names.
+
+    The size of each model is estimated as the size of its file, which consists of weights mainly.
+
+    """
+
+    def __init__(self, memory_budget):
+        """ Create the empty registry.
+
+        :param memory_budget: the maximal total size of loaded models in bytes.
+
+        """
+        self.loaded_models_ = LRUCache(memory_budget)
+        self.file_names_ = dict()
+        self.lock_ = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.file_names_
+
+    @property
+    def memory_budget(self):
+        return self.loaded_models_.max_size
+
+    def register(self, name, file_name):
+        """ Register the model file under the specified name (the model is not loaded until it is requested).
+
+        If another file is registered under the same name, then the previously loaded model is evicted.
+
+        :param name: the model name.
+        :param file_name: name of the file created by `Seq2SeqLSTM.save`.
+
+        """
+        if not os.path.isfile(file_name):
+            raise ValueError(f'The file "{file_name}" does not exist!')
+        with self.lock_:
+            self.file_names_[name] = os.path.abspath(file_name)
+            self.loaded_models_.pop(name)
+
+    def unregister(self, name):
+        """ Remove the model from the registry.
+
+        :param name: the model name.
+
+        """
+        with self.lock_:
+            if name not in self.file_names_:
+                raise ValueError(f'The model `{name}` is not registered!')
+            del self.file_names_[name]
+            self.loaded_models_.pop(name)
+
+    def get(self, name):
+        """ Get the model by its name, loading it if it is not loaded yet.
+
+        :param name: the model name.
+
+        :return: the `Seq2SeqLSTM` object.
+
+        """
+        with self.lock_:
+            if name not in self.file_names_:
+                raise ValueError(f'The model `{name}` is not registered!')
+            model = self.loaded_models_.get(name)
+            if model is None:
+                file_name = self.file_names_[name]
+                model = Seq2SeqLSTM.load(file_name)
+                self.loaded_models_.put(name, model, os.path.getsize(file_name))
+        return model
+
+    def get_loaded_names(self):
+        """ Get names of loaded models from the least recently used one to the most recently used one. """
+        return self.loaded_models_.keys()
+
+    def get_stats(self):
+        """ Get statistics of the registry.
+
+        :return: dictionary with numbers of registered and loaded models, the total size of loaded models in bytes,
+        numbers of hits, misses (i.e. loadings) and evictions.
+
+        """
+        return {'registered': len(self.file_names_), 'loaded': len(self.loaded_models_),
+                'loaded_size': self.loaded_models_.total_size, 'hits': self.loaded_models_.n_hits,
+                'misses': self.loaded_models_.n_misses, 'evictions': self.loaded_models_.n_evictions}
@@ -16,30 +16,70 @@ License: Apache License 2.0.
 
 """
 
+import array
 import copy
+import hashlib
+import json
+from multiprocessing.shared_memory import SharedMemory
 import os
 import random
-import tempfile
+import threading
+import weakref
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
-import tensorflow.keras.backend as K
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
-from tensorflow.keras.initializers import GlorotUniform, Orthogonal
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, LSTM, Dense, Masking
-from tensorflow.keras.utils import Sequence
-from tensorflow_addons.optimizers import RectifiedAdam, Lookahead
 from tqdm import tqdm
 import numpy as np
-from sklearn.base import BaseEstimator, ClassifierMixin
-from sklearn.utils.validation import check_is_fitted
 
+from .caching import DiskCache, LRUCache
+from .inference import InferenceEngine
+from .serialization import pack_arrays, save_arrays, unpack_arrays
+
+
+TRAINING_ATTRIBUTES = ('BestWeightsCheckpoint', 'SampledSoftmaxLoss', 'TextPairSequence')
+
+
+def __getattr__(name):
+    """ Import Keras components from the `training` module at the first access (they need TensorFlow). """
+    if name not in TRAINING_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from . import training
+    return getattr(training, name)
+
+
+def check_is_fitted(estimator, attributes):
+    """ Check that the estimator is fitted, i.e. all specified attributes are defined.
+
+    This function replaces `sklearn.utils.validation.check_is_fitted`, because the scikit-learn import is too slow for
+    the package import. The same `NotFittedError` is raised, therefore scikit-learn is imported in this case only.
+
+    :param estimator: the checked estimator.
+    :param attributes: names of attributes, which are defined by the `fit` method.
+
+    """
+    if not all(hasattr(estimator, attribute) for attribute in attributes):
+        from sklearn.exceptions import NotFittedError
+        raise NotFittedError(f"This {type(estimator).__name__} instance is not fitted yet. Call 'fit' with appropriate "
+                             f"arguments before using this estimator.")
+
+
+class Seq2SeqLSTM(object):
+    """ Sequence-to-sequence classifier, which converts one language sequence into another.
+
+    This class implements the scikit-learn estimator protocol (`get_params`, `set_params`, `score` and estimator tags)
+    without inheritance from `BaseEstimator` and `ClassifierMixin`, so TensorFlow, Keras and scikit-learn are imported
+    only when the neural network is built or trained.
+
+    """
+    UNKNOWN_TOKEN = '<unk>'
+    _estimator_type = 'classifier'
 
-class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
-    """ Sequence-to-sequence classifier, which converts one language sequence into another. """
     def __init__(self, batch_size=64, epochs=100, latent_dim=256, validation_split=0.2, grad_clipping=None,
-                 lr=0.001, weight_decay=1e-5, lowercase=True, verbose=False, random_state=None):
+                 lr=0.001, weight_decay=1e-5, lowercase=True, verbose=False, random_state=None, embedding_size=None,
+                 beam_size=1, bucketing=False, use_tf_data=False, workers=None, cache_batches=False,
+                 use_multiprocessing=False, sparse_targets=False, sampled_softmax=None, max_input_vocab=None,
+                 max_target_vocab=None, min_token_freq=1, prediction_cache_size=None, cache_encoder_states=False,
+                 prediction_cache_file=None):
         """ Create a new object with specified parameters.
 
         :param batch_size: maximal number of texts or text pairs in the single mini-batch (positive integer).
@@ -52,6 +92,54 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         :param epsilon: fuzzy factor.
         :param lowercase: need to bring all tokens of all texts to the lowercase.
         :param verbose: need to printing a training log.
+        :param random_state: seed of the random generator for weights initialization (integer or None).
+        :param embedding_size: size of token embeddings (positive integer or None). If it is None, then tokens are fed
+        into the neural network as one-hot vectors, else they are fed as integer indices via the `Embedding` layer.
+        :param beam_size: width of the beam in the beam search (positive integer). If it is 1, then the greedy decoding
+        is used for prediction.
+        :param bucketing: need to compose mini-batches from texts of similar lengths and to pad each mini-batch to its
+        own maximal length (it is used both for training and for prediction).
+        :param use_tf_data: need to feed training mini-batches via the `tf.data` pipeline, in which mini-batches are
+        built in parallel and are prefetched during training steps.
+        :param workers: number of parallel workers for building of training mini-batches (positive integer or None).
+        If it is None, then number of parallel calls in the `tf.data` pipeline is tuned automatically, and single
+        worker is used without the `tf.data` pipeline.
+        :param cache_batches: need to cache training mini-batches in memory after the first epoch (it is used with the
+        `tf.data` pipeline only, and bucketed mini-batches are not re-composed after each epoch in this case).
+        :param use_multiprocessing: need to build training mini-batches in worker processes instead of threads (it is
+        used without the `tf.data` pipeline only). Encoded texts are placed in the shared memory for these processes.
+        :param sparse_targets: need to represent desired outputs of the neural network by token indices instead of
+        one-hot vectors and to train it with the sparse categorical cross-entropy, in which padding is masked out.
+        :param sampled_softmax: number of sampled negative tokens for the sampled softmax loss (positive integer or
+        None). If it is None, then the full softmax over the target vocabulary is calculated at each training step, else
+        this number of negative tokens is sampled according to their frequencies in the training set, and desired outputs
+        are always represented by token indices. The sampled softmax is used for training only, and the evaluation loss
+        and the prediction are calculated with the full softmax.
+        :param max_input_vocab: maximal number of the most frequent tokens in the input vocabulary (positive integer or
+        None, if the input vocabulary is not limited).
+        :param max_target_vocab: maximal number of the most frequent tokens in the target vocabulary, not including the
+        start and end tokens (positive integer or None, if the target vocabulary is not limited).
+        :param min_token_freq: minimal number of occurrences of the token in training texts, which is necessary to
+        include this token into the vocabulary (positive integer).
+
+        :param prediction_cache_size: maximal number of entries in the LRU cache of predicted sequences (positive integer
+        or None, if predictions are not cached).
+        :param cache_encoder_states: if True, then final LSTM states `[h, c]` of the encoder are cached too, so they are
+        reused by the `predict_nbest` method and after eviction of predicted sequences (it is used only if the
+        `prediction_cache_size` is specified).
+        :param prediction_cache_file: name of the SQLite database file for the persistent cache of predicted sequences,
+        which is shared by all processes using the same model (or None, if predictions are not saved on the disk).
+
+        If some vocabulary is limited by its maximal size or by the minimal token frequency, then the `<unk>` token is
+        added into this vocabulary, and all pruned tokens are replaced with it both in training and in prediction.
+
+        Cached predictions are keyed by the normalized source sequence (tokens after the `tokenize_text` method with the
+        `lowercase` parameter), and the cache is cleared whenever the neural model is fitted or loaded. Predictions in
+        the persistent cache are keyed by the model fingerprint too (see the `get_model_fingerprint` method), and they
+        are invalidated automatically, when this cache is opened by the model with a new fingerprint: predictions of
+        the previous model of this object are removed, and predictions of other models are removed, if these models
+        have not used the cache for `DiskCache.STALE_MODEL_AGE` seconds (so models, which share the cache file during a
+        rolling deploy, do not erase predictions of each other).
 
         """
         self.batch_size = batch_size
@@ -64,8 +152,23 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         self.lowercase = lowercase
         self.verbose = verbose
         self.random_state = random_state
-
-    def fit(self, X, y, **kwargs):
+        self.embedding_size = embedding_size
+        self.beam_size = beam_size
+        self.bucketing = bucketing
+        self.use_tf_data = use_tf_data
+        self.workers = workers
+        self.cache_batches = cache_batches
+        self.use_multiprocessing = use_multiprocessing
+        self.sparse_targets = sparse_targets
+        self.sampled_softmax = sampled_softmax
+        self.max_input_vocab = max_input_vocab
+        self.max_target_vocab = max_target_vocab
+        self.min_token_freq = min_token_freq
+        self.prediction_cache_size = prediction_cache_size
+        self.cache_encoder_states = cache_encoder_states
+        self.prediction_cache_file = prediction_cache_file
+
+    def fit(self, X, y=None, **kwargs):
         """ Fit the seq2seq model to convert sequences one to another.
 
         Each sequence is unicode text composed from the tokens. Tokens are separated by spaces.
@@ -79,14 +182,415 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
 
         2) set an `eval_set` argument of this method, and then evaluation set is defined entirely by this argument.
 
-        :param X: input texts for training.
-        :param y: target texts for training.
+        Also, the training set can be prepared beforehand as the binary corpus file (see `TextPairCorpus`). In this
+        case `X` is a name of this file, `y` is None, and the evaluation set can be selected by `validation_split` only.
+        The corpus file is mapped into memory, therefore texts are not loaded into RAM entirely.
+
+        :param X: input texts for training, or a name of the corpus file.
+        :param y: target texts for training (or None for the corpus file).
         :param eval_set: optional argument containing input and target texts for evaluation during an early-stopping.
 
         :return self
 
         """
+        from .training import TextPairSequence
+        from tensorflow.keras.callbacks import LambdaCallback
+
         self.check_params(**self.get_params(deep=False))
+        if isinstance(X, str):
+            training_corpus, evaluation_corpus = self.load_corpus_for_training(X, y, **kwargs)
+        else:
+            training_corpus, evaluation_corpus = self.encode_texts_for_training(X, y, **kwargs)
+        training_corpus, evaluation_corpus = self.prune_vocabularies(training_corpus, evaluation_corpus)
+        max_encoder_seq_length = training_corpus.max_input_length
+        max_decoder_seq_length = training_corpus.max_target_length + 2
+        self.input_token_index_ = dict([(char, i) for i, char in enumerate(training_corpus.input_vocabulary)])
+        self.target_token_index_ = dict([(char, i) for i, char in enumerate(training_corpus.target_vocabulary)])
+        self.max_encoder_seq_length_ = max_encoder_seq_length
+        self.max_decoder_seq_length_ = max_decoder_seq_length
+        if self.verbose:
+            self.print_data_description(len(training_corpus),
+                                        None if evaluation_corpus is None else len(evaluation_corpus))
+        if self.sampled_softmax is None:
+            target_token_frequencies = None
+        else:
+            target_token_frequencies = training_corpus.target_texts.count_tokens(len(self.target_token_index_))
+            target_token_frequencies[self.target_token_index_['\n']] += len(training_corpus)
+        if self.use_multiprocessing and (not self.use_tf_data):
+            training_corpus, evaluation_corpus = self.share_corpora(training_corpus, evaluation_corpus)
+        try:
+            training_set_generator = TextPairSequence(
+                input_texts=training_corpus.input_texts, target_texts=training_corpus.target_texts,
+                batch_size=self.batch_size,
+                max_encoder_seq_length=max_encoder_seq_length, max_decoder_seq_length=max_decoder_seq_length,
+                input_token_index=self.input_token_index_, target_token_index=self.target_token_index_,
+                lowercase=self.lowercase, use_token_ids=(self.embedding_size is not None), bucketing=self.bucketing,
+                sparse_targets=(self.sparse_targets or (self.sampled_softmax is not None)),
+                targets_as_inputs=(self.sampled_softmax is not None)
+            )
+            if evaluation_corpus is not None:
+                evaluation_set_generator = TextPairSequence(
+                    input_texts=evaluation_corpus.input_texts, target_texts=evaluation_corpus.target_texts,
+                    batch_size=self.batch_size,
+                    max_encoder_seq_length=max_encoder_seq_length, max_decoder_seq_length=max_decoder_seq_length,
+                    input_token_index=self.input_token_index_, target_token_index=self.target_token_index_,
+                    lowercase=self.lowercase, use_token_ids=(self.embedding_size is not None),
+                    bucketing=self.bucketing, sparse_targets=(self.sparse_targets or (self.sampled_softmax is not None)),
+                    targets_as_inputs=(self.sampled_softmax is not None)
+                )
+            else:
+                evaluation_set_generator = None
+            if not self.use_tf_data:
+                return self.train_neural_network(training_set_generator, evaluation_set_generator,
+                                                 target_token_frequencies=target_token_frequencies)
+            callbacks = []
+            if self.bucketing and (not self.cache_batches):
+                callbacks.append(
+                    LambdaCallback(on_epoch_end=lambda epoch, logs: training_set_generator.on_epoch_end())
+                )
+            return self.train_neural_network(
+                training_set_generator=training_set_generator.as_dataset(self.workers, self.cache_batches),
+                evaluation_set_generator=(None if evaluation_set_generator is None else
+                                          evaluation_set_generator.as_dataset(self.workers, self.cache_batches)),
+                callbacks=callbacks, target_token_frequencies=target_token_frequencies
+            )
+        finally:
+            for corpus in [training_corpus, evaluation_corpus]:
+                if corpus is not None:
+                    corpus.input_texts.release()
+                    corpus.target_texts.release()
+
+    def prune_vocabularies(self, training_corpus, evaluation_corpus=None):
+        """ Prune rare tokens from vocabularies according to `max_input_vocab`, `max_target_vocab` and `min_token_freq`.
+
+        Token frequencies are counted in encoded texts of the training corpus, and all pruned tokens are replaced with
+        the `<unk>` token in both corpora. If vocabularies are not limited, then corpora are returned without changes.
+
+        :param training_corpus: the `TextPairCorpus` object for training.
+        :param evaluation_corpus: the `TextPairCorpus` object for evaluation (or None).
+
+        :return the two-element tuple of `TextPairCorpus` objects for training and evaluation.
+
+        """
+        vocabularies = []
+        index_mappings = []
+        for vocabulary, encoded_texts, special_tokens, max_vocabulary_size in (
+                (training_corpus.input_vocabulary, training_corpus.input_texts, (), self.max_input_vocab),
+                (training_corpus.target_vocabulary, training_corpus.target_texts, ('\t', '\n'), self.max_target_vocab)
+        ):
+            if (max_vocabulary_size is None) and (self.min_token_freq <= 1):
+                vocabularies.append(vocabulary)
+                index_mappings.append(None)
+                continue
+            new_vocabulary = self.build_vocabulary(
+                vocabulary, dict(zip(vocabulary, encoded_texts.count_tokens(len(vocabulary)).tolist())),
+                special_tokens, max_vocabulary_size, self.min_token_freq
+            )
+            vocabularies.append(new_vocabulary)
+            if new_vocabulary == list(vocabulary):
+                index_mappings.append(None)
+            else:
+                new_token_index = dict([(char, i) for i, char in enumerate(new_vocabulary)])
+                index_mappings.append(EncodedTexts.get_index_mapping(
+                    dict([(char, i) for i, char in enumerate(vocabulary)]), new_token_index,
+                    new_token_index[self.UNKNOWN_TOKEN]
+                ))
+        if all([index_mapping is None for index_mapping in index_mappings]):
+            return training_corpus, evaluation_corpus
+        pruned_corpora = []
+        for corpus in [training_corpus, evaluation_corpus]:
+            if corpus is None:
+                pruned_corpora.append(None)
+                continue
+            pruned_corpora.append(TextPairCorpus(
+                input_texts=(corpus.input_texts if index_mappings[0] is None else
+                             corpus.input_texts.remap(index_mappings[0])),
+                target_texts=(corpus.target_texts if index_mappings[1] is None else
+                              corpus.target_texts.remap(index_mappings[1])),
+                input_vocabulary=vocabularies[0], target_vocabulary=vocabularies[1],
+                max_input_length=corpus.max_input_length, max_target_length=corpus.max_target_length,
+                lowercase=corpus.lowercase
+            ))
+        return pruned_corpora[0], pruned_corpora[1]
+
+    @staticmethod
+    def build_vocabulary(tokens, token_counts=None, special_tokens=(), max_vocabulary_size=None, min_token_freq=1):
+        """ Build the sorted vocabulary from tokens, pruning rare tokens if the vocabulary is limited.
+
+        If `max_vocabulary_size` is None and `min_token_freq` is 1, then all tokens are included into the vocabulary.
+        Else tokens, which occur less than `min_token_freq` times, are pruned, `max_vocabulary_size` most frequent tokens
+        of remaining ones are selected (ties are broken by tokens themselves), and the `<unk>` token is added.
+
+        :param tokens: all tokens, which are candidates for the vocabulary.
+        :param token_counts: dictionary, whose keys are tokens and values are numbers of their occurrences in training
+        texts (it can be None, if the vocabulary is not limited).
+        :param special_tokens: tokens, which are always included into the vocabulary and are not counted in its size.
+        :param max_vocabulary_size: maximal number of selected tokens (positive integer or None).
+        :param min_token_freq: minimal number of occurrences of the selected token (positive integer).
+
+        :return sorted list of tokens.
+
+        """
+        if (max_vocabulary_size is None) and (min_token_freq <= 1):
+            return sorted(list(set(tokens) | set(special_tokens)))
+        selected_tokens = [cur_token for cur_token in tokens
+                           if (token_counts.get(cur_token, 0) >= min_token_freq) and (cur_token not in special_tokens)
+                           and (cur_token != Seq2SeqLSTM.UNKNOWN_TOKEN)]
+        if (max_vocabulary_size is not None) and (len(selected_tokens) > max_vocabulary_size):
+            selected_tokens = sorted(selected_tokens,
+                                     key=lambda cur_token: (-token_counts[cur_token], cur_token))[0:max_vocabulary_size]
+        return sorted(list(set(selected_tokens) | set(special_tokens) | {Seq2SeqLSTM.UNKNOWN_TOKEN}))
+
+    @staticmethod
+    def share_corpora(training_corpus, evaluation_corpus=None):
+        """ Place encoded texts of training and evaluation corpora into the shared memory for worker processes.
+
+        Texts from the corpus file are not copied, because worker processes can map this file themselves.
+
+        :param training_corpus: the `TextPairCorpus` object for training.
+        :param evaluation_corpus: the `TextPairCorpus` object for evaluation (or None).
+
+        :return the two-element tuple of `TextPairCorpus` objects for training and evaluation.
+
+        """
+        shared_corpora = []
+        for corpus in [training_corpus, evaluation_corpus]:
+            if (corpus is None) or (corpus.input_texts.storage is not None):
+                shared_corpora.append(corpus)
+                continue
+            shared_input_texts = corpus.input_texts.share()
+            try:
+                shared_target_texts = corpus.target_texts.share()
+            except:
+                shared_input_texts.release()
+                for shared_corpus in shared_corpora:
+                    if shared_corpus is not None:
+                        shared_corpus.input_texts.release()
+                        shared_corpus.target_texts.release()
+                raise
+            shared_corpora.append(TextPairCorpus(
+                input_texts=shared_input_texts, target_texts=shared_target_texts,
+                input_vocabulary=corpus.input_vocabulary, target_vocabulary=corpus.target_vocabulary,
+                max_input_length=corpus.max_input_length, max_target_length=corpus.max_target_length,
+                lowercase=corpus.lowercase
+            ))
+        return shared_corpora[0], shared_corpora[1]
+
+    def fit_stream(self, text_pairs, eval_set=None):
+        """ Fit the seq2seq model on the stream of text pairs, which is read by chunks and is not loaded into memory.
+
+        Text pairs are read from the TSV file (each line of this file contains input and target texts separated by the
+        tab character, and it is assumed that this file has the UTF-8 encoding) or from any re-iterable object (for
+        example, a list or other object, whose `__iter__` method starts a new iteration at each call), which yields
+        two-element tuples of input and target texts. The first pass over text pairs builds vocabularies and calculates
+        maximal lengths of texts, and after that each training epoch reads text pairs again chunk by chunk. Text pairs
+        are shuffled within a chunk only, and if the `bucketing` parameter is True, then mini-batches are composed from
+        text pairs of similar lengths within a chunk.
+
+        The evaluation set for an early stopping is defined by the `eval_set` argument (it is the TSV file or the
+        re-iterable object too), or it is selected as the last part of text pairs proportionally to the
+        `validation_split` value.
+
+        :param text_pairs: name of the TSV file or re-iterable object with text pairs for training.
+        :param eval_set: optional name of the TSV file or re-iterable object with text pairs for evaluation.
+
+        :return self
+
+        """
+        self.check_params(**self.get_params(deep=False))
+        training_stream = TextPairStream(text_pairs, 'text_pairs')
+        input_token_index = dict()
+        target_token_index = dict()
+        input_token_counts = dict()
+        target_token_counts = dict()
+        n_training_samples, max_input_length, max_target_length = training_stream.scan(
+            input_token_index, target_token_index, self.lowercase, input_token_counts, target_token_counts
+        )
+        training_range = (0, n_training_samples)
+        if eval_set is not None:
+            evaluation_stream = TextPairStream(eval_set, 'eval_set')
+            n_evaluation_samples, max_input_length_, max_target_length_ = evaluation_stream.scan(
+                input_token_index, target_token_index, self.lowercase
+            )
+            max_input_length = max(max_input_length, max_input_length_)
+            max_target_length = max(max_target_length, max_target_length_)
+            evaluation_range = (0, n_evaluation_samples)
+        elif self.validation_split is None:
+            evaluation_stream = None
+            evaluation_range = None
+        else:
+            n_evaluation_samples = self.calculate_size_of_evaluation_set(n_training_samples)
+            evaluation_stream = training_stream
+            evaluation_range = (n_training_samples - n_evaluation_samples, n_training_samples)
+            training_range = (0, n_training_samples - n_evaluation_samples)
+        self.input_token_index_ = dict([(char, i) for i, char in enumerate(self.build_vocabulary(
+            input_token_index.keys(), input_token_counts, (), self.max_input_vocab, self.min_token_freq
+        ))])
+        self.target_token_index_ = dict([(char, i) for i, char in enumerate(self.build_vocabulary(
+            target_token_index.keys(), target_token_counts, ('\t', '\n'), self.max_target_vocab, self.min_token_freq
+        ))])
+        self.max_encoder_seq_length_ = max_input_length
+        self.max_decoder_seq_length_ = max_target_length + 2
+        if self.sampled_softmax is None:
+            target_token_frequencies = None
+        else:
+            target_token_frequencies = np.zeros((len(self.target_token_index_),), dtype=np.int64)
+            unknown_token_idx = self.target_token_index_.get(self.UNKNOWN_TOKEN)
+            for cur_token, token_count in target_token_counts.items():
+                target_token_frequencies[self.target_token_index_.get(cur_token, unknown_token_idx)] += token_count
+            target_token_frequencies[self.target_token_index_['\n']] += n_training_samples
+        del input_token_index, target_token_index, input_token_counts, target_token_counts
+        if self.verbose:
+            self.print_data_description(training_range[1] - training_range[0],
+                                        None if evaluation_range is None else evaluation_range[1] - evaluation_range[0])
+        if evaluation_stream is None:
+            evaluation_set_generator = None
+            validation_steps = None
+        else:
+            evaluation_set_generator = self.generate_batches_from_stream(evaluation_stream, *evaluation_range)
+            validation_steps = TextPairStream.calculate_number_of_batches(evaluation_range[1] - evaluation_range[0],
+                                                                          self.batch_size)
+        return self.train_neural_network(
+            training_set_generator=self.generate_batches_from_stream(training_stream, *training_range),
+            evaluation_set_generator=evaluation_set_generator,
+            steps_per_epoch=TextPairStream.calculate_number_of_batches(training_range[1] - training_range[0],
+                                                                       self.batch_size),
+            validation_steps=validation_steps, target_token_frequencies=target_token_frequencies
+        )
+
+    def generate_batches_from_stream(self, stream, start, end):
+        """ Generate training mini-batches from text pairs of the stream infinitely, epoch by epoch.
+
+        :param stream: the `TextPairStream` object.
+        :param start: index of the first used text pair in the stream.
+        :param end: index of the text pair after the last used one.
+
+        :return the two-element tuple with input and output mini-batch data for the neural model training respectively.
+
+        """
+        from .training import TextPairSequence
+
+        while True:
+            for input_texts, target_texts in stream.read_chunks(start, end,
+                                                                self.batch_size * TextPairStream.BATCHES_PER_CHUNK):
+                text_pair_indices = list(range(len(input_texts)))
+                random.shuffle(text_pair_indices)
+                chunk_generator = TextPairSequence(
+                    input_texts=[input_texts[idx] for idx in text_pair_indices],
+                    target_texts=[target_texts[idx] for idx in text_pair_indices],
+                    batch_size=self.batch_size,
+                    max_encoder_seq_length=self.max_encoder_seq_length_,
+                    max_decoder_seq_length=self.max_decoder_seq_length_,
+                    input_token_index=self.input_token_index_, target_token_index=self.target_token_index_,
+                    lowercase=self.lowercase, use_token_ids=(self.embedding_size is not None),
+                    bucketing=self.bucketing, sparse_targets=(self.sparse_targets or (self.sampled_softmax is not None)),
+                    targets_as_inputs=(self.sampled_softmax is not None)
+                )
+                del input_texts, target_texts
+                batch_indices = list(range(len(chunk_generator)))
+                random.shuffle(batch_indices)
+                for batch_idx in batch_indices:
+                    yield chunk_generator[batch_idx]
+
+    def print_data_description(self, n_training_samples, n_evaluation_samples=None):
+        """ Print numbers of samples, sizes of vocabularies and maximal lengths of sequences before training.
+
+        :param n_training_samples: number of samples for training.
+        :param n_evaluation_samples: number of samples for evaluation (or None, if there is no evaluation set).
+
+        """
+        print('')
+        print(f'Number of samples for training: {n_training_samples}.')
+        if n_evaluation_samples is not None:
+            print(f'Number of samples for evaluation and early stopping: {n_evaluation_samples}.')
+        print(f'Number of unique input tokens: {len(self.input_token_index_)}.')
+        print(f'Number of unique output tokens: {len(self.target_token_index_)}.')
+        print(f'Max sequence length for inputs: {self.max_encoder_seq_length_}.')
+        print(f'Max sequence length for outputs: {self.max_decoder_seq_length_}.')
+        print('')
+
+    def train_neural_network(self, training_set_generator, evaluation_set_generator=None, steps_per_epoch=None,
+                             validation_steps=None, callbacks=None, target_token_frequencies=None):
+        """ Build the neural model and train it on mini-batches from the specified generators.
+
+        Vocabularies and maximal lengths of sequences must be defined before the training.
+
+        :param training_set_generator: generator of mini-batches for training (the `TextPairSequence` object, the
+        `tf.data.Dataset` object or an infinite Python generator).
+        :param evaluation_set_generator: generator of mini-batches for evaluation during an early-stopping (or None).
+        :param steps_per_epoch: number of training mini-batches per epoch (it is necessary for Python generators only).
+        :param validation_steps: number of evaluation mini-batches (it is necessary for Python generators only).
+        :param callbacks: list of additional Keras callbacks (or None).
+        :param target_token_frequencies: numbers of occurrences of target tokens in the training set for the sampled
+        softmax (1-D array or None).
+
+        :return self
+
+        """
+        from tensorflow.keras.callbacks import EarlyStopping
+        from tensorflow.keras.losses import SparseCategoricalCrossentropy
+        from tensorflow.keras.utils import Sequence
+        from tensorflow_addons.optimizers import RectifiedAdam, Lookahead
+        from .training import BestWeightsCheckpoint
+
+        model, encoder_model, decoder_model = self.build_neural_network(target_token_frequencies)
+        radam = RectifiedAdam(learning_rate=self.lr, weight_decay=self.weight_decay)
+        optimizer = Lookahead(radam, sync_period=6, slow_step_size=0.5)
+        if self.sampled_softmax is not None:
+            model.compile(optimizer=optimizer, loss=None)
+        elif self.sparse_targets:
+            model.compile(optimizer=optimizer, loss=SparseCategoricalCrossentropy(ignore_class=-1))
+        else:
+            model.compile(optimizer=optimizer, loss='categorical_crossentropy')
+        if self.verbose:
+            model.summary(positions=[0.23, 0.77, 0.85, 1.0])
+            print('')
+        callbacks = [] if callbacks is None else list(callbacks)
+        if evaluation_set_generator is not None:
+            callbacks.append(
+                EarlyStopping(patience=5, verbose=(1 if self.verbose else 0), monitor='val_loss')
+            )
+        checkpoint = BestWeightsCheckpoint(monitor='loss' if evaluation_set_generator is None else 'val_loss',
+                                           verbose=(1 if self.verbose else 0))
+        callbacks.append(checkpoint)
+        if isinstance(training_set_generator, Sequence):
+            workers = 1 if self.workers is None else self.workers
+            use_multiprocessing = bool(self.use_multiprocessing)
+        else:
+            workers = 1
+            use_multiprocessing = False
+        model.fit_generator(
+            generator=training_set_generator,
+            steps_per_epoch=steps_per_epoch,
+            epochs=self.epochs, verbose=(1 if self.verbose else 0),
+            shuffle=True,
+            validation_data=evaluation_set_generator,
+            validation_steps=validation_steps,
+            callbacks=callbacks,
+            workers=workers, use_multiprocessing=use_multiprocessing
+        )
+        if checkpoint.best_weights is not None:
+            model.set_weights(checkpoint.best_weights)
+        self.release_inference_models()
+        self.encoder_model_ = encoder_model
+        self.decoder_model_ = decoder_model
+        self.encoder_function_, self.decoder_function_ = self.build_inference_functions(encoder_model, decoder_model)
+        self.reset_prediction_cache()
+        self.reverse_target_char_index_ = dict(
+            (i, char) for char, i in self.target_token_index_.items())
+        return self
+
+    def encode_texts_for_training(self, X, y, **kwargs):
+        """ Check texts for training and evaluation, build vocabularies and encode all texts by these vocabularies.
+
+        :param X: input texts for training.
+        :param y: target texts for training.
+        :param eval_set: optional argument containing input and target texts for evaluation during an early-stopping.
+
+        :return the two-element tuple of `TextPairCorpus` objects for training and evaluation (the second item is None,
+        if there is no evaluation set).
+
+        """
         self.check_X(X, 'X')
         self.check_X(y, 'y')
         if len(X) != len(y):
@@ -108,173 +612,104 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
                 X_eval_set = None
                 y_eval_set = None
             else:
-                n_eval_set = int(round(len(X) * self.validation_split))
-                if n_eval_set < 1:
-                    raise ValueError('`validation_split` is too small! There are no samples for evaluation!')
-                if n_eval_set >= len(X):
-                    raise ValueError('`validation_split` is too large! There are no samples for training!')
+                n_eval_set = self.calculate_size_of_evaluation_set(len(X))
                 X_eval_set = X[-n_eval_set:-1]
                 y_eval_set = y[-n_eval_set:-1]
                 X = X[:-n_eval_set]
                 y = y[:-n_eval_set]
-        input_characters = set()
-        target_characters = set()
-        max_encoder_seq_length = 0
-        max_decoder_seq_length = 0
-        for sample_ind in range(len(X)):
-            prep = self.tokenize_text(X[sample_ind], self.lowercase)
-            n = len(prep)
-            if n == 0:
-                raise ValueError(f'Sample {sample_ind} of `X` is wrong! This sample is empty.')
-            if n > max_encoder_seq_length:
-                max_encoder_seq_length = n
-            input_characters |= set(prep)
-            prep = self.tokenize_text(y[sample_ind], self.lowercase)
-            n = len(prep)
-            if n == 0:
-                raise ValueError(f'Sample {sample_ind} of `y` is wrong! This sample is empty.')
-            if (n + 2) > max_decoder_seq_length:
-                max_decoder_seq_length = n + 2
-            target_characters |= set(prep)
-        if len(input_characters) == 0:
-            raise ValueError('`X` is empty!')
-        if len(target_characters) == 0:
-            raise ValueError('`y` is empty!')
-        input_characters_ = set()
-        target_characters_ = set()
+        input_token_index = dict()
+        target_token_index = dict()
+        encoded_X = EncodedTexts.encode(X, input_token_index, self.lowercase, update_index=True)
+        encoded_y = EncodedTexts.encode(y, target_token_index, self.lowercase, update_index=True)
+        self.check_encoded_texts(encoded_X, 'X')
+        self.check_encoded_texts(encoded_y, 'y')
+        max_input_length = int(encoded_X.get_lengths().max())
+        max_target_length = int(encoded_y.get_lengths().max())
         if (X_eval_set is not None) and (y_eval_set is not None):
-            for sample_ind in range(len(X_eval_set)):
-                prep = self.tokenize_text(X_eval_set[sample_ind], self.lowercase)
-                n = len(prep)
-                if n == 0:
-                    raise ValueError(f'Sample {sample_ind} of `X_eval_set` is wrong! This sample is empty.')
-                if n > max_encoder_seq_length:
-                    max_encoder_seq_length = n
-                input_characters_ |= set(prep)
-                prep = self.tokenize_text(y_eval_set[sample_ind], self.lowercase)
-                n = len(prep)
-                if n == 0:
-                    raise ValueError(f'Sample {sample_ind} of `y_eval_set` is wrong! This sample is empty.')
-                if (n + 2) > max_decoder_seq_length:
-                    max_decoder_seq_length = n + 2
-                target_characters_ |= set(prep)
-            if len(input_characters_) == 0:
-                raise ValueError('`X_eval_set` is empty!')
-            if len(target_characters_) == 0:
-                raise ValueError('`y_eval_set` is empty!')
-        input_characters = sorted(list(input_characters | input_characters_))
-        target_characters = sorted(list(target_characters | target_characters_ | {'\t', '\n'}))
-        if self.verbose:
-            print('')
-            print(f'Number of samples for training: {len(X)}.')
-            if X_eval_set is not None:
-                print(f'Number of samples for evaluation and early stopping: {len(X_eval_set)}.')
-            print(f'Number of unique input tokens: {len(input_characters)}.')
-            print(f'Number of unique output tokens: {len(target_characters)}.')
-            print(f'Max sequence length for inputs: {max_encoder_seq_length}.')
-            print(f'Max sequence length for outputs: {max_decoder_seq_length}.')
-            print('')
-        self.input_token_index_ = dict([(char, i) for i, char in enumerate(input_characters)])
-        self.target_token_index_ = dict([(char, i) for i, char in enumerate(target_characters)])
-        self.max_encoder_seq_length_ = max_encoder_seq_length
-        self.max_decoder_seq_length_ = max_decoder_seq_length
-        K.clear_session()
-        encoder_inputs = Input(shape=(None, len(self.input_token_index_)),
-                               name='EncoderInputs')
-        encoder_mask = Masking(name='EncoderMask', mask_value=0.0)(encoder_inputs)
-        encoder = LSTM(
-            self.latent_dim,
-            return_sequences=False, return_state=True,
-            kernel_initializer=GlorotUniform(seed=self.generate_random_seed()),
-            recurrent_initializer=Orthogonal(seed=self.generate_random_seed()),
-            name='EncoderLSTM'
-        )
-        encoder_outputs, state_h, state_c = encoder(encoder_mask)
-        encoder_states = [state_h, state_c]
-        decoder_inputs = Input(shape=(None, len(self.target_token_index_)),
-                               name='DecoderInputs')
-        decoder_mask = Masking(name='DecoderMask', mask_value=0.0)(decoder_inputs)
-        decoder_lstm = LSTM(
-            self.latent_dim,
-            return_sequences=True, return_state=True,
-            kernel_initializer=GlorotUniform(seed=self.generate_random_seed()),
-            recurrent_initializer=Orthogonal(seed=self.generate_random_seed()),
-            name='DecoderLSTM'
+            encoded_X_eval_set = EncodedTexts.encode(X_eval_set, input_token_index, self.lowercase, update_index=True)
+            encoded_y_eval_set = EncodedTexts.encode(y_eval_set, target_token_index, self.lowercase,
+                                                     update_index=True)
+            self.check_encoded_texts(encoded_X_eval_set, 'X_eval_set')
+            self.check_encoded_texts(encoded_y_eval_set, 'y_eval_set')
+            max_input_length = max(max_input_length, int(encoded_X_eval_set.get_lengths().max()))
+            max_target_length = max(max_target_length, int(encoded_y_eval_set.get_lengths().max()))
+        else:
+            encoded_X_eval_set = None
+            encoded_y_eval_set = None
+        input_vocabulary = sorted(list(input_token_index.keys()))
+        target_vocabulary = sorted(list(set(target_token_index.keys()) | {'\t', '\n'}))
+        input_index_mapping = EncodedTexts.get_index_mapping(
+            input_token_index, dict([(char, i) for i, char in enumerate(input_vocabulary)])
         )
-        decoder_outputs, _, _ = decoder_lstm(decoder_mask, initial_state=encoder_states)
-        decoder_dense = Dense(
-            len(self.target_token_index_), activation='softmax',
-            kernel_initializer=GlorotUniform(seed=self.generate_random_seed()),
-            name='DecoderOutput'
+        target_index_mapping = EncodedTexts.get_index_mapping(
+            target_token_index, dict([(char, i) for i, char in enumerate(target_vocabulary)])
         )
-        decoder_outputs = decoder_dense(decoder_outputs)
-        model = Model([encoder_inputs, decoder_inputs], decoder_outputs,
-                      name='Seq2SeqModel')
-        radam = RectifiedAdam(learning_rate=self.lr, weight_decay=self.weight_decay)
-        optimizer = Lookahead(radam, sync_period=6, slow_step_size=0.5)
-        model.compile(optimizer=optimizer, loss='categorical_crossentropy')
-        if self.verbose:
-            model.summary(positions=[0.23, 0.77, 0.85, 1.0])
-            print('')
-        training_set_generator = TextPairSequence(
-            input_texts=X, target_texts=y,
-            batch_size=self.batch_size,
-            max_encoder_seq_length=max_encoder_seq_length, max_decoder_seq_length=max_decoder_seq_length,
-            input_token_index=self.input_token_index_, target_token_index=self.target_token_index_,
-            lowercase=self.lowercase
+        training_corpus = TextPairCorpus(
+            input_texts=encoded_X.remap(input_index_mapping), target_texts=encoded_y.remap(target_index_mapping),
+            input_vocabulary=input_vocabulary, target_vocabulary=target_vocabulary,
+            max_input_length=max_input_length, max_target_length=max_target_length, lowercase=self.lowercase
         )
-        if (X_eval_set is not None) and (y_eval_set is not None):
-            evaluation_set_generator = TextPairSequence(
-                input_texts=X_eval_set, target_texts=y_eval_set,
-                batch_size=self.batch_size,
-                max_encoder_seq_length=max_encoder_seq_length, max_decoder_seq_length=max_decoder_seq_length,
-                input_token_index=self.input_token_index_, target_token_index=self.target_token_index_,
-                lowercase=self.lowercase
+        if (encoded_X_eval_set is not None) and (encoded_y_eval_set is not None):
+            evaluation_corpus = TextPairCorpus(
+                input_texts=encoded_X_eval_set.remap(input_index_mapping),
+                target_texts=encoded_y_eval_set.remap(target_index_mapping),
+                input_vocabulary=input_vocabulary, target_vocabulary=target_vocabulary,
+                max_input_length=max_input_length, max_target_length=max_target_length, lowercase=self.lowercase
             )
-            callbacks = [
-                EarlyStopping(patience=5, verbose=(1 if self.verbose else 0), monitor='val_loss')
-            ]
         else:
-            evaluation_set_generator = None
-            callbacks = []
-        tmp_weights_name = self.get_temp_name()
-        try:
-            callbacks.append(
-                ModelCheckpoint(filepath=tmp_weights_name, verbose=(1 if self.verbose else 0), save_best_only=True,
-                                save_weights_only=True,
-                                monitor='loss' if evaluation_set_generator is None else 'val_loss')
-            )
-            model.fit_generator(
-                generator=training_set_generator,
-                epochs=self.epochs, verbose=(1 if self.verbose else 0),
-                shuffle=True,
-                validation_data=evaluation_set_generator,
-                callbacks=callbacks
-            )
-            if os.path.isfile(tmp_weights_name):
-                model.load_weights(tmp_weights_name)
-        finally:
-            if os.path.isfile(tmp_weights_name):
-                os.remove(tmp_weights_name)
-        self.encoder_model_ = Model(encoder_inputs, encoder_states)
-        decoder_state_input_h = Input(shape=(self.latent_dim,))
-        decoder_state_input_c = Input(shape=(self.latent_dim,))
-        decoder_states_inputs = [decoder_state_input_h, decoder_state_input_c]
-        decoder_outputs, state_h, state_c = decoder_lstm(
-            decoder_mask, initial_state=decoder_states_inputs)
-        decoder_states = [state_h, state_c]
-        decoder_outputs = decoder_dense(decoder_outputs)
-        self.decoder_model_ = Model(
-            [decoder_inputs] + decoder_states_inputs,
-            [decoder_outputs] + decoder_states)
-        self.reverse_target_char_index_ = dict(
-            (i, char) for char, i in self.target_token_index_.items())
-        return self
+            evaluation_corpus = None
+        return training_corpus, evaluation_corpus
+
+    def load_corpus_for_training(self, file_name, y=None, **kwargs):
+        """ Load the binary corpus file with memory mapping and split it into training and evaluation sets.
+
+        :param file_name: name of the corpus file, which was created by `TextPairCorpus.save`.
+        :param y: it must be None, because target texts are stored in the corpus file.
+
+        :return the two-element tuple of `TextPairCorpus` objects for training and evaluation (the second item is None,
+        if `validation_split` is None).
+
+        """
+        if y is not None:
+            raise ValueError('`y` must be None, if `X` is a name of the corpus file!')
+        if 'eval_set' in kwargs:
+            raise ValueError('`eval_set` cannot be used with the corpus file! Use the `validation_split` instead.')
+        if not os.path.isfile(file_name):
+            raise ValueError(f'The corpus file "{file_name}" does not exist!')
+        corpus = TextPairCorpus.load(file_name)
+        if corpus.lowercase != self.lowercase:
+            raise ValueError(f'The corpus file "{file_name}" does not correspond to the `lowercase` parameter! '
+                             f'{corpus.lowercase} != {self.lowercase}.')
+        if self.validation_split is None:
+            return corpus, None
+        n_eval_set = self.calculate_size_of_evaluation_set(len(corpus))
+        return corpus.subset(0, len(corpus) - n_eval_set), corpus.subset(len(corpus) - n_eval_set, len(corpus))
+
+    def calculate_size_of_evaluation_set(self, n_samples):
+        """ Calculate number of samples, which are selected for evaluation according to the `validation_split`.
+
+        :param n_samples: total number of samples.
+
+        :return number of samples for evaluation.
+
+        """
+        n_eval_set = int(round(n_samples * self.validation_split))
+        if n_eval_set < 1:
+            raise ValueError('`validation_split` is too small! There are no samples for evaluation!')
+        if n_eval_set >= n_samples:
+            raise ValueError('`validation_split` is too large! There are no samples for training!')
+        return n_eval_set
 
     def predict(self, X):
         """ Predict resulting sequences of tokens by source sequences with a trained seq2seq model.
 
-        Each sequence is unicode text composed from the tokens. Tokens are separated by spaces.
+        Each sequence is unicode text composed from the tokens. Tokens are separated by spaces. If the `beam_size`
+        parameter is greater than 1, then the best hypothesis of the beam search is selected for each source sequence,
+        else the greedy decoding is used.
+
+        Source sequences, which are identical after the normalization (see the `get_cache_key` method), are decoded only
+        once, and if the `prediction_cache_size` parameter is specified, then resulting sequences are taken from the LRU
+        cache or saved into it.
 
         :param X: source sequences.
 
@@ -284,158 +719,710 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         self.check_X(X, 'X')
         check_is_fitted(self, ['input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
                                'max_encoder_seq_length_', 'max_decoder_seq_length_',
-                               'encoder_model_', 'decoder_model_'])
-        texts = list()
-        n_samples = X.shape[0] if isinstance(X, np.ndarray) else len(X)
-        n_batches = int(np.ceil(n_samples / float(self.batch_size)))
-        bounds_of_batches = [
-            (
-                idx * self.batch_size,
-                min(n_samples, (idx + 1) * self.batch_size)
-            ) for idx in range(n_batches)
-        ]
-        for batch_start, batch_end in (tqdm(bounds_of_batches) if self.verbose else bounds_of_batches):
-            input_seq = Seq2SeqLSTM.generate_data_for_prediction(
-                input_texts=X, batch_start=batch_start, batch_end=batch_end,
-                max_encoder_seq_length=self.max_encoder_seq_length_,
-                input_token_index=self.input_token_index_,
-                lowercase=self.lowercase
-            )
-            batch_size = batch_end - batch_start
-            states_value = self.encoder_model_.predict(input_seq)
-            target_seq = np.zeros(
-                (batch_size, 1, len(self.target_token_index_)),
-                dtype=np.float32)
-            stop_conditions = []
-            decoded_sentences = []
-            for text_idx in range(batch_size):
-                target_seq[text_idx, 0, self.target_token_index_['\t']] = 1.0
-                stop_conditions.append(False)
-                decoded_sentences.append([])
-            while not all(stop_conditions):
-                output_tokens, h, c = self.decoder_model_.predict(
-                    [target_seq] + states_value)
-                indices_of_sampled_tokens = np.argmax(output_tokens[:, -1, :],
-                                                      axis=1)
-                for text_idx in range(batch_size):
-                    if stop_conditions[text_idx]:
-                        continue
-                    sampled_char = self.reverse_target_char_index_[
-                        indices_of_sampled_tokens[text_idx]]
-                    decoded_sentences[text_idx].append(sampled_char)
-                    if (sampled_char == '\n') or (len(decoded_sentences[text_idx]) > self.max_decoder_seq_length_):
-                        stop_conditions[text_idx] = True
-                    for token_idx in range(len(self.target_token_index_)):
-                        target_seq[text_idx][0][token_idx] = 0.0
-                    target_seq[
-                        text_idx, 0, indices_of_sampled_tokens[text_idx]] = 1.0
-                states_value = [h, c]
-            for text_idx in range(batch_size):
-                texts.append(' '.join(decoded_sentences[text_idx]))
+                               'encoder_function_', 'decoder_function_'])
+        cache_keys = [self.get_cache_key(X[text_idx])
+                      for text_idx in range(X.shape[0] if isinstance(X, np.ndarray) else len(X))]
+        prediction_cache = self.get_prediction_cache()
+        predicted_texts = dict()
+        texts_for_decoding = []
+        keys_for_decoding = []
+        for text_idx, cache_key in enumerate(cache_keys):
+            if cache_key in predicted_texts:
+                continue
+            predicted_text = None if prediction_cache is None else \
+                prediction_cache.get(('prediction', self.beam_size, cache_key))
+            predicted_texts[cache_key] = predicted_text
+            if predicted_text is None:
+                texts_for_decoding.append(X[text_idx])
+                keys_for_decoding.append(cache_key)
+        disk_cache = self.get_disk_cache()
+        if (disk_cache is not None) and (len(keys_for_decoding) > 0):
+            found = disk_cache.get_many(self.get_model_fingerprint(),
+                                        [json.dumps([self.beam_size, cur], ensure_ascii=False)
+                                         for cur in keys_for_decoding])
+            if len(found) > 0:
+                not_found = []
+                for text_idx, cache_key in enumerate(keys_for_decoding):
+                    predicted_text = found.get(json.dumps([self.beam_size, cache_key], ensure_ascii=False))
+                    if predicted_text is None:
+                        not_found.append(text_idx)
+                    else:
+                        predicted_texts[cache_key] = predicted_text
+                        if prediction_cache is not None:
+                            prediction_cache.put(('prediction', self.beam_size, cache_key), predicted_text)
+                texts_for_decoding = [texts_for_decoding[text_idx] for text_idx in not_found]
+                keys_for_decoding = [keys_for_decoding[text_idx] for text_idx in not_found]
+        target_vocabulary = self.get_target_vocabulary()
+        for text_indices, input_seq in (self.generate_batches_for_prediction(texts_for_decoding)
+                                        if len(texts_for_decoding) > 0 else []):
+            encoder_states = self.encode(input_seq, [keys_for_decoding[text_idx] for text_idx in text_indices])
+            if self.beam_size > 1:
+                decoded_texts = [' '.join(target_vocabulary[hypotheses[0][0]]) for hypotheses in
+                                 self.decode_by_beam_search(input_seq, self.beam_size, 1, encoder_states)]
+            else:
+                decoded_texts = [' '.join(target_vocabulary[decoded_indices])
+                                 for decoded_indices in self.decode_greedily(input_seq, encoder_states)]
+            for text_idx, predicted_text in zip(text_indices, decoded_texts):
+                predicted_texts[keys_for_decoding[text_idx]] = predicted_text
+                if prediction_cache is not None:
+                    prediction_cache.put(('prediction', self.beam_size, keys_for_decoding[text_idx]), predicted_text)
             del input_seq
-        del bounds_of_batches
+        if (disk_cache is not None) and (len(keys_for_decoding) > 0):
+            disk_cache.put_many(self.get_model_fingerprint(),
+                                [(json.dumps([self.beam_size, cur], ensure_ascii=False), predicted_texts[cur])
+                                 for cur in keys_for_decoding])
+        texts = [predicted_texts[cache_key] for cache_key in cache_keys]
         if isinstance(X, tuple):
             return tuple(texts)
         if isinstance(X, np.ndarray):
             return np.array(texts, dtype=object)
         return texts
 
+    def predict_nbest(self, X, n_best=None):
+        """ Predict N best resulting sequences of tokens by source sequences with the beam search.
+
+        Each sequence is unicode text composed from the tokens. Tokens are separated by spaces. Hypotheses are ranked by
+        their log-probabilities normalized by their lengths. Width of the beam is equal to `beam_size`, but it is
+        increased up to `n_best` if necessary.
+
+        :param X: source sequences.
+        :param n_best: number of the best hypotheses for each source sequence (positive integer or None). If it is
+        None, then it is equal to the `beam_size` parameter.
+
+        :return: list of resulting hypotheses for each source sequence. Each item of this list is a list of 2-element
+        tuples (text and its total log-probability), sorted from the best hypothesis to the worst one.
+
+        """
+        self.check_X(X, 'X')
+        check_is_fitted(self, ['input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
+                               'max_encoder_seq_length_', 'max_decoder_seq_length_',
+                               'encoder_function_', 'decoder_function_'])
+        if n_best is None:
+            n_best = self.beam_size
+        if not isinstance(n_best, int):
+            raise ValueError(f'`n_best` must be `{type(10)}`, not `{type(n_best)}`.')
+        if n_best < 1:
+            raise ValueError(f'`n_best` must be a positive number! {n_best} is not positive.')
+        texts = [None for _ in range(X.shape[0] if isinstance(X, np.ndarray) else len(X))]
+        target_vocabulary = self.get_target_vocabulary()
+        for text_indices, input_seq in self.generate_batches_for_prediction(X):
+            encoder_states = self.encode(
+                input_seq,
+                [self.get_cache_key(X[text_idx]) for text_idx in text_indices] if self.cache_encoder_states else None
+            )
+            for text_idx, hypotheses in zip(text_indices, self.decode_by_beam_search(
+                    input_seq, max(n_best, self.beam_size), n_best, encoder_states)):
+                texts[text_idx] = [(' '.join(target_vocabulary[decoded_indices]), log_probability)
+                                   for decoded_indices, log_probability in hypotheses]
+            del input_seq
+        return texts
+
+    def get_cache_key(self, text):
+        """ Get the key of the source sequence for the prediction cache.
+
+        :param text: source sequence (unicode text composed from tokens separated by spaces).
+
+        :return: tuple of normalized tokens (see the `tokenize_text` method).
+
+        """
+        return tuple(self.tokenize_text(text, self.lowercase))
+
+    def get_prediction_cache(self):
+        """ Get the LRU cache of predictions, creating it if necessary.
+
+        :return: the `LRUCache` object or None, if the `prediction_cache_size` parameter is not specified.
+
+        """
+        if self.prediction_cache_size is None:
+            return None
+        prediction_cache = getattr(self, 'prediction_cache_', None)
+        if (prediction_cache is None) or (prediction_cache.max_size != self.prediction_cache_size):
+            prediction_cache = LRUCache(self.prediction_cache_size)
+            self.prediction_cache_ = prediction_cache
+        return prediction_cache
+
+    def get_disk_cache(self):
+        """ Get the persistent cache of predictions, opening it if necessary.
+
+        When the cache is opened, predictions of the models, which were replaced in this object by fitting or loading,
+        are removed, and predictions of other models (with other fingerprints) are removed, if they have not used the
+        cache for `DiskCache.STALE_MODEL_AGE` seconds. Other models, which use the same file now (for example, in other
+        processes during a rolling deploy), keep their predictions.
+
+        :return: the `DiskCache` object or None, if the `prediction_cache_file` parameter is not specified.
+
+        """
+        if self.prediction_cache_file is None:
+            return None
+        disk_cache = getattr(self, 'disk_cache_', None)
+        if (disk_cache is None) or (disk_cache.file_name != self.prediction_cache_file):
+            if disk_cache is not None:
+                disk_cache.close()
+            disk_cache = DiskCache(self.prediction_cache_file)
+            fingerprint = self.get_model_fingerprint()
+            disk_cache.remove([cur for cur in getattr(self, 'replaced_fingerprints_', []) if cur != fingerprint])
+            disk_cache.invalidate(fingerprint, max_age=DiskCache.STALE_MODEL_AGE)
+            self.replaced_fingerprints_ = []
+            self.disk_cache_ = disk_cache
+        return disk_cache
+
+    def get_model_fingerprint(self):
+        """ Get the fingerprint of the trained model, which is changed with any change of its predictions.
+
+        :return: SHA-256 hash (hexadecimal string) of weights (or quantized weights, see the `quantize` method),
+        vocabularies, maximal lengths of sequences and the `lowercase` parameter.
+
+        """
+        model_fingerprint = getattr(self, 'model_fingerprint_', None)
+        if model_fingerprint is None:
+            hasher = hashlib.sha256()
+            hasher.update(json.dumps(
+                [sorted(self.input_token_index_.keys(), key=self.input_token_index_.get),
+                 sorted(self.target_token_index_.keys(), key=self.target_token_index_.get),
+                 int(self.max_encoder_seq_length_), int(self.max_decoder_seq_length_), bool(self.lowercase)],
+                ensure_ascii=False
+            ).encode('utf-8'))
+            if hasattr(self, 'inference_engine_'):
+                weight_names, all_weights = self.inference_engine_.get_weights()
+                hasher.update(json.dumps(weight_names).encode('utf-8'))
+            else:
+                all_weights = self.encoder_model_.get_weights() + self.decoder_model_.get_weights()
+            for weights in all_weights:
+                hasher.update(str(weights.shape).encode('utf-8'))
+                hasher.update(np.ascontiguousarray(weights).tobytes())
+            model_fingerprint = hasher.hexdigest()
+            self.model_fingerprint_ = model_fingerprint
+        return model_fingerprint
+
+    def reset_prediction_cache(self):
+        """ Remove all cached predictions and encoder states (for example, after changing of weights). """
+        if hasattr(self, 'prediction_cache_'):
+            del self.prediction_cache_
+        if hasattr(self, 'model_fingerprint_'):
+            if hasattr(self, 'disk_cache_'):
+                self.replaced_fingerprints_ = getattr(self, 'replaced_fingerprints_', []) + [self.model_fingerprint_]
+            del self.model_fingerprint_
+        if hasattr(self, 'disk_cache_'):
+            self.disk_cache_.close()
+            del self.disk_cache_
+
+    def get_prediction_cache_stats(self):
+        """ Get statistics of the prediction cache.
+
+        :return: dictionary with numbers of cache hits, cache misses and cached entries. If the persistent cache is
+        used, then numbers of its hits and misses are added too.
+
+        """
+        prediction_cache = getattr(self, 'prediction_cache_', None)
+        if prediction_cache is None:
+            stats = {'hits': 0, 'misses': 0, 'entries': 0}
+        else:
+            stats = {'hits': prediction_cache.n_hits, 'misses': prediction_cache.n_misses,
+                     'entries': len(prediction_cache)}
+        if self.prediction_cache_file is not None:
+            disk_cache = getattr(self, 'disk_cache_', None)
+            stats['disk_hits'] = 0 if disk_cache is None else disk_cache.n_hits
+            stats['disk_misses'] = 0 if disk_cache is None else disk_cache.n_misses
+        return stats
+
+    def encode(self, input_seq, cache_keys=None):
+        """ Calculate final LSTM states of the encoder for the mini-batch of source sequences.
+
+        If the `cache_encoder_states` parameter is True and the prediction cache is used, then states of all source
+        sequences are taken from the cache, when all of them are cached, else they are calculated and saved into cache.
+
+        :param input_seq: feature matrix of source sequences (see the `generate_data_for_prediction` method).
+        :param cache_keys: keys of source sequences for the prediction cache (see the `get_cache_key` method) or None.
+
+        :return: 2-element list of LSTM states `h` and `c` (2-D arrays).
+
+        """
+        prediction_cache = self.get_prediction_cache() if self.cache_encoder_states else None
+        if (prediction_cache is not None) and (cache_keys is not None):
+            cached_states = [prediction_cache.get(('states', cache_key)) for cache_key in cache_keys]
+            if all([cur is not None for cur in cached_states]):
+                return [np.stack([cur[0] for cur in cached_states]), np.stack([cur[1] for cur in cached_states])]
+        state_h, state_c = [np.asarray(state) for state in self.encoder_function_(input_seq)]
+        if (prediction_cache is not None) and (cache_keys is not None):
+            for text_idx, cache_key in enumerate(cache_keys):
+                prediction_cache.put(('states', cache_key), (state_h[text_idx].copy(), state_c[text_idx].copy()))
+        return [state_h, state_c]
+
+    def generate_batches_for_prediction(self, X):
+        """ Generate feature matrices for all mini-batches of source sequences.
+
+        If the `bucketing` parameter is True, then source sequences are sorted by their lengths before splitting into
+        mini-batches, and each mini-batch is padded to the maximal length of sequences in this mini-batch. Otherwise
+        mini-batches are composed in the input order, and they are padded to `max_encoder_seq_length_`.
+
+        :param X: source sequences.
+
+        :return: generator of 2-element tuples: list of indices of source sequences in `X` and feature matrix for these
+        sequences (see the `generate_data_for_prediction` method).
+
+        """
+        n_samples = X.shape[0] if isinstance(X, np.ndarray) else len(X)
+        n_batches = int(np.ceil(n_samples / float(self.batch_size)))
+        if self.bucketing:
+            lengths = np.array(
+                [
+                    min(self.max_encoder_seq_length_,
+                        len(list(filter(lambda it: it in self.input_token_index_,
+                                        self.tokenize_text(X[sample_idx], self.lowercase)))))
+                    for sample_idx in range(n_samples)
+                ],
+                dtype=np.int32
+            )
+            sorted_indices = np.argsort(lengths, kind='stable')
+        else:
+            lengths = None
+            sorted_indices = np.arange(n_samples)
+        batches = [sorted_indices[(idx * self.batch_size):min(n_samples, (idx + 1) * self.batch_size)]
+                   for idx in range(n_batches)]
+        for text_indices in (tqdm(batches) if self.verbose else batches):
+            if self.bucketing:
+                yield text_indices, Seq2SeqLSTM.generate_data_for_prediction(
+                    input_texts=[X[sample_idx] for sample_idx in text_indices],
+                    batch_start=0, batch_end=text_indices.shape[0],
+                    max_encoder_seq_length=max(1, int(lengths[text_indices].max())),
+                    input_token_index=self.input_token_index_,
+                    lowercase=self.lowercase, use_token_ids=(self.embedding_size is not None)
+                )
+            else:
+                yield text_indices, Seq2SeqLSTM.generate_data_for_prediction(
+                    input_texts=X, batch_start=int(text_indices[0]), batch_end=int(text_indices[-1]) + 1,
+                    max_encoder_seq_length=self.max_encoder_seq_length_,
+                    input_token_index=self.input_token_index_,
+                    lowercase=self.lowercase, use_token_ids=(self.embedding_size is not None)
+                )
+        del batches
+
+    def get_target_vocabulary(self):
+        """ Get the target vocabulary as array of tokens, ordered by their indices.
+
+        :return: 1-D array (numpy.ndarray object) of target tokens.
+
+        """
+        return np.array(
+            [self.reverse_target_char_index_[token_idx] for token_idx in range(len(self.reverse_target_char_index_))],
+            dtype=object
+        )
+
+    def prepare_decoder_inputs(self, indices_of_tokens):
+        """ Prepare inputs of the decoder for the single timestep by indices of previous tokens.
+
+        :param indices_of_tokens: 1-D array of indices of previous tokens in the target vocabulary.
+
+        :return: one-hot vectors of these tokens (3-D array) or their indices for the embedding layer (2-D array).
+
+        """
+        if self.embedding_size is None:
+            target_seq = np.zeros((indices_of_tokens.shape[0], 1, len(self.target_token_index_)), dtype=np.float32)
+            target_seq[np.arange(indices_of_tokens.shape[0]), 0, indices_of_tokens] = 1.0
+        else:
+            target_seq = (indices_of_tokens.reshape((indices_of_tokens.shape[0], 1)) + 1).astype(np.int32)
+        return target_seq
+
+    def decode_greedily(self, input_seq, encoder_states=None):
+        """ Decode the mini-batch of source sequences by the greedy search.
+
+        Sequences, which are finished (i.e. they have the end token), are removed from the decoder inputs and LSTM states
+        at each timestep, so the cost of each timestep is proportional to the number of still active sequences. The
+        `active_indices` array maps rows of the compacted inputs and states to positions of texts in the mini-batch.
+
+        :param input_seq: feature matrix of source sequences (see the `generate_data_for_prediction` method).
+        :param encoder_states: final LSTM states `[h, c]` of the encoder, if they are calculated already (see the
+        `encode` method), or None.
+
+        :return: list of decoded sequences, each of which is 1-D array of token indices in the target vocabulary.
+
+        """
+        batch_size = input_seq.shape[0]
+        end_token_idx = self.target_token_index_['\n']
+        state_h, state_c = self.encode(input_seq) if encoder_states is None else encoder_states
+        indices_of_sampled_tokens = np.full((batch_size,), self.target_token_index_['\t'], dtype=np.int32)
+        decoded_indices = np.zeros((batch_size, self.max_decoder_seq_length_ + 1), dtype=np.int32)
+        decoded_lengths = np.zeros((batch_size,), dtype=np.int32)
+        active_indices = np.arange(batch_size)
+        time_step = 0
+        while (active_indices.shape[0] > 0) and (time_step <= self.max_decoder_seq_length_):
+            target_seq = self.prepare_decoder_inputs(indices_of_sampled_tokens)
+            output_tokens, state_h, state_c = [np.asarray(it) for it in self.decoder_function_(target_seq, state_h,
+                                                                                                 state_c)]
+            indices_of_sampled_tokens = np.argmax(output_tokens, axis=1)
+            decoded_indices[active_indices, time_step] = indices_of_sampled_tokens
+            decoded_lengths[active_indices] += 1
+            time_step += 1
+            is_active = (indices_of_sampled_tokens != end_token_idx)
+            if not np.all(is_active):
+                active_indices = active_indices[is_active]
+                indices_of_sampled_tokens = indices_of_sampled_tokens[is_active]
+                state_h = state_h[is_active]
+                state_c = state_c[is_active]
+        return [decoded_indices[text_idx, 0:decoded_lengths[text_idx]] for text_idx in range(batch_size)]
+
+    def decode_by_beam_search(self, input_seq, beam_size, n_best, encoder_states=None):
+        """ Decode the mini-batch of source sequences by the beam search.
+
+        Beams of all source sequences are decoded together: at each timestep the decoder is called once for the 2-D
+        matrix of `batch_size * beam_size` hypotheses, and the best continuations are selected by vectorized operations.
+        Hypotheses are compared by their log-probabilities divided by their lengths. The finished hypothesis (with the
+        end token) is kept in the beam without changes of its score, and the decoding is stopped when all hypotheses
+        are finished.
+
+        :param input_seq: feature matrix of source sequences (see the `generate_data_for_prediction` method).
+        :param beam_size: width of the beam (positive integer).
+        :param n_best: number of returned hypotheses for each source sequence (positive integer, not greater than
+        `beam_size`).
+        :param encoder_states: final LSTM states `[h, c]` of the encoder, if they are calculated already (see the
+        `encode` method), or None.
+
+        :return: list of hypotheses for each source sequence. Each item of this list is a list of 2-element tuples:
+        1-D array of token indices in the target vocabulary and total log-probability of this sequence.
+
+        """
+        batch_size = input_seq.shape[0]
+        vocabulary_size = len(self.target_token_index_)
+        end_token_idx = self.target_token_index_['\n']
+        state_h, state_c = [np.repeat(state, beam_size, axis=0)
+                            for state in (self.encode(input_seq) if encoder_states is None else encoder_states)]
+        beam_scores = np.full((batch_size, beam_size), -np.inf, dtype=np.float64)
+        beam_scores[:, 0] = 0.0
+        beam_tokens = np.zeros((batch_size, beam_size, self.max_decoder_seq_length_ + 1), dtype=np.int32)
+        beam_lengths = np.zeros((batch_size, beam_size), dtype=np.int32)
+        is_finished = np.zeros((batch_size, beam_size), dtype=bool)
+        indices_of_sampled_tokens = np.full((batch_size * beam_size,), self.target_token_index_['\t'],
+                                            dtype=np.int32)
+        batch_indices = np.arange(batch_size).reshape((batch_size, 1))
+        while not np.all(is_finished | np.isneginf(beam_scores)):
+            target_seq = self.prepare_decoder_inputs(indices_of_sampled_tokens)
+            output_tokens, state_h, state_c = [np.asarray(it) for it in self.decoder_function_(target_seq, state_h,
+                                                                                                 state_c)]
+            log_probabilities = np.log(np.maximum(output_tokens.astype(np.float64), 1e-30)).reshape(
+                (batch_size, beam_size, vocabulary_size)
+            )
+            log_probabilities[is_finished] = -np.inf
+            log_probabilities[is_finished, end_token_idx] = 0.0
+            candidate_scores = (beam_scores.reshape((batch_size, beam_size, 1)) + log_probabilities).reshape(
+                (batch_size, beam_size * vocabulary_size)
+            )
+            candidate_lengths = np.repeat(beam_lengths + np.logical_not(is_finished), vocabulary_size, axis=1)
+            normalized_scores = candidate_scores / np.maximum(candidate_lengths, 1)
+            best_candidates = np.argpartition(-normalized_scores, beam_size - 1, axis=1)[:, 0:beam_size]
+            best_candidates = np.take_along_axis(
+                best_candidates,
+                np.argsort(-np.take_along_axis(normalized_scores, best_candidates, axis=1), axis=1, kind='stable'),
+                axis=1
+            )
+            source_beams = best_candidates // vocabulary_size
+            new_tokens = (best_candidates % vocabulary_size).astype(np.int32)
+            beam_scores = np.take_along_axis(candidate_scores, best_candidates, axis=1)
+            beam_tokens = beam_tokens[batch_indices, source_beams]
+            beam_lengths = beam_lengths[batch_indices, source_beams]
+            was_finished = is_finished[batch_indices, source_beams]
+            is_active = np.logical_not(was_finished) & np.isfinite(beam_scores)
+            text_indices, beam_indices = np.nonzero(is_active)
+            beam_tokens[text_indices, beam_indices, beam_lengths[text_indices, beam_indices]] = \
+                new_tokens[text_indices, beam_indices]
+            beam_lengths[is_active] += 1
+            is_finished = was_finished | (is_active & ((new_tokens == end_token_idx) |
+                                                       (beam_lengths > self.max_decoder_seq_length_)))
+            flat_source_beams = (batch_indices * beam_size + source_beams).reshape((batch_size * beam_size,))
+            state_h = state_h[flat_source_beams]
+            state_c = state_c[flat_source_beams]
+            indices_of_sampled_tokens = new_tokens.reshape((batch_size * beam_size,))
+        normalized_scores = beam_scores / np.maximum(beam_lengths, 1)
+        hypotheses = []
+        for text_idx in range(batch_size):
+            hypotheses.append([
+                (beam_tokens[text_idx, beam_idx, 0:beam_lengths[text_idx, beam_idx]],
+                 float(beam_scores[text_idx, beam_idx]))
+                for beam_idx in np.argsort(-normalized_scores[text_idx], kind='stable')[0:n_best]
+                if np.isfinite(beam_scores[text_idx, beam_idx])
+            ])
+        return hypotheses
+
     def fit_predict(self, X, y, **kwargs):
         return self.fit(X, y, **kwargs).predict(X)
 
-    def load_weights(self, weights_as_bytes):
-        """ Load weights of neural model from the binary data.
+    def load_weights(self, weights_as_bytes):
+        """ Load weights of neural model from the binary data.
+
+        :param weights_as_bytes: binary data (`bytes` or `byterray` object) containing weights of neural encoder and
+        neural decoder, which are packed by the `dump_weights` method (weights of the quantized model are assigned into
+        the NumPy inference engine). The 2-element tuple of HDF5 files (`bytes`
+        objects) with weights of neural encoder and neural decoder, which is created by the previous version of the
+        `dump_weights` method, is supported too.
+        """
+        if isinstance(weights_as_bytes, tuple):
+            weights, n_encoder_weights = self.unpack_legacy_weights(weights_as_bytes)
+            self.assign_weights(weights, n_encoder_weights)
+            return
+        if (not isinstance(weights_as_bytes, bytearray)) and (not isinstance(weights_as_bytes, bytes)):
+            raise ValueError(f'`weights_as_bytes` must be an array of bytes, not `{type(weights_as_bytes)}`!')
+        weights, description = unpack_arrays(weights_as_bytes)
+        if 'inference_engine' in description:
+            self.assign_inference_engine(InferenceEngine(dict(zip(description['inference_engine'], weights))))
+        else:
+            self.assign_weights(weights, description.get('n_encoder_weights'))
+
+    @staticmethod
+    def unpack_legacy_weights(weights_as_bytes):
+        """ Unpack weights of neural model from the legacy format, i.e. from two HDF5 files created by Keras.
+
+        The previous version of the `dump_weights` method saved the encoder model and the decoder model by their
+        `save_weights` methods into HDF5 files and returned contents of these files. Layers and their weights are
+        listed in these files in the same order as in `Model.weights`.
+
+        :param weights_as_bytes: 2-element tuple of binary data (`bytes` or `byterray` objects) containing weights of
+        neural encoder and neural decoder respectively.
+
+        :return: 2-element tuple with the list of weights (numpy arrays) and the number of encoder weights.
+        """
+        import io
+        import h5py
+
+        if len(weights_as_bytes) != 2:
+            raise ValueError(f'`weights_as_bytes` must be a 2-element tuple, but it is a {len(weights_as_bytes)}-element '
+                             f'tuple!')
+        weights = []
+        n_encoder_weights = 0
+        for part_idx, part_name in enumerate(['First', 'Second']):
+            if (not isinstance(weights_as_bytes[part_idx], bytearray)) and \
+                    (not isinstance(weights_as_bytes[part_idx], bytes)):
+                raise ValueError(f'{part_name} element of `weights_as_bytes` must be an array of bytes, not '
+                                 f'`{type(weights_as_bytes[part_idx])}`!')
+            try:
+                with h5py.File(io.BytesIO(weights_as_bytes[part_idx]), 'r') as fp:
+                    group = fp['model_weights'] if 'model_weights' in fp else fp
+                    for layer_name in group.attrs['layer_names']:
+                        layer_group = group[layer_name.decode('utf-8') if isinstance(layer_name, bytes) else layer_name]
+                        for weight_name in layer_group.attrs['weight_names']:
+                            weights.append(np.array(layer_group[
+                                weight_name.decode('utf-8') if isinstance(weight_name, bytes) else weight_name
+                            ]))
+            except (OSError, KeyError):
+                raise ValueError(f'{part_name} element of `weights_as_bytes` is not the HDF5 file with weights!')
+            if part_idx == 0:
+                n_encoder_weights = len(weights)
+        return weights, n_encoder_weights
+
+    def assign_weights(self, weights, n_encoder_weights):
+        """ Assign weights of neural encoder and neural decoder into the inference models.
+
+        Inference models are taken from the pool (see `InferenceModelPool`) or built, if there are no free models with
+        the same architecture. Previous inference models of this object are returned into the pool beforehand (so they
+        are reused, if the architecture is the same), and new models are assigned to this object only after the
+        successful check of weights. Thus, if the weights do not correspond to the neural model, then the object has no
+        inference models, and it does not refer to models in the pool, which can be taken by another object.
+
+        Weights are copied into variables of Keras models, so the memory of `weights` (for example, mapped pages of the
+        model file) is not used after the assignment.
+
+        :param weights: list of numpy arrays, which were unpacked from data created by `dump_weights` or `save`.
+        :param n_encoder_weights: number of weights, which belong to the encoder (the first ones in the list).
+        """
+        self.release_inference_models()
+        signature = self.get_architecture_signature()
+        inference_models = InferenceModelPool.acquire(signature)
+        if inference_models is None:
+            _, encoder_model, decoder_model = self.build_neural_network(for_training=False)
+            inference_models = (encoder_model, decoder_model) + self.build_inference_functions(encoder_model,
+                                                                                               decoder_model)
+        encoder_model, decoder_model = inference_models[0:2]
+        if (n_encoder_weights != len(encoder_model.weights)) or \
+                (len(weights) != (n_encoder_weights + len(decoder_model.weights))):
+            InferenceModelPool.release(signature, inference_models)
+            raise ValueError('`weights_as_bytes` does not correspond to the neural model!')
+        encoder_model.set_weights(weights[0:n_encoder_weights])
+        decoder_model.set_weights(weights[n_encoder_weights:])
+        self.encoder_model_, self.decoder_model_, self.encoder_function_, self.decoder_function_ = inference_models
+        self.reset_prediction_cache()
+        self.inference_models_finalizer_ = weakref.finalize(self, InferenceModelPool.release, signature,
+                                                            inference_models)
+        self.inference_models_finalizer_.atexit = False
+
+    def get_architecture_signature(self):
+        """ Get the signature of the neural architecture, which defines shapes of all weights of the inference models.
+
+        Any two models with the same signature can be loaded into the same inference models (see `InferenceModelPool`).
+
+        :return: tuple of the embedding size (or None), the latent dimension and sizes of both vocabularies.
+        """
+        return self.embedding_size, self.latent_dim, len(self.input_token_index_), len(self.target_token_index_)
+
+    def release_inference_models(self):
+        """ Return the inference models, which were taken from the pool by the `load_weights` method, into the pool.
+
+        The NumPy inference engine (see the `quantize` method) is removed too. References to returned models and their
+        functions are removed from this object, because the pool can give these models to another object.
+        """
+        released_attributes = []
+        if hasattr(self, 'inference_models_finalizer_'):
+            self.inference_models_finalizer_()
+            del self.inference_models_finalizer_
+            released_attributes = ['encoder_model_', 'decoder_model_', 'encoder_function_', 'decoder_function_']
+        if hasattr(self, 'inference_engine_'):
+            del self.inference_engine_
+            released_attributes = ['encoder_function_', 'decoder_function_']
+        for attribute_name in released_attributes:
+            if hasattr(self, attribute_name):
+                delattr(self, attribute_name)
+
+    def quantize(self):
+        """ Create the copy of the trained model for the CPU inference with int8 weights.
+
+        Weight matrices of the encoder, the decoder and the output layer are quantized with a separate scale for each
+        output channel, and they are used by the NumPy inference engine (see `inference.InferenceEngine`) instead of
+        Keras models, so weights of the copy take about four times less memory. Matrices are dequantized by small
+        blocks during matrix products, so no full float32 copy of weights is created at the inference. The copy
+        predicts by the same `predict` and `predict_nbest` methods, and it can be saved by the `save` method, pickled or
+        dumped by the `dump_all` method, but it cannot be quantized again.
+
+        :return: the new `Seq2SeqLSTM` object with the quantized inference engine.
+        """
+        if hasattr(self, 'inference_engine_'):
+            raise ValueError('The model is quantized already!')
+        check_is_fitted(self, ['input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
+                               'max_encoder_seq_length_', 'max_decoder_seq_length_',
+                               'encoder_model_', 'decoder_model_'])
+        weights_of_encoder = self.encoder_model_.get_weights()
+        weights_of_decoder = self.decoder_model_.get_weights()
+        new_params = self.get_params(True)
+        new_params['weights'] = None
+        new_params['input_token_index_'] = self.input_token_index_
+        new_params['target_token_index_'] = self.target_token_index_
+        new_params['reverse_target_char_index_'] = self.reverse_target_char_index_
+        new_params['max_encoder_seq_length_'] = self.max_encoder_seq_length_
+        new_params['max_decoder_seq_length_'] = self.max_decoder_seq_length_
+        return Seq2SeqLSTM.__new__(Seq2SeqLSTM).load_all(
+            new_params,
+            inference_engine=InferenceEngine.quantize(weights_of_encoder + weights_of_decoder, len(weights_of_encoder))
+        )
+
+    def assign_inference_engine(self, inference_engine):
+        """ Use the NumPy inference engine instead of the Keras inference models.
 
-        :param weights_as_bytes: 2-element tuple of binary data (`bytes` or `byterray` objects) containing weights of
-        neural encoder and neural decoder respectively.
+        :param inference_engine: the `inference.InferenceEngine` object.
         """
-        if not isinstance(weights_as_bytes, tuple):
-            raise ValueError(f'`weights_as_bytes` must be a 2-element tuple, not `{type(weights_as_bytes)}`!')
-        if len(weights_as_bytes) != 2:
-            raise ValueError(f'`weights_as_bytes` must be a 2-element tuple, but it is a {len(weights_as_bytes)}-element tuple!')
-        if (not isinstance(weights_as_bytes[0], bytearray)) and (not isinstance(weights_as_bytes[0], bytes)):
-            raise ValueError(f'First element of `weights_as_bytes` must be an array of bytes, not `{type(weights_as_bytes[0])}`!')
-        if (not isinstance(weights_as_bytes[1], bytearray)) and (not isinstance(weights_as_bytes[1], bytes)):
-            raise ValueError(f'Second element of `weights_as_bytes` must be an array of bytes, not `{type(weights_as_bytes[1])}`!')
-        tmp_weights_name = self.get_temp_name()
-        try:
-            K.clear_session()
-            encoder_inputs = Input(shape=(None, len(self.input_token_index_)),
-                                   name='EncoderInputs')
-            encoder_mask = Masking(name='EncoderMask', mask_value=0.0)(encoder_inputs)
-            encoder = LSTM(
-                self.latent_dim,
-                return_sequences=False, return_state=True,
-                kernel_initializer=GlorotUniform(seed=self.generate_random_seed()),
-                recurrent_initializer=Orthogonal(seed=self.generate_random_seed()),
-                name='EncoderLSTM'
-            )
-            encoder_outputs, state_h, state_c = encoder(encoder_mask)
-            encoder_states = [state_h, state_c]
-            decoder_inputs = Input(shape=(None, len(self.target_token_index_)),
-                                   name='DecoderInputs')
-            decoder_mask = Masking(name='DecoderMask', mask_value=0.0)(decoder_inputs)
-            decoder_lstm = LSTM(
-                self.latent_dim, return_sequences=True, return_state=True,
-                kernel_initializer=GlorotUniform(seed=self.generate_random_seed()),
-                recurrent_initializer=Orthogonal(seed=self.generate_random_seed()),
-                name='DecoderLSTM'
-            )
-            decoder_outputs, _, _ = decoder_lstm(decoder_mask, initial_state=encoder_states)
-            decoder_dense = Dense(
-                len(self.target_token_index_), activation='softmax',
-                kernel_initializer=GlorotUniform(seed=self.generate_random_seed()),
-                name='DecoderOutput'
-            )
-            self.encoder_model_ = Model(encoder_inputs, encoder_states)
-            decoder_state_input_h = Input(shape=(self.latent_dim,))
-            decoder_state_input_c = Input(shape=(self.latent_dim,))
-            decoder_states_inputs = [decoder_state_input_h, decoder_state_input_c]
-            decoder_outputs, state_h, state_c = decoder_lstm(
-                decoder_mask, initial_state=decoder_states_inputs)
-            decoder_states = [state_h, state_c]
-            decoder_outputs = decoder_dense(decoder_outputs)
-            self.decoder_model_ = Model(
-                [decoder_inputs] + decoder_states_inputs,
-                [decoder_outputs] + decoder_states)
-            with open(tmp_weights_name, 'wb') as fp:
-                fp.write(weights_as_bytes[0])
-            self.encoder_model_.load_weights(tmp_weights_name)
-            os.remove(tmp_weights_name)
-            with open(tmp_weights_name, 'wb') as fp:
-                fp.write(weights_as_bytes[1])
-            self.decoder_model_.load_weights(tmp_weights_name)
-            os.remove(tmp_weights_name)
-        finally:
-            if os.path.isfile(tmp_weights_name):
-                os.remove(tmp_weights_name)
+        self.release_inference_models()
+        for attribute_name in ['encoder_model_', 'decoder_model_']:
+            if hasattr(self, attribute_name):
+                delattr(self, attribute_name)
+        self.inference_engine_ = inference_engine
+        self.encoder_function_ = inference_engine.encode
+        self.decoder_function_ = inference_engine.decode_step
+        self.reset_prediction_cache()
 
     def dump_weights(self):
         """ Dump weights of neural model as binary data.
 
-        :return: 2-element tuple of binary data (`bytes` objects) containing weights of neural encoder and
-        neural decoder respectively.
+        Weights of neural encoder and neural decoder are taken as numpy arrays, and they are packed into the single
+        buffer in memory (see `serialization.pack_arrays`) without saving into any file. Weights of the quantized model
+        (see the `quantize` method) are packed with their names, which are saved in the `inference_engine` item of the
+        buffer description.
+
+        :return: binary data (`bytes` object) containing weights of neural encoder and neural decoder.
         """
         check_is_fitted(self, ['input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
                                'max_encoder_seq_length_', 'max_decoder_seq_length_',
-                               'encoder_model_', 'decoder_model_'])
-        tmp_weights_name = self.get_temp_name()
+                               'encoder_function_', 'decoder_function_'])
+        if hasattr(self, 'inference_engine_'):
+            weight_names, all_weights = self.inference_engine_.get_weights()
+            return pack_arrays(all_weights, {'inference_engine': weight_names})
+        weights_of_encoder = self.encoder_model_.get_weights()
+        weights_of_decoder = self.decoder_model_.get_weights()
+        return pack_arrays(weights_of_encoder + weights_of_decoder, {'n_encoder_weights': len(weights_of_encoder)})
+
+    def prepare_artifact(self):
+        """ Prepare all data of the neural model for the single-file model format (see the `save` method).
+
+        :return: 2-element tuple with list of weights (numpy arrays) and the JSON-serializable description, which
+        contains parameters, vocabularies and maximal lengths of sequences. Weights of the quantized model are described
+        by their names in the `inference_engine` item of the description.
+        """
         try:
-            if os.path.isfile(tmp_weights_name):
-                os.remove(tmp_weights_name)
-            self.encoder_model_.save_weights(tmp_weights_name)
-            with open(tmp_weights_name, 'rb') as fp:
-                weights_of_encoder = fp.read()
-            os.remove(tmp_weights_name)
-            self.decoder_model_.save_weights(tmp_weights_name)
-            with open(tmp_weights_name, 'rb') as fp:
-                weights_of_decoder = fp.read()
-            os.remove(tmp_weights_name)
-            weights_as_bytearray = (weights_of_encoder, weights_of_decoder)
-        finally:
-            if os.path.isfile(tmp_weights_name):
-                os.remove(tmp_weights_name)
-        return weights_as_bytearray
+            check_is_fitted(self, ['input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
+                                   'max_encoder_seq_length_', 'max_decoder_seq_length_',
+                                   'encoder_function_', 'decoder_function_'])
+            is_trained = True
+        except:
+            is_trained = False
+        description = {'params': self.get_params(True)}
+        if not is_trained:
+            return [], description
+        description['input_vocabulary'] = sorted(self.input_token_index_.keys(), key=self.input_token_index_.get)
+        description['target_vocabulary'] = sorted(self.target_token_index_.keys(), key=self.target_token_index_.get)
+        description['max_encoder_seq_length_'] = int(self.max_encoder_seq_length_)
+        description['max_decoder_seq_length_'] = int(self.max_decoder_seq_length_)
+        if hasattr(self, 'inference_engine_'):
+            description['inference_engine'], all_weights = self.inference_engine_.get_weights()
+            return all_weights, description
+        weights_of_encoder = self.encoder_model_.get_weights()
+        weights_of_decoder = self.decoder_model_.get_weights()
+        description['n_encoder_weights'] = len(weights_of_encoder)
+        return weights_of_encoder + weights_of_decoder, description
+
+    def dump_artifact(self):
+        """ Dump all data of the neural model as binary data in the single-file model format (see the `save` method).
+
+        :return: binary data (`bytes` object).
+        """
+        return pack_arrays(*self.prepare_artifact())
+
+    def load_artifact(self, buffer):
+        """ Load all data of the neural model from binary data in the single-file model format.
+
+        :param buffer: binary data (`bytes`, `bytearray`, `np.memmap` or any other object with the buffer protocol),
+        which are created by the `dump_artifact` or `save` method. Parameters, which are absent in this data (for
+        example, data were saved by the previous version), are set to their default values.
+
+        :return: self.
+        """
+        weights, description = unpack_arrays(buffer)
+        if not isinstance(description.get('params'), dict):
+            raise ValueError('The buffer does not contain the sequence-to-sequence model!')
+        new_params = Seq2SeqLSTM().get_params(True)
+        new_params.update(description['params'])
+        if ('n_encoder_weights' not in description) and ('inference_engine' not in description):
+            return self.load_all(new_params)
+        new_params['weights'] = None
+        new_params['input_token_index_'] = dict(
+            (token, idx) for idx, token in enumerate(description['input_vocabulary']))
+        new_params['target_token_index_'] = dict(
+            (token, idx) for idx, token in enumerate(description['target_vocabulary']))
+        new_params['reverse_target_char_index_'] = dict(enumerate(description['target_vocabulary']))
+        new_params['max_encoder_seq_length_'] = description['max_encoder_seq_length_']
+        new_params['max_decoder_seq_length_'] = description['max_decoder_seq_length_']
+        if 'inference_engine' in description:
+            return self.load_all(new_params, inference_engine=InferenceEngine(
+                dict(zip(description['inference_engine'], weights))))
+        return self.load_all(new_params, weights=weights, n_encoder_weights=description['n_encoder_weights'])
+
+    def save(self, file_name):
+        """ Save the neural model into the single binary file.
+
+        The file contains the header with parameters, vocabularies and maximal lengths of sequences in JSON and raw
+        weights of neural encoder and neural decoder, which are aligned to 64 bytes (see `serialization.save_arrays`).
+
+        :param file_name: name of the model file.
+        """
+        save_arrays(file_name, *self.prepare_artifact())
+
+    @staticmethod
+    def load(file_name):
+        """ Load the neural model from the binary file, which was created by the `save` method.
+
+        The file is mapped into memory, so it is not read into a temporary buffer. Weights of the quantized model (see
+        the `quantize` method) are used by the NumPy inference engine directly from mapped pages, which are shared by
+        all processes loading the same file. Weights of the usual model are copied into variables of Keras models (see
+        `assign_weights`), so each process keeps its own copy of them.
+
+        :param file_name: name of the model file.
+
+        :return: the `Seq2SeqLSTM` object.
+        """
+        return Seq2SeqLSTM.__new__(Seq2SeqLSTM).load_artifact(np.memmap(file_name, dtype=np.uint8, mode='r'))
 
     def get_params(self, deep=True):
         """ Get parameters for this estimator.
@@ -450,7 +1437,14 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         return {'batch_size': self.batch_size, 'epochs': self.epochs, 'latent_dim': self.latent_dim,
                 'validation_split': self.validation_split, 'lr': self.lr, 'weight_decay': self.weight_decay,
                 'lowercase': self.lowercase, 'verbose': self.verbose, 'grad_clipping': self.grad_clipping,
-                'random_state': self.random_state}
+                'random_state': self.random_state, 'embedding_size': self.embedding_size,
+                'beam_size': self.beam_size, 'bucketing': self.bucketing, 'use_tf_data': self.use_tf_data,
+                'workers': self.workers, 'cache_batches': self.cache_batches,
+                'use_multiprocessing': self.use_multiprocessing, 'sparse_targets': self.sparse_targets,
+                'sampled_softmax': self.sampled_softmax, 'max_input_vocab': self.max_input_vocab,
+                'max_target_vocab': self.max_target_vocab, 'min_token_freq': self.min_token_freq,
+                'prediction_cache_size': self.prediction_cache_size, 'cache_encoder_states': self.cache_encoder_states,
+                'prediction_cache_file': self.prediction_cache_file}
 
     def set_params(self, **params):
         """ Set parameters for this estimator.
@@ -466,6 +1460,53 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
             self.__setattr__(parameter, value)
         return self
 
+    def score(self, X, y, sample_weight=None):
+        """ Calculate the mean accuracy of predicted texts, i.e. the (weighted) fraction of exactly predicted texts.
+
+        :param X: input texts.
+        :param y: true target texts.
+        :param sample_weight: optional weights of samples (1-D array or None).
+
+        :return the mean accuracy.
+
+        """
+        self.check_X(y, 'y')
+        if len(X) != len(y):
+            raise ValueError(f'`X` does not correspond to `y`! {len(X)} != {len(y)}.')
+        is_correct = [float(predicted == true) for predicted, true in zip(self.predict(X), y)]
+        return float(np.average(is_correct, weights=sample_weight))
+
+    def __sklearn_tags__(self):
+        """ Get estimator tags for scikit-learn 1.6 and later (older versions use `_get_tags`). """
+        try:
+            from sklearn.utils import ClassifierTags, Tags, TargetTags
+        except ImportError:
+            raise AttributeError('`__sklearn_tags__` needs scikit-learn 1.6 or later, use `_get_tags` instead.')
+        return Tags(estimator_type='classifier', target_tags=TargetTags(required=True),
+                    classifier_tags=ClassifierTags())
+
+    def _more_tags(self):
+        return {'requires_y': True}
+
+    def _get_tags(self):
+        """ Get estimator tags for scikit-learn older than 1.6 (default tags updated by `_more_tags`). """
+        try:
+            from sklearn.utils._tags import _DEFAULT_TAGS
+        except ImportError:
+            try:
+                from sklearn.base import _DEFAULT_TAGS
+            except ImportError:
+                _DEFAULT_TAGS = dict()
+        tags = dict(_DEFAULT_TAGS)
+        tags.update(self._more_tags())
+        return tags
+
+    def __repr__(self):
+        default_params = Seq2SeqLSTM().get_params(deep=False)
+        changed_params = [f'{name}={value!r}' for name, value in sorted(self.get_params(deep=False).items())
+                          if value != default_params[name]]
+        return f'{type(self).__name__}({", ".join(changed_params)})'
+
     def dump_all(self):
         """ Dump all data of the neural model.
 
@@ -477,7 +1518,7 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         try:
             check_is_fitted(self, ['input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
                                    'max_encoder_seq_length_', 'max_decoder_seq_length_',
-                                   'encoder_model_', 'decoder_model_'])
+                                   'encoder_function_', 'decoder_function_'])
             is_trained = True
         except:
             is_trained = False
@@ -491,21 +1532,32 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
             params['max_decoder_seq_length_'] = self.max_decoder_seq_length_
         return params
 
-    def load_all(self, new_params):
+    def load_all(self, new_params, weights=None, n_encoder_weights=None, inference_engine=None):
         """ Load all data of the neural model.
 
         This method is used in the deserialization and copying of object.
 
         :param new_params: dictionary with names and new values of all parameters, specified in the constructor and
-        received as result of training.
+        received as result of training. Parameters, which are absent in this dictionary (for example, it was created by
+        the previous version), are set to their default values.
+        :param weights: list of unpacked weights, which are used instead of `new_params['weights']` (or None).
+        :param n_encoder_weights: number of encoder weights in the `weights` list.
+        :param inference_engine: the NumPy inference engine, which is used instead of weights (or None).
 
         :return: self.
         """
         if not isinstance(new_params, dict):
             raise ValueError(f'`new_params` is wrong! Expected {type({0: 1})}.')
+        default_params = Seq2SeqLSTM().get_params(True)
+        default_params.update(new_params)
+        new_params = default_params
         self.check_params(**new_params)
         expected_param_keys = {'batch_size', 'epochs', 'latent_dim', 'validation_split', 'lr', 'weight_decay',
-                               'lowercase', 'verbose', 'grad_clipping', 'random_state'}
+                               'lowercase', 'verbose', 'grad_clipping', 'random_state', 'embedding_size',
+                               'beam_size', 'bucketing', 'use_tf_data', 'workers', 'cache_batches',
+                               'use_multiprocessing', 'sparse_targets', 'sampled_softmax', 'max_input_vocab',
+                               'max_target_vocab', 'min_token_freq', 'prediction_cache_size',
+                               'cache_encoder_states', 'prediction_cache_file'}
         params_after_training = {'weights', 'input_token_index_', 'target_token_index_', 'reverse_target_char_index_',
                                  'max_encoder_seq_length_', 'max_decoder_seq_length_'}
         is_fitted = len(set(new_params.keys())) > len(expected_param_keys)
@@ -522,6 +1574,21 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         self.verbose = new_params['verbose']
         self.grad_clipping = new_params['grad_clipping']
         self.random_state = new_params['random_state']
+        self.embedding_size = new_params['embedding_size']
+        self.beam_size = new_params['beam_size']
+        self.bucketing = new_params['bucketing']
+        self.use_tf_data = new_params['use_tf_data']
+        self.workers = new_params['workers']
+        self.cache_batches = new_params['cache_batches']
+        self.use_multiprocessing = new_params['use_multiprocessing']
+        self.sparse_targets = new_params['sparse_targets']
+        self.sampled_softmax = new_params['sampled_softmax']
+        self.max_input_vocab = new_params['max_input_vocab']
+        self.max_target_vocab = new_params['max_target_vocab']
+        self.min_token_freq = new_params['min_token_freq']
+        self.prediction_cache_size = new_params['prediction_cache_size']
+        self.cache_encoder_states = new_params['cache_encoder_states']
+        self.prediction_cache_file = new_params['prediction_cache_file']
         if is_fitted:
             if not isinstance(new_params['input_token_index_'], dict):
                 raise ValueError(f'`new_params` is wrong! `input_token_index_` must be the `{type({1: "a", 2: "b"})}`!')
@@ -542,9 +1609,148 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
             self.input_token_index_ = copy.deepcopy(new_params['input_token_index_'])
             self.target_token_index_ = copy.deepcopy(new_params['target_token_index_'])
             self.reverse_target_char_index_ = copy.deepcopy(new_params['reverse_target_char_index_'])
-            self.load_weights(new_params['weights'])
+            if inference_engine is not None:
+                self.assign_inference_engine(inference_engine)
+            elif weights is None:
+                self.load_weights(new_params['weights'])
+            else:
+                self.assign_weights(weights, n_encoder_weights)
         return self
 
+    def build_neural_network(self, target_token_frequencies=None, for_training=True):
+        """ Build the seq2seq neural network and its encoder and decoder parts for the inference.
+
+        If the `embedding_size` parameter is None, then each token is fed into the LSTM as a one-hot vector, and padded
+        timesteps are skipped by the `Masking` layer. Else each token is fed as its index in the vocabulary (the zero
+        index is reserved for padding), and it is converted into a dense vector by the `Embedding` layer with zero
+        masking.
+
+        If the `sampled_softmax` parameter is not None, then the full model for training gets desired token indices as
+        the third input, and its output is the loss calculated by the `SampledSoftmaxLoss` layer, which shares weights
+        with the output layer of the decoder. Negative tokens are sampled according to `target_token_frequencies` (all
+        frequencies are increased by one, because the start token never occurs in desired outputs), and if these
+        frequencies are not specified, then the log-uniform distribution is used.
+
+        If `for_training` is False, then the full model is not built (it is None), and all weights are initialized by
+        zeros instead of random values, because they will be overwritten by loaded weights. Besides, the decoder LSTM is
+        called only once, and it is the most expensive part of the building.
+
+        :param target_token_frequencies: numbers of occurrences of target tokens in the training set (1-D array or None).
+        :param for_training: if True, then the full model for training is built too.
+
+        :return: 3-element tuple with the full model for training, the encoder model and the one-step decoder model.
+
+        """
+        from tensorflow.keras.initializers import GlorotUniform, Orthogonal, Zeros
+        from tensorflow.keras.layers import Input, LSTM, Dense, Embedding, Masking
+        from tensorflow.keras.models import Model
+        from .training import SampledSoftmaxLoss
+
+        def create_initializer(initializer_class):
+            return initializer_class(seed=self.generate_random_seed()) if for_training else Zeros()
+
+        if self.embedding_size is None:
+            encoder_inputs = Input(shape=(None, len(self.input_token_index_)), name='EncoderInputs')
+            encoder_mask = Masking(name='EncoderMask', mask_value=0.0)(encoder_inputs)
+            decoder_inputs = Input(shape=(None, len(self.target_token_index_)), name='DecoderInputs')
+            decoder_mask = Masking(name='DecoderMask', mask_value=0.0)(decoder_inputs)
+        else:
+            encoder_inputs = Input(shape=(None,), dtype='int32', name='EncoderInputs')
+            encoder_mask = Embedding(
+                len(self.input_token_index_) + 1, self.embedding_size, mask_zero=True,
+                embeddings_initializer=create_initializer(GlorotUniform),
+                name='EncoderEmbedding'
+            )(encoder_inputs)
+            decoder_inputs = Input(shape=(None,), dtype='int32', name='DecoderInputs')
+            decoder_mask = Embedding(
+                len(self.target_token_index_) + 1, self.embedding_size, mask_zero=True,
+                embeddings_initializer=create_initializer(GlorotUniform),
+                name='DecoderEmbedding'
+            )(decoder_inputs)
+        encoder = LSTM(
+            self.latent_dim,
+            return_sequences=False, return_state=True,
+            kernel_initializer=create_initializer(GlorotUniform),
+            recurrent_initializer=create_initializer(Orthogonal),
+            name='EncoderLSTM'
+        )
+        encoder_outputs, state_h, state_c = encoder(encoder_mask)
+        encoder_states = [state_h, state_c]
+        decoder_lstm = LSTM(
+            self.latent_dim,
+            return_sequences=True, return_state=True,
+            kernel_initializer=create_initializer(GlorotUniform),
+            recurrent_initializer=create_initializer(Orthogonal),
+            name='DecoderLSTM'
+        )
+        decoder_dense = Dense(
+            len(self.target_token_index_), activation='softmax',
+            kernel_initializer=create_initializer(GlorotUniform),
+            name='DecoderOutput'
+        )
+        if not for_training:
+            model = None
+        elif self.sampled_softmax is None:
+            decoder_outputs, _, _ = decoder_lstm(decoder_mask, initial_state=encoder_states)
+            decoder_outputs = decoder_dense(decoder_outputs)
+            model = Model([encoder_inputs, decoder_inputs], decoder_outputs, name='Seq2SeqModel')
+        else:
+            decoder_outputs, _, _ = decoder_lstm(decoder_mask, initial_state=encoder_states)
+            decoder_targets = Input(shape=(None,), dtype='int32', name='DecoderTargets')
+            decoder_outputs = SampledSoftmaxLoss(
+                decoder_dense, self.sampled_softmax,
+                None if target_token_frequencies is None else [float(cur) + 1.0 for cur in target_token_frequencies],
+                name='SampledSoftmaxLoss'
+            )([decoder_outputs, decoder_targets])
+            model = Model([encoder_inputs, decoder_inputs, decoder_targets], decoder_outputs, name='Seq2SeqModel')
+        encoder_model = Model(encoder_inputs, encoder_states)
+        decoder_state_input_h = Input(shape=(self.latent_dim,))
+        decoder_state_input_c = Input(shape=(self.latent_dim,))
+        decoder_states_inputs = [decoder_state_input_h, decoder_state_input_c]
+        decoder_outputs, state_h, state_c = decoder_lstm(decoder_mask, initial_state=decoder_states_inputs)
+        decoder_states = [state_h, state_c]
+        decoder_outputs = decoder_dense(decoder_outputs)
+        decoder_model = Model([decoder_inputs] + decoder_states_inputs, [decoder_outputs] + decoder_states)
+        return model, encoder_model, decoder_model
+
+    def build_inference_functions(self, encoder_model, decoder_model):
+        """ Build the compiled functions for the encoder and for the single step of the decoder.
+
+        The `predict` method of the Keras model prepares a data adapter, a callback list and mini-batches at each call.
+        It is too expensive for the decoder, which is called once per output timestep, so both models are called
+        directly from functions traced by `tf.function` with fixed input signatures. Thus, each function is traced
+        only once and then it is reused for any batch size and any length of input sequences.
+
+        :param encoder_model: the encoder model (see `build_neural_network`).
+        :param decoder_model: the one-step decoder model (see `build_neural_network`).
+
+        :return: 2-element tuple with the encoder function and the decoder function. The encoder function takes a
+        mini-batch of input sequences and returns the LSTM states `[h, c]`. The decoder function takes a mini-batch of
+        previous tokens and the LSTM states `h` and `c`, and it returns probabilities of next tokens (2-D tensor) and new
+        LSTM states `h` and `c`.
+
+        """
+        import tensorflow as tf
+
+        if self.embedding_size is None:
+            encoder_input_spec = tf.TensorSpec(shape=(None, None, len(self.input_token_index_)), dtype=tf.float32)
+            decoder_input_spec = tf.TensorSpec(shape=(None, 1, len(self.target_token_index_)), dtype=tf.float32)
+        else:
+            encoder_input_spec = tf.TensorSpec(shape=(None, None), dtype=tf.int32)
+            decoder_input_spec = tf.TensorSpec(shape=(None, 1), dtype=tf.int32)
+        state_spec = tf.TensorSpec(shape=(None, self.latent_dim), dtype=tf.float32)
+
+        @tf.function(input_signature=[encoder_input_spec])
+        def encode(input_seq):
+            return encoder_model(input_seq, training=False)
+
+        @tf.function(input_signature=[decoder_input_spec, state_spec, state_spec])
+        def decode_step(target_seq, state_h, state_c):
+            output_tokens, new_state_h, new_state_c = decoder_model([target_seq, state_h, state_c], training=False)
+            return output_tokens[:, -1, :], new_state_h, new_state_c
+
+        return encode, decode_step
+
     def generate_random_seed(self) -> int:
         """ Generate random seed as a random positive integer value. """
         if self.random_state is None:
@@ -556,30 +1762,34 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
     def __copy__(self):
         cls = self.__class__
         result = cls.__new__(cls)
-        result.load_all(self.dump_all())
+        result.load_artifact(self.dump_artifact())
         return result
 
     def __deepcopy__(self, memodict={}):
         cls = self.__class__
         result = cls.__new__(cls)
-        result.load_all(self.dump_all())
+        result.load_artifact(self.dump_artifact())
         return result
 
     def __getstate__(self):
         """ Serialize this object into the specified state.
 
-        :return serialized state as Python dictionary.
+        :return serialized state as Python dictionary with the single-file model format (see the `save` method).
 
         """
-        return self.dump_all()
+        return {'artifact': self.dump_artifact()}
 
     def __setstate__(self, state):
         """ Deserialize this object from the specified state.
 
-        :param state: serialized state as Python dictionary.
+        :param state: serialized state as Python dictionary (states, which are created by `dump_all`, are supported
+        too).
 
         """
-        self.load_all(state)
+        if 'artifact' in state:
+            self.load_artifact(state['artifact'])
+        else:
+            self.load_all(state)
 
     @staticmethod
     def check_params(**kwargs):
@@ -645,6 +1855,83 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         if kwargs['random_state'] is not None:
             if not isinstance(kwargs['random_state'], int):
                 raise ValueError(f'`random_state` must be `{type(10)}`, not `{type(kwargs["random_state"])}`.')
+        if 'embedding_size' not in kwargs:
+            raise ValueError('`embedding_size` is not found!')
+        if kwargs['embedding_size'] is not None:
+            if not isinstance(kwargs['embedding_size'], int):
+                raise ValueError(f'`embedding_size` must be `{type(10)}`, not `{type(kwargs["embedding_size"])}`.')
+            if kwargs['embedding_size'] < 1:
+                raise ValueError(f'`embedding_size` must be a positive number! {kwargs["embedding_size"]} is not '
+                                 f'positive.')
+        if 'beam_size' not in kwargs:
+            raise ValueError('`beam_size` is not found!')
+        if not isinstance(kwargs['beam_size'], int):
+            raise ValueError(f'`beam_size` must be `{type(10)}`, not `{type(kwargs["beam_size"])}`.')
+        if kwargs['beam_size'] < 1:
+            raise ValueError(f'`beam_size` must be a positive number! {kwargs["beam_size"]} is not positive.')
+        if 'bucketing' not in kwargs:
+            raise ValueError('`bucketing` is not found!')
+        if (not isinstance(kwargs['bucketing'], int)) and (not isinstance(kwargs['bucketing'], bool)):
+            raise ValueError(f'`bucketing` must be `{type(10)}` or `{type(True)}`, not `{type(kwargs["bucketing"])}`.')
+        if 'use_tf_data' not in kwargs:
+            raise ValueError('`use_tf_data` is not found!')
+        if (not isinstance(kwargs['use_tf_data'], int)) and (not isinstance(kwargs['use_tf_data'], bool)):
+            raise ValueError(f'`use_tf_data` must be `{type(10)}` or `{type(True)}`, not `{type(kwargs["use_tf_data"])}`.')
+        if 'workers' not in kwargs:
+            raise ValueError('`workers` is not found!')
+        if kwargs['workers'] is not None:
+            if not isinstance(kwargs['workers'], int):
+                raise ValueError(f'`workers` must be `{type(10)}`, not `{type(kwargs["workers"])}`.')
+            if kwargs['workers'] < 1:
+                raise ValueError(f'`workers` must be a positive number! {kwargs["workers"]} is not positive.')
+        if 'cache_batches' not in kwargs:
+            raise ValueError('`cache_batches` is not found!')
+        if (not isinstance(kwargs['cache_batches'], int)) and (not isinstance(kwargs['cache_batches'], bool)):
+            raise ValueError(f'`cache_batches` must be `{type(10)}` or `{type(True)}`, not `{type(kwargs["cache_batches"])}`.')
+        if 'use_multiprocessing' not in kwargs:
+            raise ValueError('`use_multiprocessing` is not found!')
+        if (not isinstance(kwargs['use_multiprocessing'], int)) and (not isinstance(kwargs['use_multiprocessing'], bool)):
+            raise ValueError(f'`use_multiprocessing` must be `{type(10)}` or `{type(True)}`, not `{type(kwargs["use_multiprocessing"])}`.')
+        if 'sparse_targets' not in kwargs:
+            raise ValueError('`sparse_targets` is not found!')
+        if (not isinstance(kwargs['sparse_targets'], int)) and (not isinstance(kwargs['sparse_targets'], bool)):
+            raise ValueError(f'`sparse_targets` must be `{type(10)}` or `{type(True)}`, not `{type(kwargs["sparse_targets"])}`.')
+        if 'sampled_softmax' not in kwargs:
+            raise ValueError('`sampled_softmax` is not found!')
+        if kwargs['sampled_softmax'] is not None:
+            if not isinstance(kwargs['sampled_softmax'], int):
+                raise ValueError(f'`sampled_softmax` must be `{type(10)}`, not `{type(kwargs["sampled_softmax"])}`.')
+            if kwargs['sampled_softmax'] < 1:
+                raise ValueError(f'`sampled_softmax` must be a positive number! {kwargs["sampled_softmax"]} is not positive.')
+        for param_name in ['max_input_vocab', 'max_target_vocab']:
+            if param_name not in kwargs:
+                raise ValueError(f'`{param_name}` is not found!')
+            if kwargs[param_name] is not None:
+                if not isinstance(kwargs[param_name], int):
+                    raise ValueError(f'`{param_name}` must be `{type(10)}`, not `{type(kwargs[param_name])}`.')
+                if kwargs[param_name] < 1:
+                    raise ValueError(f'`{param_name}` must be a positive number! {kwargs[param_name]} is not positive.')
+        if 'min_token_freq' not in kwargs:
+            raise ValueError('`min_token_freq` is not found!')
+        if not isinstance(kwargs['min_token_freq'], int):
+            raise ValueError(f'`min_token_freq` must be `{type(10)}`, not `{type(kwargs["min_token_freq"])}`.')
+        if kwargs['min_token_freq'] < 1:
+            raise ValueError(f'`min_token_freq` must be a positive number! {kwargs["min_token_freq"]} is not positive.')
+        if 'prediction_cache_size' not in kwargs:
+            raise ValueError('`prediction_cache_size` is not found!')
+        if kwargs['prediction_cache_size'] is not None:
+            if not isinstance(kwargs['prediction_cache_size'], int):
+                raise ValueError(f'`prediction_cache_size` must be `{type(10)}`, not `{type(kwargs["prediction_cache_size"])}`.')
+            if kwargs['prediction_cache_size'] < 1:
+                raise ValueError(f'`prediction_cache_size` must be a positive number! {kwargs["prediction_cache_size"]} is not positive.')
+        if 'cache_encoder_states' not in kwargs:
+            raise ValueError('`cache_encoder_states` is not found!')
+        if (not isinstance(kwargs['cache_encoder_states'], int)) and (not isinstance(kwargs['cache_encoder_states'], bool)):
+            raise ValueError(f'`cache_encoder_states` must be `{type(10)}` or `{type(True)}`, not `{type(kwargs["cache_encoder_states"])}`.')
+        if 'prediction_cache_file' not in kwargs:
+            raise ValueError('`prediction_cache_file` is not found!')
+        if (kwargs['prediction_cache_file'] is not None) and (not isinstance(kwargs['prediction_cache_file'], str)):
+            raise ValueError(f'`prediction_cache_file` must be `{type("a")}`, not `{type(kwargs["prediction_cache_file"])}`.')
 
     @staticmethod
     def check_X(X, checked_object_name='X'):
@@ -666,6 +1953,21 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
             if not hasattr(X[sample_ind], 'split'):
                 raise ValueError(f'Sample {sample_ind} of `{checked_object_name}` is wrong! This sample have not the `split` method.')
 
+    @staticmethod
+    def check_encoded_texts(encoded_texts, checked_object_name='X'):
+        """ Check that encoded texts and each of them are not empty, and raise `ValueError` else.
+
+        :param encoded_texts: texts encoded as token indices (`EncodedTexts` object).
+        :param checked_object_name: printed name of object containing these texts.
+
+        """
+        if len(encoded_texts) == 0:
+            raise ValueError(f'`{checked_object_name}` is empty!')
+        indices_of_empty_texts = np.nonzero(encoded_texts.get_lengths() == 0)[0]
+        if indices_of_empty_texts.shape[0] > 0:
+            raise ValueError(f'Sample {indices_of_empty_texts[0]} of `{checked_object_name}` is wrong! '
+                             f'This sample is empty.')
+
     @staticmethod
     def tokenize_text(src, lowercase):
         """ Split source text by spaces and bring the resulting tokens to lowercase optionally.
@@ -679,20 +1981,8 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         return list(filter(lambda it: len(it) > 0, src.strip().lower().split() if lowercase else src.strip().split()))
 
     @staticmethod
-    def get_temp_name():
-        """ Get name of temporary file for saving/loading of neural network weights.
-
-        :return name of file as string.
-
-        """
-        fp = tempfile.NamedTemporaryFile(delete=True, suffix='.h5')
-        file_name = fp.name
-        fp.close()
-        del fp
-        return file_name
-
-    @staticmethod
-    def generate_data_for_prediction(input_texts, batch_start, batch_end, max_encoder_seq_length, input_token_index, lowercase):
+    def generate_data_for_prediction(input_texts, batch_start, batch_end, max_encoder_seq_length, input_token_index,
+                                     lowercase, use_token_ids=False):
         """ Generate feature matrix based on one-hot vectorization for input texts by specified mini-batch.
 
         This generator is used in the prediction process by means of the trained neural model. Each text is a unicode
@@ -700,14 +1990,20 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
         one-hot enconding (first dimension is index of text in the mini-batch, second dimension is a timestep, or token
         position in this text, and third dimension is index of this token in the input vocabulary).
 
+        If `use_token_ids` is True, then a 2-D array of integers is generated instead of one-hot vectors: each token is
+        represented by its index in the input vocabulary plus one, and zero is reserved for padding.
+
         :param input_texts: sequence (list, tuple or numpy.ndarray) of input texts.
         :param batch_start: a starting input text in the mini-batch.
         :param batch_end: an ending input text in the mini-batch.
         :param max_encoder_seq_length: maximal length of any input text.
         :param input_token_index: the special index for one-hot encoding any input text as numerical feature matrix.
         :param lowercase: the need to bring all tokens of all texts to the lowercase.
+        :param use_token_ids: the need to represent tokens by their indices instead of one-hot vectors.
+
+        Unknown tokens are replaced with the `<unk>` token, if it is in the `input_token_index`, else they are skipped.
 
-        :return the 3-D array representation of input mini-batch data.
+        :return the 3-D (or 2-D) array representation of input mini-batch data.
 
         """
         n = len(input_texts)
@@ -720,94 +2016,576 @@ class Seq2SeqLSTM(BaseEstimator, ClassifierMixin):
                       f'the input dataset included {n} samples.'
             raise ValueError(err_msg)
         batch_size = batch_end - batch_start
-        encoder_input_data = np.zeros(
-            (batch_size, max_encoder_seq_length, len(input_token_index)),
-            dtype=np.float32)
+        if use_token_ids:
+            encoder_input_data = np.zeros((batch_size, max_encoder_seq_length), dtype=np.int32)
+        else:
+            encoder_input_data = np.zeros(
+                (batch_size, max_encoder_seq_length, len(input_token_index)),
+                dtype=np.float32)
+        unknown_token_idx = input_token_index.get(Seq2SeqLSTM.UNKNOWN_TOKEN)
         for i, input_text in enumerate(input_texts[batch_start:batch_end]):
             t = 0
             for char in Seq2SeqLSTM.tokenize_text(input_text, lowercase):
                 if t >= max_encoder_seq_length:
                     break
-                if char in input_token_index:
-                    encoder_input_data[i, t, input_token_index[char]] = 1.0
+                token_idx = input_token_index.get(char, unknown_token_idx)
+                if token_idx is not None:
+                    if use_token_ids:
+                        encoder_input_data[i, t] = token_idx + 1
+                    else:
+                        encoder_input_data[i, t, token_idx] = 1.0
                     t += 1
         return encoder_input_data
 
 
-class TextPairSequence(Sequence):
-    """ Object for fitting to a sequence of text pairs without calculating features for all these pairs in memory.
+class InferenceModelPool(object):
+    """ Pool of inference models, which are reused by different `Seq2SeqLSTM` objects loading their weights.
+
+    Building of the encoder and decoder models (and tracing of their compiled functions) takes much more time than
+    assigning of weights, so these models are built once for each architecture signature (see
+    `Seq2SeqLSTM.get_architecture_signature`). Each object owns its inference models exclusively while it is alive, and
+    then they are returned into the pool and the next loaded model with the same signature takes them. The pool keeps
+    no more than `MAX_FREE_MODELS` free items for each signature.
 
     """
-    def __init__(self, input_texts, target_texts, batch_size, max_encoder_seq_length, max_decoder_seq_length,
-                 input_token_index, target_token_index, lowercase):
-        """ Generate feature matrices based on one-hot vectorization for pairs of texts by mini-batches.
+    MAX_FREE_MODELS = 4
+    free_models = dict()
+    lock = threading.Lock()
 
-        This generator is used in the training process of the neural model (see the `fit_generator` method of the Keras
-        `Model` object). Each text (input or target one) is a unicode string in which all tokens are separated by
-        spaces. Each pair of texts generates three 3-D arrays (numpy.ndarray objects):
+    @classmethod
+    def acquire(cls, signature):
+        """ Take free inference models with the specified signature from the pool.
 
-        1) one-hot vectorization of corresponded input text (first dimension is index of text in the mini-batch, second
-        dimension is a timestep, or token position in this text, and third dimension is index of this token in the input
-        vocabulary);
+        :param signature: the architecture signature.
 
-        2) one-hot vectorization of corresponded target text (first dimension is index of text in the mini-batch, second
-        dimension is a timestep, or token position in this text, and third dimension is index of this token in the
-        target vocabulary);
+        :return: 4-element tuple with the encoder model, the decoder model, the encoder function and the decoder
+        function (see `Seq2SeqLSTM.build_inference_functions`) or None, if there are no free models in the pool.
 
-        3) array is the same as second one but offset by one timestep.
+        """
+        with cls.lock:
+            free_models = cls.free_models.get(signature, [])
+            return free_models.pop() if len(free_models) > 0 else None
 
-        In the training process first and second array will be fed into the neural model, and third array will be
-        considered as its desired output.
+    @classmethod
+    def release(cls, signature, inference_models):
+        """ Return inference models with the specified signature into the pool.
 
-        :param input_texts: sequence (list, tuple or numpy.ndarray) of input texts.
-        :param target_texts: sequence (list, tuple or numpy.ndarray) of target texts.
-        :param batch_size: target size of single mini-batch, i.e. number of text pairs in this mini-batch.
-        :param max_encoder_seq_length: maximal length of any input text.
-        :param max_decoder_seq_length: maximal length of any target text.
-        :param input_token_index: the special index for one-hot encoding any input text as numerical feature matrix.
-        :param target_token_index: the special index for one-hot encoding any target text as numerical feature matrix.
+        :param signature: the architecture signature.
+        :param inference_models: 4-element tuple, which was taken by `acquire` or built for this signature.
+
+        """
+        with cls.lock:
+            free_models = cls.free_models.setdefault(signature, [])
+            if len(free_models) < cls.MAX_FREE_MODELS:
+                free_models.append(inference_models)
+
+    @classmethod
+    def clear(cls):
+        """ Remove all free inference models from the pool. """
+        with cls.lock:
+            cls.free_models.clear()
+
+
+class EncodedTexts(object):
+    """ Texts, which are tokenized once and stored as token indices in the compact form.
+
+    Token indices of all texts are concatenated into the single flat buffer (1-D array of 32-bit integers), and bounds
+    of each text in this buffer are specified by offsets: tokens of the i-th text are `tokens[offsets[i]:offsets[i + 1]]`.
+    Such corpus takes much less memory than lists of Python strings and it does not need repeated tokenization and
+    dictionary lookups at each training epoch.
+
+    Both arrays can be placed in the named storage: the corpus file mapped into memory (see `TextPairCorpus`) or the
+    shared memory block (see the `share` method). In this case only a description of the storage is pickled, and the
+    unpickled object (for example, in a worker process) maps the same storage instead of receiving a copy of arrays.
+
+    """
+    def __init__(self, tokens, offsets, storage=None, shared_memory=None):
+        """ Create the encoded texts from the flat buffer of token indices and the array of text offsets.
+
+        :param tokens: 1-D array of token indices of all texts (numpy.ndarray with the `int32` type).
+        :param offsets: 1-D array of offsets of texts in the token buffer, its length is number of texts plus one.
+        :param storage: description of the named storage, in which both arrays are placed (dictionary or None).
+        :param shared_memory: the `SharedMemory` object, whose buffer contains both arrays (or None).
+
+        """
+        self.tokens = tokens
+        self.offsets = offsets
+        self.storage = storage
+        self.shared_memory = shared_memory
+        self.shared_memory_owner = False
+
+    def __getstate__(self):
+        if self.storage is None:
+            return {'tokens': self.tokens, 'offsets': self.offsets, 'storage': None}
+        return {'storage': self.storage}
+
+    def __setstate__(self, state):
+        self.storage = state['storage']
+        self.shared_memory_owner = False
+        if self.storage is None:
+            self.tokens = state['tokens']
+            self.offsets = state['offsets']
+            self.shared_memory = None
+        else:
+            self.tokens, self.offsets, self.shared_memory = self.open_storage(self.storage)
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, idx):
+        return self.tokens[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def get_lengths(self):
+        """ Calculate number of tokens in each text.
+
+        :return 1-D array of text lengths (numpy.ndarray).
+
+        """
+        return np.diff(self.offsets)
+
+    def count_tokens(self, vocabulary_size):
+        """ Count occurrences of each token in these texts.
+
+        :param vocabulary_size: number of tokens in the vocabulary.
+
+        :return 1-D array of token counts (numpy.ndarray with the `int64` type), whose i-th item corresponds to the token
+        with the index i.
+
+        """
+        return np.bincount(self.tokens[self.offsets[0]:self.offsets[-1]], minlength=vocabulary_size).astype(np.int64)
+
+    def subset(self, start, end):
+        """ Select texts from the specified range without copying of their tokens.
+
+        :param start: index of the first selected text.
+        :param end: index of the text after the last selected one.
+
+        :return the new `EncodedTexts` object.
+
+        """
+        if self.storage is None:
+            storage = None
+        else:
+            storage = dict(self.storage)
+            storage['first_text'] += start
+            storage['n_texts'] = end - start
+        return EncodedTexts(self.tokens, self.offsets[start:(end + 1)], storage, self.shared_memory)
+
+    def share(self):
+        """ Copy texts into the new shared memory block, which can be mapped by other processes.
+
+        The returned object owns this shared memory block, and its `release` method must be called after use.
+
+        :return the new `EncodedTexts` object.
+
+        """
+        tokens = self.tokens[self.offsets[0]:self.offsets[-1]]
+        offsets = self.offsets - self.offsets[0]
+        offsets_position = TextPairCorpus.calculate_padded_size(tokens.nbytes)
+        shared_memory = SharedMemory(create=True, size=max(offsets_position + offsets.nbytes, 1))
+        storage = {'kind': 'shared_memory', 'name': shared_memory.name,
+                   'tokens_position': 0, 'n_tokens': tokens.shape[0],
+                   'offsets_position': offsets_position, 'n_offsets': offsets.shape[0],
+                   'first_text': 0, 'n_texts': offsets.shape[0] - 1}
+        shared_tokens, shared_offsets, _ = self.open_storage(storage, shared_memory)
+        shared_tokens[:] = tokens
+        shared_offsets[:] = offsets
+        shared_texts = EncodedTexts(shared_tokens, shared_offsets, storage, shared_memory)
+        shared_texts.shared_memory_owner = True
+        return shared_texts
+
+    def release(self):
+        """ Close the shared memory block of texts, and destroy it if this object is its owner. """
+        if self.shared_memory is None:
+            return
+        shared_memory = self.shared_memory
+        self.tokens = None
+        self.offsets = None
+        self.shared_memory = None
+        try:
+            shared_memory.close()
+        except BufferError:
+            pass
+        if self.shared_memory_owner:
+            shared_memory.unlink()
+            self.shared_memory_owner = False
+
+    @staticmethod
+    def open_storage(storage, shared_memory=None):
+        """ Map arrays of token indices and text offsets from the named storage.
+
+        :param storage: description of the storage (the corpus file or the shared memory block).
+        :param shared_memory: already opened `SharedMemory` object for this storage (or None).
+
+        :return the three-element tuple: token indices, text offsets and the `SharedMemory` object (or None).
+
+        """
+        if storage['kind'] == 'file':
+            tokens = np.memmap(storage['name'], dtype=np.int32, mode='r', offset=storage['tokens_position'],
+                               shape=(storage['n_tokens'],))
+            offsets = np.memmap(storage['name'], dtype=np.int64, mode='r', offset=storage['offsets_position'],
+                                shape=(storage['n_offsets'],))
+        elif storage['kind'] == 'shared_memory':
+            if shared_memory is None:
+                shared_memory = SharedMemory(name=storage['name'])
+            tokens = np.ndarray((storage['n_tokens'],), dtype=np.int32, buffer=shared_memory.buf,
+                                offset=storage['tokens_position'])
+            offsets = np.ndarray((storage['n_offsets'],), dtype=np.int64, buffer=shared_memory.buf,
+                                 offset=storage['offsets_position'])
+        else:
+            raise ValueError(f'The storage kind `{storage["kind"]}` is unknown!')
+        first_text = storage['first_text']
+        return tokens, offsets[first_text:(first_text + storage['n_texts'] + 1)], shared_memory
+
+    def remap(self, index_mapping):
+        """ Replace all token indices by new ones according to the specified mapping.
+
+        :param index_mapping: 1-D array, whose i-th item is a new index of the token with the old index i.
+
+        :return the new `EncodedTexts` object.
+
+        """
+        return EncodedTexts(index_mapping[self.tokens[self.offsets[0]:self.offsets[-1]]].astype(np.int32),
+                            self.offsets - self.offsets[0])
+
+    @staticmethod
+    def encode(texts, token_index, lowercase, update_index=False):
+        """ Tokenize texts and encode all their tokens as indices in the specified token index.
+
+        If `update_index` is True, then each new token is added into the `token_index` with the next free index, else
+        tokens which are absent in the `token_index` are replaced with the `<unk>` token (if it is in the `token_index`)
+        or skipped.
+
+        :param texts: sequence (list, tuple or numpy.ndarray) of texts.
+        :param token_index: dictionary, whose keys are tokens and values are their indices.
         :param lowercase: the need to bring all tokens of all texts to the lowercase.
+        :param update_index: the need to add new tokens into the `token_index`.
 
-        :return the two-element tuple with input and output mini-batch data for the neural model training respectively.
+        :return the `EncodedTexts` object.
+
+        """
+        tokens = array.array('i')
+        offsets = np.zeros((len(texts) + 1,), dtype=np.int64)
+        unknown_token_idx = None if update_index else token_index.get(Seq2SeqLSTM.UNKNOWN_TOKEN)
+        for text_idx in range(len(texts)):
+            for cur_token in Seq2SeqLSTM.tokenize_text(texts[text_idx], lowercase):
+                token_idx = token_index.get(cur_token, unknown_token_idx)
+                if token_idx is None:
+                    if not update_index:
+                        continue
+                    token_idx = len(token_index)
+                    token_index[cur_token] = token_idx
+                tokens.append(token_idx)
+            offsets[text_idx + 1] = len(tokens)
+        return EncodedTexts(np.frombuffer(tokens, dtype=np.int32).copy(), offsets)
+
+    @staticmethod
+    def get_index_mapping(old_token_index, new_token_index, default_index=None):
+        """ Build the mapping of token indices from one token index to another for the `remap` method.
+
+        :param old_token_index: dictionary with old indices of tokens.
+        :param new_token_index: dictionary with new indices of tokens (it must contain all tokens of the old index, if
+        `default_index` is None).
+        :param default_index: new index of tokens, which are absent in the new token index (or None).
+
+        :return 1-D array, whose i-th item is a new index of the token with the old index i.
+
+        """
+        index_mapping = np.zeros((len(old_token_index),), dtype=np.int32)
+        for cur_token, old_token_idx in old_token_index.items():
+            if default_index is None:
+                index_mapping[old_token_idx] = new_token_index[cur_token]
+            else:
+                index_mapping[old_token_idx] = new_token_index.get(cur_token, default_index)
+        return index_mapping
+
+
+class TextPairCorpus(object):
+    """ Corpus of text pairs encoded by vocabularies, which can be stored in the binary file and mapped into memory.
+
+    The corpus file consists of the signature, the header size (8-byte unsigned integer), the header in JSON and four
+    arrays: token indices and offsets of input texts and the same for target texts (see `EncodedTexts`). The header
+    contains vocabularies, maximal lengths of texts and locations of arrays. All arrays are aligned to 64 bytes, and
+    they are mapped into memory by `numpy.memmap` at the loading. So, mini-batches are read from the page cache
+    without copying of the whole corpus into RAM.
+
+    The corpus file is written once by the converter:
+
+    `TextPairCorpus.create(input_texts, target_texts, lowercase).save(file_name)`
+
+    and then its name is passed into `Seq2SeqLSTM.fit` instead of texts.
+
+    """
+    SIGNATURE = b'S2SCORP1'
+    ALIGNMENT = 64
+
+    def __init__(self, input_texts, target_texts, input_vocabulary, target_vocabulary, max_input_length,
+                 max_target_length, lowercase):
+        """ Create the corpus from encoded texts and their vocabularies.
+
+        :param input_texts: input texts (`EncodedTexts` object).
+        :param target_texts: target texts (`EncodedTexts` object).
+        :param input_vocabulary: list of input tokens, in which position of each token is its index.
+        :param target_vocabulary: list of target tokens (including the start token '\\t' and the end token '\\n'), in
+        which position of each token is its index.
+        :param max_input_length: maximal number of tokens in any input text.
+        :param max_target_length: maximal number of tokens in any target text (without the start and end tokens).
+        :param lowercase: the need to bring all tokens of all texts to the lowercase.
 
         """
         self.input_texts = input_texts
         self.target_texts = target_texts
-        self.batch_size = batch_size
-        self.max_encoder_seq_length = max_encoder_seq_length
-        self.max_decoder_seq_length = max_decoder_seq_length
-        self.input_token_index = input_token_index
-        self.target_token_index = target_token_index
+        self.input_vocabulary = input_vocabulary
+        self.target_vocabulary = target_vocabulary
+        self.max_input_length = max_input_length
+        self.max_target_length = max_target_length
         self.lowercase = lowercase
-        self.n_text_pairs = len(self.input_texts)
-        self.n_batches = self.n_text_pairs // self.batch_size
-        while (self.n_batches * self.batch_size) < self.n_text_pairs:
-            self.n_batches += 1
 
     def __len__(self):
-        return self.n_batches
+        return len(self.input_texts)
 
-    def __getitem__(self, idx):
-        start_pos = idx * self.batch_size
-        end_pos = start_pos + self.batch_size
-        encoder_input_data = np.zeros((self.batch_size, self.max_encoder_seq_length, len(self.input_token_index)),
-                                      dtype=np.float32)
-        decoder_input_data = np.zeros((self.batch_size, self.max_decoder_seq_length, len(self.target_token_index)),
-                                      dtype=np.float32)
-        decoder_target_data = np.zeros((self.batch_size, self.max_decoder_seq_length, len(self.target_token_index)),
-                                       dtype=np.float32)
-        idx_in_batch = 0
-        for src_text_idx in range(start_pos, end_pos):
-            prep_text_idx = src_text_idx
-            while prep_text_idx >= self.n_text_pairs:
-                prep_text_idx = prep_text_idx - self.n_text_pairs
-            input_text = self.input_texts[prep_text_idx]
-            target_text = self.target_texts[prep_text_idx]
-            for t, char in enumerate(Seq2SeqLSTM.tokenize_text(input_text, self.lowercase)):
-                encoder_input_data[idx_in_batch, t, self.input_token_index[char]] = 1.0
-            for t, char in enumerate(['\t'] + Seq2SeqLSTM.tokenize_text(target_text, self.lowercase) + ['\n']):
-                decoder_input_data[idx_in_batch, t, self.target_token_index[char]] = 1.0
-                if t > 0:
-                    decoder_target_data[idx_in_batch, t - 1, self.target_token_index[char]] = 1.0
-            idx_in_batch += 1
-        return [encoder_input_data, decoder_input_data], decoder_target_data
+    def subset(self, start, end):
+        """ Select text pairs from the specified range without copying of their tokens.
+
+        :param start: index of the first selected text pair.
+        :param end: index of the text pair after the last selected one.
+
+        :return the new `TextPairCorpus` object with the same vocabularies and maximal lengths.
+
+        """
+        return TextPairCorpus(
+            input_texts=self.input_texts.subset(start, end), target_texts=self.target_texts.subset(start, end),
+            input_vocabulary=self.input_vocabulary, target_vocabulary=self.target_vocabulary,
+            max_input_length=self.max_input_length, max_target_length=self.max_target_length,
+            lowercase=self.lowercase
+        )
+
+    def save(self, file_name):
+        """ Save the corpus into the binary file.
+
+        :param file_name: name of the corpus file.
+
+        """
+        arrays = []
+        for prefix, encoded_texts in (('input', self.input_texts), ('target', self.target_texts)):
+            arrays.append((f'{prefix}_tokens',
+                           encoded_texts.tokens[encoded_texts.offsets[0]:encoded_texts.offsets[-1]].astype(np.int32)))
+            arrays.append((f'{prefix}_offsets', (encoded_texts.offsets - encoded_texts.offsets[0]).astype(np.int64)))
+        header = {
+            'input_vocabulary': list(self.input_vocabulary),
+            'target_vocabulary': list(self.target_vocabulary),
+            'max_input_length': int(self.max_input_length),
+            'max_target_length': int(self.max_target_length),
+            'lowercase': bool(self.lowercase),
+            'arrays': dict()
+        }
+        position = 0
+        for array_name, array_data in arrays:
+            header['arrays'][array_name] = {'offset': position, 'dtype': array_data.dtype.str,
+                                            'shape': list(array_data.shape)}
+            position += self.calculate_padded_size(array_data.nbytes)
+        header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        with open(file_name, 'wb') as fp:
+            fp.write(self.SIGNATURE)
+            fp.write(len(header).to_bytes(8, byteorder='little'))
+            fp.write(header)
+            fp.write(b'\0' * (self.calculate_padded_size(fp.tell()) - fp.tell()))
+            for array_name, array_data in arrays:
+                fp.write(array_data.tobytes())
+                fp.write(b'\0' * (self.calculate_padded_size(array_data.nbytes) - array_data.nbytes))
+
+    @staticmethod
+    def load(file_name):
+        """ Load the corpus from the binary file, mapping all its arrays into memory.
+
+        :param file_name: name of the corpus file.
+
+        :return the `TextPairCorpus` object.
+
+        """
+        with open(file_name, 'rb') as fp:
+            signature = fp.read(len(TextPairCorpus.SIGNATURE))
+            if signature != TextPairCorpus.SIGNATURE:
+                raise ValueError(f'The file "{file_name}" is not a corpus file!')
+            header_size = int.from_bytes(fp.read(8), byteorder='little')
+            header = json.loads(fp.read(header_size).decode('utf-8'))
+            data_start = TextPairCorpus.calculate_padded_size(fp.tell())
+        encoded_texts = dict()
+        for prefix in ['input', 'target']:
+            for array_name in [f'{prefix}_tokens', f'{prefix}_offsets']:
+                if array_name not in header['arrays']:
+                    raise ValueError(f'The corpus file "{file_name}" is wrong! The array `{array_name}` is not found.')
+            storage = {
+                'kind': 'file', 'name': os.path.abspath(file_name),
+                'tokens_position': data_start + header['arrays'][f'{prefix}_tokens']['offset'],
+                'n_tokens': header['arrays'][f'{prefix}_tokens']['shape'][0],
+                'offsets_position': data_start + header['arrays'][f'{prefix}_offsets']['offset'],
+                'n_offsets': header['arrays'][f'{prefix}_offsets']['shape'][0],
+                'first_text': 0, 'n_texts': header['arrays'][f'{prefix}_offsets']['shape'][0] - 1
+            }
+            tokens, offsets, _ = EncodedTexts.open_storage(storage)
+            encoded_texts[prefix] = EncodedTexts(tokens, offsets, storage)
+        return TextPairCorpus(
+            input_texts=encoded_texts['input'], target_texts=encoded_texts['target'],
+            input_vocabulary=header['input_vocabulary'], target_vocabulary=header['target_vocabulary'],
+            max_input_length=header['max_input_length'], max_target_length=header['max_target_length'],
+            lowercase=header['lowercase']
+        )
+
+    @staticmethod
+    def create(input_texts, target_texts, lowercase=True):
+        """ Create the corpus from texts, building vocabularies of all their tokens.
+
+        :param input_texts: sequence (list, tuple or numpy.ndarray) of input texts.
+        :param target_texts: sequence (list, tuple or numpy.ndarray) of target texts.
+        :param lowercase: the need to bring all tokens of all texts to the lowercase.
+
+        :return the `TextPairCorpus` object.
+
+        """
+        training_corpus, _ = Seq2SeqLSTM(lowercase=lowercase, validation_split=None).encode_texts_for_training(
+            input_texts, target_texts
+        )
+        return training_corpus
+
+    @staticmethod
+    def calculate_padded_size(size):
+        """ Round the size of data up to the alignment of arrays in the corpus file.
+
+        :param size: size of data in bytes.
+
+        :return size of data with padding.
+
+        """
+        return ((size + TextPairCorpus.ALIGNMENT - 1) // TextPairCorpus.ALIGNMENT) * TextPairCorpus.ALIGNMENT
+
+
+class TextPairStream(object):
+    """ Stream of text pairs, which is read from the TSV file or from the re-iterable object without loading into memory.
+
+    """
+    BATCHES_PER_CHUNK = 64
+
+    def __init__(self, source, source_name='text_pairs'):
+        """ Create the stream of text pairs.
+
+        :param source: name of the TSV file in the UTF-8 encoding (each line of this file contains input and target
+        texts separated by the tab character) or re-iterable object, which yields two-element tuples of input and
+        target texts (its `__iter__` method must start a new iteration at each call, so it cannot be an iterator).
+        :param source_name: printed name of the source.
+
+        """
+        if isinstance(source, str):
+            if not os.path.isfile(source):
+                raise ValueError(f'The file "{source}" does not exist!')
+        else:
+            if not hasattr(source, '__iter__'):
+                raise ValueError(f'`{type(source)}` is wrong type for `{source_name}`.')
+            if iter(source) is source:
+                raise ValueError(f'`{source_name}` must be a re-iterable object, but it is an iterator!')
+        self.source = source
+        self.source_name = source_name
+
+    def __iter__(self):
+        if isinstance(self.source, str):
+            with open(self.source, mode='r', encoding='utf-8', errors='ignore') as fp:
+                for line_idx, cur_line in enumerate(fp):
+                    prep_line = cur_line.strip()
+                    if len(prep_line) == 0:
+                        continue
+                    line_parts = prep_line.split('\t')
+                    if len(line_parts) != 2:
+                        raise ValueError(f'File "{self.source}": line {line_idx + 1} is wrong!')
+                    yield line_parts[0], line_parts[1]
+        else:
+            for sample_idx, text_pair in enumerate(self.source):
+                if ((not isinstance(text_pair, tuple)) and (not isinstance(text_pair, list))) or (len(text_pair) != 2):
+                    raise ValueError(f'Sample {sample_idx} of `{self.source_name}` is wrong! '
+                                     f'This sample is not a pair of texts.')
+                yield text_pair[0], text_pair[1]
+
+    def scan(self, input_token_index, target_token_index, lowercase, input_token_counts=None,
+             target_token_counts=None):
+        """ Read all text pairs once, add their tokens into token indices and calculate statistics of text lengths.
+
+        :param input_token_index: dictionary of input tokens, which is updated by new tokens.
+        :param target_token_index: dictionary of target tokens, which is updated by new tokens.
+        :param lowercase: the need to bring all tokens of all texts to the lowercase.
+        :param input_token_counts: dictionary of numbers of occurrences of input tokens, which is updated too (or None,
+        if it is not necessary to count input tokens).
+        :param target_token_counts: dictionary of numbers of occurrences of target tokens, which is updated too (or
+        None, if it is not necessary to count target tokens).
+
+        :return the three-element tuple: number of text pairs, maximal length of input text and maximal length of
+        target text.
+
+        """
+        n_text_pairs = 0
+        max_input_length = 0
+        max_target_length = 0
+        for input_text, target_text in self:
+            for text, token_index, token_counts, text_name in (
+                    (input_text, input_token_index, input_token_counts, 'Input'),
+                    (target_text, target_token_index, target_token_counts, 'Target')
+            ):
+                if not hasattr(text, 'split'):
+                    raise ValueError(f'Sample {n_text_pairs} of `{self.source_name}` is wrong! {text_name} text of '
+                                     f'this sample have not the `split` method.')
+                tokens = Seq2SeqLSTM.tokenize_text(text, lowercase)
+                if len(tokens) == 0:
+                    raise ValueError(f'Sample {n_text_pairs} of `{self.source_name}` is wrong! {text_name} text of '
+                                     f'this sample is empty.')
+                for cur_token in tokens:
+                    if cur_token not in token_index:
+                        token_index[cur_token] = len(token_index)
+                    if token_counts is not None:
+                        token_counts[cur_token] = token_counts.get(cur_token, 0) + 1
+                if text_name == 'Input':
+                    max_input_length = max(max_input_length, len(tokens))
+                else:
+                    max_target_length = max(max_target_length, len(tokens))
+            n_text_pairs += 1
+        if n_text_pairs == 0:
+            raise ValueError(f'`{self.source_name}` is empty!')
+        return n_text_pairs, max_input_length, max_target_length
+
+    def read_chunks(self, start, end, chunk_size):
+        """ Read text pairs from the specified range chunk by chunk.
+
+        :param start: index of the first read text pair.
+        :param end: index of the text pair after the last read one.
+        :param chunk_size: maximal number of text pairs in a chunk.
+
+        :return the two-element tuple of lists: input texts and target texts of the chunk.
+
+        """
+        input_texts = []
+        target_texts = []
+        for text_pair_idx, (input_text, target_text) in enumerate(self):
+            if text_pair_idx >= end:
+                break
+            if text_pair_idx < start:
+                continue
+            input_texts.append(input_text)
+            target_texts.append(target_text)
+            if len(input_texts) >= chunk_size:
+                yield input_texts, target_texts
+                input_texts = []
+                target_texts = []
+        if len(input_texts) > 0:
+            yield input_texts, target_texts
+
+    @staticmethod
+    def calculate_number_of_batches(n_text_pairs, batch_size):
+        """ Calculate number of mini-batches, which are generated from the stream at each epoch.
+
+        :param n_text_pairs: number of used text pairs in the stream.
+        :param batch_size: number of text pairs in single mini-batch.
+
+        :return number of mini-batches.
+
+        """
+        chunk_size = batch_size * TextPairStream.BATCHES_PER_CHUNK
+        n_batches = (n_text_pairs // chunk_size) * TextPairStream.BATCHES_PER_CHUNK
+        n_batches += (n_text_pairs % chunk_size + batch_size - 1) // batch_size
+        return n_batches
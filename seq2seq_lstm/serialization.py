@@ -0,0 +1,137 @@
+""" Serialization of numpy arrays into the single contiguous buffer
+
+This module packs a list of numpy arrays (for example, weights of the neural model) into one binary buffer and unpacks
+them back without temporary files. The buffer consists of the signature, the header size (8-byte unsigned integer), the
+header in JSON and all arrays, each of which is aligned to 64 bytes (as in the corpus file, see `TextPairCorpus`).
+The header contains locations, data types and shapes of arrays, and it can contain any additional JSON-serializable
+description.
+
+Unpacked arrays are read-only views of the buffer, so unpacking does not copy array data. The same layout is used for
+files: `save_arrays` writes arrays into the file, and `map_arrays` maps this file into memory by `np.memmap`, so several
+processes, which read the same file, share its physical pages. This module does not depend on TensorFlow.
+
+"""
+
+import json
+
+import numpy as np
+
+
+SIGNATURE = b'S2SARRS1'
+ALIGNMENT = 64
+
+
+def calculate_padded_size(size):
+    """ Calculate the size of data block, which is padded to the alignment boundary.
+
+    :param size: size of data in bytes.
+
+    :return padded size in bytes.
+
+    """
+    return ((size + ALIGNMENT - 1) // ALIGNMENT) * ALIGNMENT
+
+
+def create_header(arrays, description=None):
+    """ Create the header for the specified arrays.
+
+    :param arrays: list of contiguous numpy arrays.
+    :param description: additional JSON-serializable dictionary, which is saved in the header (or None).
+
+    :return the three-element tuple: the header prefix (the signature, the header size and the header in JSON, `bytes`
+    object), list of array positions relative to the data start and the total size of the packed data in bytes.
+
+    """
+    header = {'description': dict() if description is None else description, 'arrays': []}
+    position = 0
+    for array_data in arrays:
+        header['arrays'].append({'offset': position, 'dtype': array_data.dtype.str, 'shape': list(array_data.shape)})
+        position += calculate_padded_size(array_data.nbytes)
+    encoded_header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header_prefix = SIGNATURE + len(encoded_header).to_bytes(8, byteorder='little') + encoded_header
+    return header_prefix, [cur['offset'] for cur in header['arrays']], \
+        calculate_padded_size(len(header_prefix)) + position
+
+
+def pack_arrays(arrays, description=None):
+    """ Pack numpy arrays into the single binary buffer.
+
+    :param arrays: list of numpy arrays.
+    :param description: additional JSON-serializable dictionary, which is saved in the header (or None).
+
+    :return the packed buffer (`bytes` object).
+
+    """
+    arrays = [np.ascontiguousarray(cur) for cur in arrays]
+    header_prefix, positions, total_size = create_header(arrays, description)
+    data_start = calculate_padded_size(len(header_prefix))
+    buffer = bytearray(total_size)
+    buffer[0:len(header_prefix)] = header_prefix
+    buffer_view = np.frombuffer(buffer, dtype=np.uint8)
+    for position, array_data in zip(positions, arrays):
+        array_start = data_start + position
+        buffer_view[array_start:(array_start + array_data.nbytes)] = array_data.reshape(-1).view(np.uint8)
+    del buffer_view
+    return bytes(buffer)
+
+
+def save_arrays(file_name, arrays, description=None):
+    """ Save numpy arrays into the binary file, which has the same layout as the buffer created by `pack_arrays`.
+
+    Arrays are written one by one, so the whole packed buffer is not created in memory.
+
+    :param file_name: name of the file.
+    :param arrays: list of numpy arrays.
+    :param description: additional JSON-serializable dictionary, which is saved in the header (or None).
+
+    """
+    arrays = [np.ascontiguousarray(cur) for cur in arrays]
+    header_prefix, _, _ = create_header(arrays, description)
+    with open(file_name, 'wb') as fp:
+        fp.write(header_prefix)
+        fp.write(b'\0' * (calculate_padded_size(len(header_prefix)) - len(header_prefix)))
+        for array_data in arrays:
+            fp.write(array_data.reshape(-1).view(np.uint8).data)
+            fp.write(b'\0' * (calculate_padded_size(array_data.nbytes) - array_data.nbytes))
+
+
+def map_arrays(file_name):
+    """ Map numpy arrays from the binary file, which was created by `save_arrays`, into memory.
+
+    :param file_name: name of the file.
+
+    :return the two-element tuple: list of numpy arrays (read-only views of the memory-mapped file) and the additional
+    description.
+
+    """
+    return unpack_arrays(np.memmap(file_name, dtype=np.uint8, mode='r'))
+
+
+def unpack_arrays(buffer):
+    """ Unpack numpy arrays from the buffer, which was created by `pack_arrays`.
+
+    :param buffer: the packed buffer (`bytes`, `bytearray`, `memoryview` or any other object with the buffer protocol,
+    for example, `mmap.mmap`).
+
+    :return the two-element tuple: list of numpy arrays (read-only views of the buffer) and the additional description.
+
+    """
+    buffer = memoryview(buffer).cast('B')
+    if bytes(buffer[0:len(SIGNATURE)]) != SIGNATURE:
+        raise ValueError('The buffer does not contain packed arrays! Its signature is wrong.')
+    header_size = int.from_bytes(bytes(buffer[len(SIGNATURE):(len(SIGNATURE) + 8)]), byteorder='little')
+    header_end = len(SIGNATURE) + 8 + header_size
+    if header_end > len(buffer):
+        raise ValueError('The buffer with packed arrays is truncated!')
+    header = json.loads(bytes(buffer[(len(SIGNATURE) + 8):header_end]).decode('utf-8'))
+    data_start = calculate_padded_size(header_end)
+    arrays = []
+    for array_info in header['arrays']:
+        dtype = np.dtype(array_info['dtype'])
+        shape = tuple(array_info['shape'])
+        n_items = int(np.prod(shape, dtype=np.int64))
+        array_start = data_start + array_info['offset']
+        if array_start + n_items * dtype.itemsize > len(buffer):
+            raise ValueError('The buffer with packed arrays is truncated!')
+        arrays.append(np.frombuffer(buffer, dtype=dtype, count=n_items, offset=array_start).reshape(shape))
+    return arrays, header['description']
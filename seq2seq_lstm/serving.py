@@ -0,0 +1,302 @@
+""" Online inference server with dynamic micro-batching
+
+Each request of online inference contains one text usually, and prediction with the batch size 1 is very inefficient.
+The `MicroBatcher` collects requests in the asyncio queue for up to `max_latency_ms` milliseconds or until the batch
+contains `max_batch_size` texts, predicts all collected texts by the single call of the model and returns results to
+waiting requests. The batcher also collects metrics of the queue depth, batch sizes and waiting time.
+
+The simple HTTP front end (see `create_http_server`) is included for local usage and testing:
+
+    python -m seq2seq_lstm.serving some_file.bin --port 8080 --max-batch-size 32 --max-latency-ms 5
+
+    (with the `--numpy` option the model is loaded as `Seq2SeqPredictor`, which does not import TensorFlow);
+
+    POST /predict with JSON {"text": "..."} or {"texts": ["...", ...]} returns {"prediction": "..."} or
+    {"predictions": ["...", ...]};
+    GET /metrics returns metrics of the batcher in JSON.
+
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+
+class MicroBatcher(object):
+    """ Dynamic batcher of prediction requests for the sequence-to-sequence model. """
+
+    def __init__(self, model, max_batch_size=32, max_latency_ms=5.0):
+        """ Create the batcher (it must be started by the `start` method in the running event loop).
+
+        :param model: the trained model, which has the `predict` method for list of texts (`Seq2SeqLSTM` object).
+        :param max_batch_size: the maximal number of texts in one batch.
+        :param max_latency_ms: the maximal time of collecting requests for one batch in milliseconds.
+
+        """
+        if not hasattr(model, 'predict'):
+            raise ValueError('`model` is wrong! It has not the `predict` method.')
+        if not isinstance(max_batch_size, int):
+            raise ValueError(f'`max_batch_size` is wrong! Expected `{type(3)}`, got `{type(max_batch_size)}`.')
+        if max_batch_size < 1:
+            raise ValueError(f'`max_batch_size` is wrong! Expected a positive integer value, but {max_batch_size} is '
+                             f'not positive.')
+        if (not isinstance(max_latency_ms, int)) and (not isinstance(max_latency_ms, float)):
+            raise ValueError(f'`max_latency_ms` is wrong! Expected `{type(3.5)}`, got `{type(max_latency_ms)}`.')
+        if max_latency_ms < 0.0:
+            raise ValueError(f'`max_latency_ms` is wrong! Expected a non-negative value, but {max_latency_ms} is '
+                             f'negative.')
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self.queue_ = None
+        self.worker_ = None
+        self.executor_ = None
+        self.current_batch_ = []
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        """ Reset all counters of metrics. """
+        self.max_queue_depth_ = 0
+        self.n_requests_ = 0
+        self.n_batches_ = 0
+        self.n_predicted_texts_ = 0
+        self.max_batch_size_ = 0
+        self.total_waiting_time_ = 0.0
+        self.max_waiting_time_ = 0.0
+
+    @property
+    def is_running(self):
+        return (self.worker_ is not None) and (not self.worker_.done())
+
+    async def start(self):
+        """ Start the batching worker in the running event loop. """
+        if self.is_running:
+            raise RuntimeError('The batcher is already started!')
+        self.queue_ = asyncio.Queue()
+        self.executor_ = ThreadPoolExecutor(max_workers=1)
+        self.worker_ = asyncio.get_running_loop().create_task(self.process_requests())
+
+    async def stop(self):
+        """ Stop the batching worker.
+
+        Requests, which are waiting in the queue or are collected into the current batch (including the batch, which
+        is being predicted now), are cancelled. The prediction of the current batch cannot be interrupted, therefore it
+        is awaited in the default executor of the event loop, which keeps serving other coroutines in the meantime.
+
+        """
+        if self.worker_ is not None:
+            self.worker_.cancel()
+            try:
+                await self.worker_
+            except asyncio.CancelledError:
+                pass
+            self.worker_ = None
+        for _, future, _ in self.current_batch_:
+            future.cancel()
+        self.current_batch_ = []
+        if self.queue_ is not None:
+            while not self.queue_.empty():
+                _, future, _ = self.queue_.get_nowait()
+                future.cancel()
+        if self.executor_ is not None:
+            executor = self.executor_
+            self.executor_ = None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown, True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def predict(self, text):
+        """ Predict the resulting sequence for one source sequence, which is batched with other requests.
+
+        :param text: source sequence (unicode text composed from tokens separated by spaces).
+
+        :return: resulting sequence.
+
+        """
+        if not hasattr(text, 'split'):
+            raise ValueError(f'`text` is wrong! Expected `{type("a")}`, got `{type(text)}`.')
+        if not self.is_running:
+            raise RuntimeError('The batcher is not started!')
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue_.put_nowait((text, future, loop.time()))
+        self.n_requests_ += 1
+        self.max_queue_depth_ = max(self.max_queue_depth_, self.queue_.qsize())
+        return await future
+
+    async def collect_batch(self):
+        """ Wait for the first request and collect next requests until the batch is full or the latency is expired.
+
+        Collected requests are kept in the `current_batch_` attribute too, so they are cancelled by the `stop` method,
+        if the worker is stopped before their prediction is finished.
+
+        :return: list of requests (each request is the tuple of the text, the future and the time of its arrival).
+
+        """
+        loop = asyncio.get_running_loop()
+        batch = self.current_batch_ = [await self.queue_.get()]
+        deadline = loop.time() + self.max_latency_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            if not self.queue_.empty():
+                batch.append(self.queue_.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0.0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue_.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def process_requests(self):
+        """ Predict collected batches in the separate thread and return results to waiting requests. """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [cur for cur in await self.collect_batch() if not cur[1].cancelled()]
+            if len(batch) == 0:
+                continue
+            start_time = loop.time()
+            for _, _, arrival_time in batch:
+                waiting_time = start_time - arrival_time
+                self.total_waiting_time_ += waiting_time
+                self.max_waiting_time_ = max(self.max_waiting_time_, waiting_time)
+            self.n_batches_ += 1
+            self.n_predicted_texts_ += len(batch)
+            self.max_batch_size_ = max(self.max_batch_size_, len(batch))
+            try:
+                predicted_texts = await loop.run_in_executor(self.executor_, self.model.predict,
+                                                             [cur[0] for cur in batch])
+            except Exception as err:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(err)
+                self.current_batch_ = []
+                continue
+            for (_, future, _), predicted_text in zip(batch, predicted_texts):
+                if not future.done():
+                    future.set_result(predicted_text)
+            self.current_batch_ = []
+
+    def get_metrics(self):
+        """ Get metrics of the batcher.
+
+        :return: dictionary with the current and maximal depth of the queue, numbers of requests and batches, the mean
+        and maximal batch size, the mean and maximal waiting time of requests in the queue (in milliseconds).
+
+        """
+        return {
+            'queue_depth': 0 if self.queue_ is None else self.queue_.qsize(),
+            'max_queue_depth': self.max_queue_depth_,
+            'requests': self.n_requests_,
+            'batches': self.n_batches_,
+            'mean_batch_size': (self.n_predicted_texts_ / self.n_batches_) if self.n_batches_ > 0 else 0.0,
+            'max_batch_size': self.max_batch_size_,
+            'mean_waiting_time_ms': (1000.0 * self.total_waiting_time_ / self.n_predicted_texts_)
+            if self.n_predicted_texts_ > 0 else 0.0,
+            'max_waiting_time_ms': 1000.0 * self.max_waiting_time_
+        }
+
+
+async def handle_http_request(batcher, reader, writer):
+    """ Handle one HTTP request (the connection is closed after the response).
+
+    :param batcher: the started `MicroBatcher` object.
+    :param reader: the `asyncio.StreamReader` object of the connection.
+    :param writer: the `asyncio.StreamWriter` object of the connection.
+
+    """
+    status = 200
+    try:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        headers = dict()
+        while True:
+            header_line = (await reader.readline()).decode('latin-1').strip()
+            if len(header_line) == 0:
+                break
+            header_name, _, header_value = header_line.partition(':')
+            headers[header_name.strip().lower()] = header_value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', '0')))
+        request_parts = request_line.split()
+        method, path = (request_parts[0], request_parts[1]) if len(request_parts) >= 2 else ('', '')
+        if (method == 'GET') and (path == '/metrics'):
+            response = batcher.get_metrics()
+        elif (method == 'POST') and (path == '/predict'):
+            data = json.loads(body.decode('utf-8'))
+            if isinstance(data, dict) and isinstance(data.get('text'), str):
+                response = {'prediction': await batcher.predict(data['text'])}
+            elif isinstance(data, dict) and isinstance(data.get('texts'), list) and \
+                    all([isinstance(cur, str) for cur in data['texts']]):
+                response = {'predictions': list(await asyncio.gather(*[batcher.predict(cur)
+                                                                         for cur in data['texts']]))}
+            else:
+                status = 400
+                response = {'error': 'The request must contain the text or the list of texts!'}
+        else:
+            status = 404
+            response = {'error': f'The resource "{method} {path}" is not found!'}
+    except (ValueError, asyncio.IncompleteReadError) as err:
+        status = 400
+        response = {'error': str(err)}
+    except Exception as err:
+        status = 500
+        response = {'error': str(err)}
+    encoded_response = json.dumps(response, ensure_ascii=False).encode('utf-8')
+    reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+    writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                 f'Content-Length: {len(encoded_response)}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+    writer.write(encoded_response)
+    await writer.drain()
+    writer.close()
+
+
+async def create_http_server(batcher, host='127.0.0.1', port=8080):
+    """ Create the HTTP server, which handles prediction requests by the specified batcher.
+
+    :param batcher: the started `MicroBatcher` object.
+    :param host: the host name.
+    :param port: the port number (if it is zero, then any free port is selected).
+
+    :return: the `asyncio.Server` object.
+
+    """
+    return await asyncio.start_server(lambda reader, writer: handle_http_request(batcher, reader, writer), host, port)
+
+
+async def serve(model, host, port, max_batch_size, max_latency_ms):
+    async with MicroBatcher(model, max_batch_size=max_batch_size, max_latency_ms=max_latency_ms) as batcher:
+        server = await create_http_server(batcher, host, port)
+        async with server:
+            print(f'Serving on {", ".join([str(cur.getsockname()) for cur in server.sockets])}.')
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Online inference server for the sequence-to-sequence model.')
+    parser.add_argument('model_name', type=str, help='Name of the model file, which is created by `Seq2SeqLSTM.save`.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host name.')
+    parser.add_argument('--port', type=int, default=8080, help='Port number.')
+    parser.add_argument('--max-batch-size', dest='max_batch_size', type=int, default=32,
+                        help='Maximal number of texts in one batch.')
+    parser.add_argument('--max-latency-ms', dest='max_latency_ms', type=float, default=5.0,
+                        help='Maximal time of collecting requests for one batch in milliseconds.')
+    parser.add_argument('--numpy', dest='use_numpy', action='store_true',
+                        help='Predict by the NumPy inference engine without TensorFlow (the greedy decoding only).')
+    args = parser.parse_args()
+    if args.use_numpy:
+        from .inference import Seq2SeqPredictor
+        model = Seq2SeqPredictor.load(args.model_name)
+    else:
+        from .seq2seq_lstm import Seq2SeqLSTM
+        model = Seq2SeqLSTM.load(args.model_name)
+    asyncio.run(serve(model, args.host, args.port, args.max_batch_size, args.max_latency_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+""" Keras components for training of the sequence-to-sequence model
+
+This module contains the generator of training mini-batches (`TextPairSequence`), the callback, which keeps the best
+weights in memory (`BestWeightsCheckpoint`), and the layer of the sampled softmax loss (`SampledSoftmaxLoss`). All of
+them are subclasses of Keras classes, so this module imports TensorFlow, and it is imported by `Seq2SeqLSTM` only when
+the neural network is built or trained. Thus, the import of the `seq2seq_lstm` package and the inference with the NumPy
+engine do not need TensorFlow.
+
+"""
+
+import random
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.layers import Layer
+from tensorflow.keras.utils import Sequence
+
+from .seq2seq_lstm import EncodedTexts
+
+
+class BestWeightsCheckpoint(Callback):
+    """ Callback, which keeps a copy of the best weights of the model in memory instead of the checkpoint file.
+
+    The monitored quantity is minimized, and weights are copied at the end of each epoch, in which this quantity is
+    improved. After training, the best weights are restored by `model.set_weights(checkpoint.best_weights)`.
+
+    """
+    def __init__(self, monitor='val_loss', verbose=0):
+        """ Create the in-memory checkpoint.
+
+        :param monitor: name of the monitored quantity in epoch logs.
+        :param verbose: verbosity mode (0 or 1).
+
+        """
+        super(BestWeightsCheckpoint, self).__init__()
+        self.monitor = monitor
+        self.verbose = verbose
+        self.best = np.inf
+        self.best_weights = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = None if logs is None else logs.get(self.monitor)
+        if current is None:
+            return
+        if current < self.best:
+            if self.verbose > 0:
+                print(f'\nEpoch {epoch + 1}: {self.monitor} improved from {self.best:.5f} to {current:.5f}, '
+                      f'keeping weights in memory')
+            self.best = current
+            self.best_weights = self.model.get_weights()
+        elif self.verbose > 0:
+            print(f'\nEpoch {epoch + 1}: {self.monitor} did not improve from {self.best:.5f}')
+
+
+class SampledSoftmaxLoss(Layer):
+    """ Loss layer, which approximates the softmax over a large target vocabulary by a small sample of negative tokens.
+
+    This layer gets outputs of the decoder LSTM and desired token indices (padding positions are marked by -1), and it
+    uses the kernel and the bias of the output `Dense` layer without calculation of the full softmax. At each training
+    step `num_sampled` negative tokens are sampled (according to `unigrams` or to the log-uniform distribution), and the
+    softmax is calculated over desired and sampled tokens only (see `tf.nn.sampled_softmax_loss`). If the layer is not
+    in the training mode (for example, on the evaluation set), then the exact softmax cross-entropy is calculated.
+
+    The mean loss over all non-padding positions is added to losses of the model, and per-token losses are returned.
+
+    """
+    def __init__(self, output_layer, num_sampled, unigrams=None, **kwargs):
+        """ Create the sampled softmax loss for the specified output layer.
+
+        :param output_layer: the `Dense` layer, which calculates the full softmax over the target vocabulary.
+        :param num_sampled: number of sampled negative tokens at each training step (positive integer).
+        :param unigrams: list of frequencies of target tokens for sampling (or None for the log-uniform distribution).
+
+        """
+        super(SampledSoftmaxLoss, self).__init__(**kwargs)
+        self.output_layer = output_layer
+        self.num_sampled = num_sampled
+        self.unigrams = unigrams
+        self.supports_masking = True
+
+    def build(self, input_shape):
+        if not self.output_layer.built:
+            self.output_layer.build(input_shape[0])
+        super(SampledSoftmaxLoss, self).build(input_shape)
+
+    def compute_mask(self, inputs, mask=None):
+        return None
+
+    def call(self, inputs, training=None):
+        decoder_outputs, decoder_targets = inputs
+        target_mask = tf.not_equal(decoder_targets, -1)
+        decoder_outputs = tf.boolean_mask(decoder_outputs, target_mask)
+        labels = tf.cast(tf.boolean_mask(decoder_targets, target_mask), tf.int64)
+        num_classes = self.output_layer.units
+        if training and (self.num_sampled < num_classes):
+            if self.unigrams is None:
+                sampled_values = None
+            else:
+                sampled_values = tf.random.fixed_unigram_candidate_sampler(
+                    true_classes=labels[:, None], num_true=1, num_sampled=self.num_sampled, unique=True,
+                    range_max=num_classes, unigrams=self.unigrams
+                )
+            losses = tf.nn.sampled_softmax_loss(
+                weights=tf.transpose(self.output_layer.kernel), biases=self.output_layer.bias,
+                labels=labels[:, None], inputs=decoder_outputs, num_sampled=self.num_sampled, num_classes=num_classes,
+                sampled_values=sampled_values
+            )
+        else:
+            losses = tf.nn.sparse_softmax_cross_entropy_with_logits(
+                labels=labels,
+                logits=tf.matmul(decoder_outputs, self.output_layer.kernel) + self.output_layer.bias
+            )
+        self.add_loss(tf.reduce_mean(losses))
+        return losses
+
+
+class TextPairSequence(Sequence):
+    """ Object for fitting to a sequence of text pairs without calculating features for all these pairs in memory.
+
+    """
+    def __init__(self, input_texts, target_texts, batch_size, max_encoder_seq_length, max_decoder_seq_length,
+                 input_token_index, target_token_index, lowercase, use_token_ids=False, bucketing=False,
+                 sparse_targets=False, targets_as_inputs=False):
+        """ Generate feature matrices based on one-hot vectorization for pairs of texts by mini-batches.
+
+        This generator is used in the training process of the neural model (see the `fit_generator` method of the Keras
+        `Model` object). Each text (input or target one) is a unicode string in which all tokens are separated by
+        spaces. Each pair of texts generates three 3-D arrays (numpy.ndarray objects):
+
+        1) one-hot vectorization of corresponded input text (first dimension is index of text in the mini-batch, second
+        dimension is a timestep, or token position in this text, and third dimension is index of this token in the input
+        vocabulary);
+
+        2) one-hot vectorization of corresponded target text (first dimension is index of text in the mini-batch, second
+        dimension is a timestep, or token position in this text, and third dimension is index of this token in the
+        target vocabulary);
+
+        3) array is the same as second one but offset by one timestep.
+
+        In the training process first and second array will be fed into the neural model, and third array will be
+        considered as its desired output.
+
+        If `use_token_ids` is True, then first and second arrays are 2-D arrays of token indices (each index is a
+        position of the token in the corresponded vocabulary plus one, and zero is reserved for padding). It is
+        necessary for the neural model with the `Embedding` layers instead of one-hot inputs.
+
+        If `bucketing` is True, then text pairs are sorted by their lengths, and each mini-batch is composed from text
+        pairs of similar lengths. Such mini-batch is padded to the maximal length of texts in this mini-batch instead of
+        `max_encoder_seq_length` and `max_decoder_seq_length`, therefore a few long text pairs do not increase the
+        number of timesteps in all mini-batches. Text pairs of equal lengths are shuffled and mini-batches are
+        re-composed after each epoch.
+
+        If `sparse_targets` is True, then third array is 2-D array of target token indices instead of one-hot vectors
+        (without adding one, and padding positions are marked by -1). Such array is used with the sparse categorical
+        cross-entropy, which ignores the class -1, and it is much smaller than one-hot vectors for large vocabularies.
+
+        If `targets_as_inputs` is True, then all three arrays are fed into the neural model, and there is no desired
+        output (the loss is calculated inside the neural model, for example, by the `SampledSoftmaxLoss` layer). It is
+        used with sparse targets only.
+
+        Texts are tokenized and encoded only once at the generator creation. Also, they can be encoded beforehand (it
+        is done in the `Seq2SeqLSTM.fit`), and then `input_texts` and `target_texts` are `EncodedTexts` objects.
+
+        This generator is pickled without source texts and token indices, because encoded texts are enough to generate
+        mini-batches. If encoded texts are placed in the shared memory or in the corpus file, then they are not copied
+        at pickling too, so the generator is cheaply sent to worker processes.
+
+        :param input_texts: sequence (list, tuple or numpy.ndarray) of input texts, or the `EncodedTexts` object.
+        :param target_texts: sequence (list, tuple or numpy.ndarray) of target texts, or the `EncodedTexts` object.
+        :param batch_size: target size of single mini-batch, i.e. number of text pairs in this mini-batch.
+        :param max_encoder_seq_length: maximal length of any input text.
+        :param max_decoder_seq_length: maximal length of any target text.
+        :param input_token_index: the special index for one-hot encoding any input text as numerical feature matrix.
+        :param target_token_index: the special index for one-hot encoding any target text as numerical feature matrix.
+        :param lowercase: the need to bring all tokens of all texts to the lowercase.
+        :param use_token_ids: the need to represent input tokens by their indices instead of one-hot vectors.
+        :param bucketing: the need to compose mini-batches from text pairs of similar lengths.
+        :param sparse_targets: the need to represent desired outputs by token indices instead of one-hot vectors.
+        :param targets_as_inputs: the need to feed desired outputs into the neural model as its third input.
+
+        :return the two-element tuple with input and output mini-batch data for the neural model training respectively.
+
+        """
+        self.input_texts = input_texts
+        self.target_texts = target_texts
+        self.batch_size = batch_size
+        self.max_encoder_seq_length = max_encoder_seq_length
+        self.max_decoder_seq_length = max_decoder_seq_length
+        self.input_token_index = input_token_index
+        self.target_token_index = target_token_index
+        self.lowercase = lowercase
+        self.use_token_ids = use_token_ids
+        self.bucketing = bucketing
+        self.sparse_targets = sparse_targets
+        self.targets_as_inputs = targets_as_inputs
+        if isinstance(input_texts, EncodedTexts):
+            self.encoded_input_texts = input_texts
+        else:
+            self.encoded_input_texts = EncodedTexts.encode(input_texts, input_token_index, lowercase)
+        if isinstance(target_texts, EncodedTexts):
+            self.encoded_target_texts = target_texts
+        else:
+            self.encoded_target_texts = EncodedTexts.encode(target_texts, target_token_index, lowercase)
+        self.input_vocabulary_size = len(input_token_index)
+        self.target_vocabulary_size = len(target_token_index)
+        self.start_token_idx = target_token_index['\t']
+        self.end_token_idx = target_token_index['\n']
+        self.n_text_pairs = len(self.encoded_input_texts)
+        self.n_batches = self.n_text_pairs // self.batch_size
+        while (self.n_batches * self.batch_size) < self.n_text_pairs:
+            self.n_batches += 1
+        if self.bucketing:
+            self.input_lengths = self.encoded_input_texts.get_lengths().astype(np.int32)
+            self.target_lengths = self.encoded_target_texts.get_lengths().astype(np.int32) + 2
+            self.batches = self.compose_batches()
+        else:
+            self.input_lengths = None
+            self.target_lengths = None
+            self.batches = None
+
+    def __len__(self):
+        return self.n_batches
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attribute_name in ['input_texts', 'target_texts', 'input_token_index', 'target_token_index']:
+            state[attribute_name] = None
+        return state
+
+    def compose_batches(self):
+        """ Compose mini-batches from text pairs of similar lengths.
+
+        Text pairs are sorted by lengths of input texts and then by lengths of target texts, and ties are broken
+        randomly. Sorted text pairs are split into mini-batches, and the order of these mini-batches is shuffled.
+
+        :return list of mini-batches, each of which is 1-D array of text pair indices.
+
+        """
+        sorted_indices = np.lexsort((np.random.random(self.n_text_pairs), self.target_lengths, self.input_lengths))
+        batches = [sorted_indices[pos:(pos + self.batch_size)] for pos in range(0, self.n_text_pairs, self.batch_size)]
+        random.shuffle(batches)
+        return batches
+
+    def on_epoch_end(self):
+        if self.bucketing:
+            self.batches = self.compose_batches()
+
+    def as_dataset(self, workers=None, cache=False):
+        """ Wrap this generator into the `tf.data` pipeline.
+
+        Mini-batches are built by the `__getitem__` method in parallel with each other and with training steps, and
+        the next mini-batches are prefetched. The order of mini-batches is shuffled at each epoch. If `bucketing` is
+        True, then the `on_epoch_end` method must be called after each epoch (Keras does not call it for datasets).
+
+        :param workers: number of parallel calls of `__getitem__` (positive integer or None). If it is None, then this
+        number is tuned automatically.
+        :param cache: need to cache built mini-batches in memory after the first epoch.
+
+        :return the `tf.data.Dataset` object.
+
+        """
+        if self.use_token_ids:
+            input_dtype = tf.int32
+            encoder_shape = (None, None)
+            decoder_shape = (None, None)
+        else:
+            input_dtype = tf.float32
+            encoder_shape = (None, None, self.input_vocabulary_size)
+            decoder_shape = (None, None, self.target_vocabulary_size)
+        if self.sparse_targets:
+            target_dtype = tf.int32
+            target_shape = (None, None)
+        else:
+            target_dtype = tf.float32
+            target_shape = (None, None, self.target_vocabulary_size)
+
+        def get_batch(batch_idx):
+            if self.targets_as_inputs:
+                (encoder_input_data, decoder_input_data, decoder_target_data), = self[int(batch_idx)]
+            else:
+                (encoder_input_data, decoder_input_data), decoder_target_data = self[int(batch_idx)]
+            return encoder_input_data, decoder_input_data, decoder_target_data
+
+        def load_batch(batch_idx):
+            encoder_input_data, decoder_input_data, decoder_target_data = tf.numpy_function(
+                get_batch, [batch_idx], [input_dtype, input_dtype, target_dtype]
+            )
+            encoder_input_data.set_shape(encoder_shape)
+            decoder_input_data.set_shape(decoder_shape)
+            decoder_target_data.set_shape(target_shape)
+            if self.targets_as_inputs:
+                return (encoder_input_data, decoder_input_data, decoder_target_data),
+            return (encoder_input_data, decoder_input_data), decoder_target_data
+
+        n_parallel_calls = tf.data.AUTOTUNE if workers is None else workers
+        dataset = tf.data.Dataset.range(len(self))
+        if cache:
+            dataset = dataset.map(load_batch, num_parallel_calls=n_parallel_calls).cache()
+            dataset = dataset.shuffle(len(self), reshuffle_each_iteration=True)
+        else:
+            dataset = dataset.shuffle(len(self), reshuffle_each_iteration=True)
+            dataset = dataset.map(load_batch, num_parallel_calls=n_parallel_calls, deterministic=False)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def __getitem__(self, idx):
+        if self.bucketing:
+            text_pair_indices = self.batches[idx]
+            max_encoder_seq_length = int(self.input_lengths[text_pair_indices].max())
+            max_decoder_seq_length = int(self.target_lengths[text_pair_indices].max())
+        else:
+            start_pos = idx * self.batch_size
+            text_pair_indices = [src_text_idx % self.n_text_pairs
+                                 for src_text_idx in range(start_pos, start_pos + self.batch_size)]
+            max_encoder_seq_length = self.max_encoder_seq_length
+            max_decoder_seq_length = self.max_decoder_seq_length
+        batch_size = len(text_pair_indices)
+        encoder_token_matrix = np.full((batch_size, max_encoder_seq_length), -1, dtype=np.int32)
+        decoder_token_matrix = np.full((batch_size, max_decoder_seq_length + 1), -1, dtype=np.int32)
+        decoder_token_matrix[:, 0] = self.start_token_idx
+        for idx_in_batch, prep_text_idx in enumerate(text_pair_indices):
+            input_tokens = self.encoded_input_texts[prep_text_idx][0:max_encoder_seq_length]
+            encoder_token_matrix[idx_in_batch, 0:input_tokens.shape[0]] = input_tokens
+            target_tokens = self.encoded_target_texts[prep_text_idx][0:(max_decoder_seq_length - 2)]
+            decoder_token_matrix[idx_in_batch, 1:(target_tokens.shape[0] + 1)] = target_tokens
+            decoder_token_matrix[idx_in_batch, target_tokens.shape[0] + 1] = self.end_token_idx
+        encoder_input_data = self.vectorize(encoder_token_matrix, self.input_vocabulary_size, self.use_token_ids)
+        decoder_input_data = self.vectorize(decoder_token_matrix[:, 0:max_decoder_seq_length],
+                                            self.target_vocabulary_size, self.use_token_ids)
+        if self.sparse_targets:
+            decoder_target_data = decoder_token_matrix[:, 1:].copy()
+        else:
+            decoder_target_data = self.vectorize(decoder_token_matrix[:, 1:], self.target_vocabulary_size, False)
+        if self.targets_as_inputs:
+            return (encoder_input_data, decoder_input_data, decoder_target_data),
+        return [encoder_input_data, decoder_input_data], decoder_target_data
+
+    @staticmethod
+    def vectorize(token_matrix, vocabulary_size, use_token_ids):
+        """ Vectorize the padded matrix of token indices for the neural model.
+
+        :param token_matrix: 2-D array of token indices, in which padding positions are marked by -1.
+        :param vocabulary_size: number of tokens in the vocabulary.
+        :param use_token_ids: the need to represent tokens by their indices plus one instead of one-hot vectors.
+
+        :return 2-D array of token indices (if `use_token_ids` is True) or 3-D array of one-hot vectors.
+
+        """
+        if use_token_ids:
+            return token_matrix + 1
+        data = np.zeros(token_matrix.shape + (vocabulary_size,), dtype=np.float32)
+        rows, columns = np.nonzero(token_matrix >= 0)
+        data[rows, columns, token_matrix[rows, columns]] = 1.0
+        return data
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import re
+import sys
+import time
+import unittest
+
+try:
+    from seq2seq_lstm.caching import DiskCache, LRUCache
+except:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from seq2seq_lstm.caching import DiskCache, LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_put_get_positive01(self):
+        cache = LRUCache(3)
+        for key in ['a', 'b', 'c']:
+            self.assertTrue(cache.put(key, key.upper()))
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertTrue(cache.put('d', 'D'))
+        self.assertEqual(cache.keys(), ['c', 'a', 'd'])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('b', 'B'), 'B')
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.total_size, 3)
+        self.assertEqual(cache.n_hits, 1)
+        self.assertEqual(cache.n_misses, 2)
+        self.assertEqual(cache.n_evictions, 1)
+
+    def test_put_get_positive02(self):
+        cache = LRUCache(100)
+        self.assertTrue(cache.put('a', 1, size=60))
+        self.assertTrue(cache.put('b', 2, size=30))
+        self.assertTrue(cache.put('a', 3, size=20))
+        self.assertEqual(cache.total_size, 50)
+        self.assertTrue(cache.put('c', 4, size=70))
+        self.assertEqual(cache.keys(), ['a', 'c'])
+        self.assertEqual(cache.total_size, 90)
+        self.assertFalse(cache.put('d', 5, size=101))
+        self.assertNotIn('d', cache)
+        self.assertEqual(cache.pop('a'), 3)
+        self.assertIsNone(cache.pop('a'))
+        self.assertEqual(cache.total_size, 70)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.total_size, 0)
+
+    def test_creation_negative01(self):
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        true_err_msg = re.escape('`max_size` is wrong! Expected a positive value, but 0 is not positive.')
+        with checking_method(ValueError, true_err_msg):
+            _ = LRUCache(0)
+        true_err_msg = re.escape(f'`max_size` is wrong! Expected `{type(3)}` or `{type(3.5)}`, got `{type("3")}`.')
+        with checking_method(ValueError, true_err_msg):
+            _ = LRUCache('3')
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.file_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'prediction_cache.sqlite')
+
+    def tearDown(self):
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.isfile(self.file_name + suffix):
+                os.remove(self.file_name + suffix)
+
+    def test_put_get_positive01(self):
+        cache = DiskCache(self.file_name)
+        cache.put_many('first', [('a', 'A'), ('b', 'B')])
+        cache.put_many('second', [('a', 'Z')])
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.get_many('first', ['a', 'b', 'c']), {'a': 'A', 'b': 'B'})
+        self.assertEqual(cache.get_many('second', ['a', 'b']), {'a': 'Z'})
+        self.assertEqual(cache.n_hits, 3)
+        self.assertEqual(cache.n_misses, 2)
+        another_cache = DiskCache(self.file_name)
+        self.assertEqual(another_cache.get_many('first', ['b']), {'b': 'B'})
+        another_cache.put_many('first', [('b', 'BB')])
+        self.assertEqual(cache.get_many('first', ['b']), {'b': 'BB'})
+        another_cache.close()
+        cache.close()
+
+    def test_put_get_positive02(self):
+        """ Many keys are found by several queries. """
+        cache = DiskCache(self.file_name)
+        keys = [str(idx) for idx in range(2 * DiskCache.MAX_KEYS_PER_QUERY + 10)]
+        cache.put_many('first', [(cur, cur + '!') for cur in keys[::2]])
+        found = cache.get_many('first', keys)
+        self.assertEqual(found, dict([(cur, cur + '!') for cur in keys[::2]]))
+        cache.close()
+
+    def test_invalidate_positive01(self):
+        cache = DiskCache(self.file_name)
+        cache.put_many('first', [('a', 'A'), ('b', 'B')])
+        cache.put_many('second', [('a', 'Z')])
+        self.assertEqual(cache.invalidate('second'), 2)
+        self.assertEqual(cache.get_many('first', ['a', 'b']), dict())
+        self.assertEqual(cache.get_many('second', ['a']), {'a': 'Z'})
+        cache.close()
+
+    def test_invalidate_positive02(self):
+        """ Only entries of models, which are not used for the maximal age, are removed. """
+        cache = DiskCache(self.file_name)
+        cache.put_many('first', [('a', 'A'), ('b', 'B')])
+        cache.put_many('second', [('a', 'Z')])
+        self.assertEqual(cache.invalidate('third', max_age=60.0), 0)
+        self.assertEqual(len(cache), 3)
+        time.sleep(0.1)
+        cache.put_many('second', [('b', 'Y')])
+        self.assertEqual(cache.invalidate('third', max_age=0.05), 2)
+        self.assertEqual(cache.get_many('first', ['a', 'b']), dict())
+        self.assertEqual(cache.get_many('second', ['a', 'b']), {'a': 'Z', 'b': 'Y'})
+        cache.close()
+
+    def test_remove_positive01(self):
+        cache = DiskCache(self.file_name)
+        cache.put_many('first', [('a', 'A'), ('b', 'B')])
+        cache.put_many('second', [('a', 'Z')])
+        self.assertEqual(cache.remove(['first', 'third']), 2)
+        self.assertEqual(cache.get_many('first', ['a', 'b']), dict())
+        self.assertEqual(cache.get_many('second', ['a']), {'a': 'Z'})
+        cache.close()
+
+    def test_pickle_positive01(self):
+        cache = DiskCache(self.file_name)
+        cache.put_many('first', [('a', 'A')])
+        another_cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(another_cache.file_name, self.file_name)
+        self.assertEqual(another_cache.get_many('first', ['a']), {'a': 'A'})
+        another_cache.close()
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
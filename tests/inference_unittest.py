@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import os
+import pickle
+import re
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+try:
+    from seq2seq_lstm import Seq2SeqLSTM, Seq2SeqPredictor
+    from seq2seq_lstm.inference import InferenceEngine, quantize_per_channel
+except:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from seq2seq_lstm import Seq2SeqLSTM, Seq2SeqPredictor
+    from seq2seq_lstm.inference import InferenceEngine, quantize_per_channel
+
+
+class TestQuantization(unittest.TestCase):
+    def test_quantize_per_channel_positive01(self):
+        matrix = np.random.RandomState(42).normal(size=(20, 8)).astype(np.float32)
+        matrix[:, 3] = 0.0
+        values, scales = quantize_per_channel(matrix)
+        self.assertEqual(values.dtype, np.int8)
+        self.assertEqual(values.shape, matrix.shape)
+        self.assertEqual(scales.dtype, np.float32)
+        self.assertEqual(scales.shape, (8,))
+        self.assertEqual(np.abs(values).max(axis=0).tolist(), [127, 127, 127, 0, 127, 127, 127, 127])
+        self.assertTrue(np.all(np.abs(values * scales - matrix) <= (scales / 2.0 + 1e-6)))
+
+    def test_quantize_per_channel_positive02(self):
+        matrix = np.random.RandomState(42).normal(size=(20, 8)).astype(np.float32)
+        values, scales = quantize_per_channel(matrix, axis=0)
+        self.assertEqual(scales.shape, (20,))
+        self.assertTrue(np.all(np.abs(values * scales.reshape((20, 1)) - matrix) <=
+                               (scales.reshape((20, 1)) / 2.0 + 1e-6)))
+
+    def test_quantize_per_channel_negative01(self):
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, re.escape('`matrix` is wrong! Expected a 2-D array.')):
+            quantize_per_channel(np.zeros((3,), dtype=np.float32))
+        with checking_method(ValueError, re.escape('`axis` is wrong! Expected 0 or 1, got 2.')):
+            quantize_per_channel(np.zeros((3, 2), dtype=np.float32), axis=2)
+
+
+class TestInferenceEngine(unittest.TestCase):
+    def setUp(self):
+        self.latent_dim = 6
+        self.input_vocabulary_size = 5
+        self.target_vocabulary_size = 7
+        self.embedding_size = 4
+
+    def create_weights(self, use_embeddings):
+        generator = np.random.RandomState(42)
+        weights_of_encoder = [
+            generator.normal(size=(self.embedding_size if use_embeddings else self.input_vocabulary_size,
+                                   4 * self.latent_dim)),
+            generator.normal(size=(self.latent_dim, 4 * self.latent_dim)),
+            generator.normal(size=(4 * self.latent_dim,))
+        ]
+        weights_of_decoder = [
+            generator.normal(size=(self.embedding_size if use_embeddings else self.target_vocabulary_size,
+                                   4 * self.latent_dim)),
+            generator.normal(size=(self.latent_dim, 4 * self.latent_dim)),
+            generator.normal(size=(4 * self.latent_dim,)),
+            generator.normal(size=(self.latent_dim, self.target_vocabulary_size)),
+            generator.normal(size=(self.target_vocabulary_size,))
+        ]
+        if use_embeddings:
+            weights_of_encoder.insert(0, generator.normal(size=(self.input_vocabulary_size + 1, self.embedding_size)))
+            weights_of_decoder.insert(0, generator.normal(size=(self.target_vocabulary_size + 1, self.embedding_size)))
+        return [cur.astype(np.float32) for cur in weights_of_encoder + weights_of_decoder], len(weights_of_encoder)
+
+    def test_encode_positive01(self):
+        """ Padded timesteps of token indices do not change states of the encoder. """
+        engine = InferenceEngine.quantize(*self.create_weights(use_embeddings=True))
+        self.assertTrue(engine.use_embeddings)
+        self.assertEqual(engine.arrays['encoder_embeddings'].dtype, np.int8)
+        self.assertEqual(engine.arrays['encoder_bias'].dtype, np.float32)
+        state_h, state_c = engine.encode(np.array([[1, 3, 2, 0, 0], [4, 1, 0, 0, 0]], dtype=np.int32))
+        self.assertEqual(state_h.shape, (2, self.latent_dim))
+        self.assertEqual(state_c.shape, (2, self.latent_dim))
+        another_state_h, another_state_c = engine.encode(np.array([[1, 3, 2]], dtype=np.int32))
+        self.assertTrue(np.allclose(state_h[0:1], another_state_h))
+        self.assertTrue(np.allclose(state_c[0:1], another_state_c))
+
+    def test_encode_positive02(self):
+        """ Padded timesteps of one-hot vectors do not change states of the encoder. """
+        engine = InferenceEngine.quantize(*self.create_weights(use_embeddings=False))
+        self.assertFalse(engine.use_embeddings)
+        input_seq = np.zeros((2, 4, self.input_vocabulary_size), dtype=np.float32)
+        input_seq[0, [0, 1], [2, 4]] = 1.0
+        input_seq[1, [0, 1, 2, 3], [1, 1, 3, 0]] = 1.0
+        state_h, state_c = engine.encode(input_seq)
+        another_state_h, another_state_c = engine.encode(input_seq[0:1, 0:2])
+        self.assertTrue(np.allclose(state_h[0:1], another_state_h))
+        self.assertTrue(np.allclose(state_c[0:1], another_state_c))
+
+    def test_decode_step_positive01(self):
+        """ The quantized decoder step is close to the float decoder step. """
+        weights, n_encoder_weights = self.create_weights(use_embeddings=True)
+        engine = InferenceEngine.quantize(weights, n_encoder_weights)
+        float_arrays = dict()
+        for name, value in zip(['encoder_embeddings', 'encoder_kernel', 'encoder_recurrent_kernel', 'encoder_bias',
+                                'decoder_embeddings', 'decoder_kernel', 'decoder_recurrent_kernel', 'decoder_bias',
+                                'output_kernel', 'output_bias'], weights):
+            float_arrays[name] = value
+        float_engine = InferenceEngine(float_arrays)
+        state_h = np.random.RandomState(0).uniform(-1.0, 1.0, size=(3, self.latent_dim)).astype(np.float32)
+        state_c = np.random.RandomState(1).uniform(-1.0, 1.0, size=(3, self.latent_dim)).astype(np.float32)
+        target_seq = np.array([[1], [5], [7]], dtype=np.int32)
+        probabilities, new_state_h, new_state_c = engine.decode_step(target_seq, state_h, state_c)
+        true_probabilities, true_state_h, true_state_c = float_engine.decode_step(target_seq, state_h, state_c)
+        self.assertEqual(probabilities.shape, (3, self.target_vocabulary_size))
+        self.assertTrue(np.allclose(probabilities.sum(axis=1), 1.0))
+        self.assertTrue(np.allclose(probabilities, true_probabilities, atol=0.05))
+        self.assertTrue(np.allclose(new_state_h, true_state_h, atol=0.05))
+        self.assertTrue(np.allclose(new_state_c, true_state_c, atol=0.05))
+        self.assertLess(engine.nbytes, float_engine.nbytes)
+
+    def test_multiply_positive01(self):
+        """ The large quantized matrix is multiplied by blocks of rows without the full float32 copy. """
+        engine = InferenceEngine.quantize(*self.create_weights(use_embeddings=False))
+        generator = np.random.RandomState(0)
+        values, scales = quantize_per_channel(generator.normal(size=(300, 1000)).astype(np.float32))
+        engine.arrays['output_kernel'] = values
+        engine.arrays['output_kernel_scales'] = scales
+        inputs = generator.normal(size=(3, 300)).astype(np.float32)
+        product = engine.multiply(inputs, 'output_kernel')
+        self.assertEqual(product.dtype, np.float32)
+        self.assertEqual(product.shape, (3, 1000))
+        self.assertTrue(np.allclose(product, np.dot(inputs, values.astype(np.float32)) * scales, atol=1e-4))
+
+    def test_get_weights_positive01(self):
+        engine = InferenceEngine.quantize(*self.create_weights(use_embeddings=False))
+        weight_names, weights = engine.get_weights()
+        self.assertEqual(weight_names, sorted(weight_names))
+        self.assertIn('output_kernel_scales', weight_names)
+        restored_engine = InferenceEngine(dict(zip(weight_names, weights)))
+        target_seq = np.zeros((1, 1, self.target_vocabulary_size), dtype=np.float32)
+        target_seq[0, 0, 2] = 1.0
+        state = np.zeros((1, self.latent_dim), dtype=np.float32)
+        self.assertTrue(np.array_equal(restored_engine.decode_step(target_seq, state, state)[0],
+                                       engine.decode_step(target_seq, state, state)[0]))
+
+    def test_creation_negative01(self):
+        weights, n_encoder_weights = self.create_weights(use_embeddings=False)
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, re.escape('`weights` do not correspond to the neural model!')):
+            InferenceEngine.quantize(weights[:-1], n_encoder_weights)
+        weight_names, weights = InferenceEngine.quantize(weights, n_encoder_weights).get_weights()
+        with checking_method(ValueError, re.escape('`arrays` does not contain all weights of the neural model!')):
+            InferenceEngine(dict(zip(weight_names[1:], weights[1:])))
+
+
+class TestSeq2SeqPredictor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data_set_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'eng_rus_for_testing.txt')
+        cls.model_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'seq2seq_lstm_predictor.bin')
+        cls.pickle_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'seq2seq_lstm_predictor.pkl')
+        input_texts, target_texts = cls.load_text_pairs(data_set_name)
+        cls.input_texts = input_texts[:100]
+        cls.one_hot_seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, random_state=42)
+        cls.one_hot_seq2seq.fit(input_texts, target_texts)
+        cls.seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16,
+                                  random_state=42)
+        cls.seq2seq.fit(input_texts, target_texts)
+
+    @classmethod
+    def tearDownClass(cls):
+        for file_name in [cls.model_name, cls.pickle_name]:
+            if os.path.isfile(file_name):
+                os.remove(file_name)
+
+    def test_predict_positive01(self):
+        """ The predictor, which is loaded from the model file, predicts the same texts as the source model. """
+        for seq2seq in [self.one_hot_seq2seq, self.seq2seq]:
+            seq2seq.save(self.model_name)
+            predictor = Seq2SeqPredictor.load(self.model_name)
+            self.assertIsInstance(predictor, Seq2SeqPredictor)
+            self.assertEqual(predictor.inference_engine.use_embeddings, seq2seq.embedding_size is not None)
+            self.assertEqual(predictor.predict(self.input_texts), seq2seq.predict(self.input_texts))
+            self.assertEqual(predictor.predict(tuple(self.input_texts[:3])),
+                             tuple(seq2seq.predict(self.input_texts[:3])))
+
+    def test_predict_positive02(self):
+        """ The predictor is created from the pickled model and from the `dump_all` state. """
+        with open(self.pickle_name, 'wb') as fp:
+            pickle.dump(self.seq2seq, fp)
+        predicted_texts = self.seq2seq.predict(self.input_texts)
+        self.assertEqual(Seq2SeqPredictor.load_pickle(self.pickle_name).predict(self.input_texts), predicted_texts)
+        self.assertEqual(Seq2SeqPredictor.from_state(self.seq2seq.dump_all()).predict(self.input_texts),
+                         predicted_texts)
+
+    def test_predict_positive03(self):
+        """ The predictor uses quantized weights of the quantized model. """
+        quantized_seq2seq = self.seq2seq.quantize()
+        quantized_seq2seq.save(self.model_name)
+        predictor = Seq2SeqPredictor.load(self.model_name)
+        self.assertEqual(predictor.inference_engine.arrays['output_kernel'].dtype, np.int8)
+        self.assertEqual(predictor.predict(self.input_texts), quantized_seq2seq.predict(self.input_texts))
+        predictor = Seq2SeqPredictor.from_state(quantized_seq2seq.dump_all())
+        self.assertEqual(predictor.inference_engine.arrays['output_kernel'].dtype, np.int8)
+        self.assertEqual(predictor.predict(self.input_texts), quantized_seq2seq.predict(self.input_texts))
+
+    def test_predict_positive04(self):
+        """ The predictor is loaded and used without importing TensorFlow. """
+        with open(self.pickle_name, 'wb') as fp:
+            pickle.dump(self.seq2seq, fp)
+        code = 'import sys\nsys.path.insert(0, {0!r})\nfrom seq2seq_lstm import Seq2SeqPredictor\n' \
+               'print(Seq2SeqPredictor.load_pickle({1!r}).predict([{2!r}])[0], end="")\n' \
+               'print(any([cur.startswith("tensorflow") for cur in sys.modules]), end="")'.format(
+                   os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), self.pickle_name,
+                   self.input_texts[0])
+        output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout.decode(
+            'utf-8')
+        self.assertEqual(output, self.seq2seq.predict(self.input_texts[:1])[0] + 'False')
+
+    def test_predict_negative01(self):
+        predictor = Seq2SeqPredictor.from_state(self.seq2seq.dump_all())
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, re.escape(f'`{type({1, 2})}` is wrong type for `X`.')):
+            predictor.predict(set(self.input_texts))
+        with checking_method(ValueError, re.escape('Sample 1 of `X` is wrong! This sample have not the `split` '
+                                                   'method.')):
+            predictor.predict(['a', 1])
+
+    def test_load_negative01(self):
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, re.escape('The sequence-to-sequence model is not trained!')):
+            Seq2SeqPredictor.from_state(Seq2SeqLSTM().dump_all())
+        with checking_method(ValueError, re.escape('The sequence-to-sequence model is not trained!')):
+            Seq2SeqPredictor.from_artifact(Seq2SeqLSTM().dump_artifact())
+        with checking_method(ValueError, re.escape('The buffer does not contain the sequence-to-sequence model!')):
+            Seq2SeqPredictor.from_artifact(self.seq2seq.dump_weights())
+        with open(self.pickle_name, 'wb') as fp:
+            pickle.dump(self.input_texts, fp)
+        true_err_msg = re.escape(f'The file "{self.pickle_name}" does not contain the pickled sequence-to-sequence '
+                                 f'model!')
+        with checking_method(ValueError, true_err_msg):
+            Seq2SeqPredictor.load_pickle(self.pickle_name)
+
+    @staticmethod
+    def load_text_pairs(file_name):
+        input_texts = list()
+        target_texts = list()
+        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            for cur_line in fp:
+                line_parts = cur_line.strip().split('\t')
+                if len(line_parts) == 2:
+                    input_texts.append(TestSeq2SeqPredictor.tokenize_text(line_parts[0]))
+                    target_texts.append(TestSeq2SeqPredictor.tokenize_text(line_parts[1]))
+        return input_texts, target_texts
+
+    @staticmethod
+    def tokenize_text(src):
+        tokens = list()
+        for cur in src.split():
+            tokens += list(cur)
+            tokens.append('<space>')
+        return ' '.join(tokens[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
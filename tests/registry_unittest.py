@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import gc
+import os
+import re
+import sys
+import unittest
+
+try:
+    from seq2seq_lstm import Seq2SeqLSTM, ModelRegistry
+except:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from seq2seq_lstm import Seq2SeqLSTM, ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data_set_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'eng_rus_for_testing.txt')
+        cls.model_names = [os.path.join(os.path.dirname(__file__), '..', 'data', f'seq2seq_lstm_registry_{idx}.bin')
+                           for idx in range(2)]
+        input_texts, target_texts = cls.load_text_pairs(data_set_name)
+        cls.input_texts = input_texts[:20]
+        cls.predicted_texts = []
+        for model_name, latent_dim in zip(cls.model_names, [16, 32]):
+            seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=latent_dim, lr=1e-2,
+                                  embedding_size=16, random_state=42)
+            seq2seq.fit(input_texts, target_texts)
+            cls.predicted_texts.append(seq2seq.predict(cls.input_texts))
+            seq2seq.save(model_name)
+            del seq2seq
+        gc.collect()
+
+    @classmethod
+    def tearDownClass(cls):
+        for model_name in cls.model_names:
+            if os.path.isfile(model_name):
+                os.remove(model_name)
+
+    def test_get_positive01(self):
+        """ Both models fit into the memory budget, and they are used alternately. """
+        registry = ModelRegistry(sum([os.path.getsize(cur) for cur in self.model_names]))
+        registry.register('first', self.model_names[0])
+        registry.register('second', self.model_names[1])
+        self.assertIn('first', registry)
+        self.assertEqual(registry.get_loaded_names(), [])
+        for _ in range(2):
+            self.assertEqual(registry.get('first').predict(self.input_texts), self.predicted_texts[0])
+            self.assertEqual(registry.get('second').predict(self.input_texts), self.predicted_texts[1])
+        self.assertEqual(registry.get_loaded_names(), ['first', 'second'])
+        stats = registry.get_stats()
+        self.assertEqual(stats['registered'], 2)
+        self.assertEqual(stats['loaded'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['evictions'], 0)
+
+    def test_get_positive02(self):
+        """ Only one model fits into the memory budget, so the least recently used model is evicted. """
+        registry = ModelRegistry(max([os.path.getsize(cur) for cur in self.model_names]))
+        registry.register('first', self.model_names[0])
+        registry.register('second', self.model_names[1])
+        first_model = registry.get('first')
+        self.assertEqual(registry.get('second').predict(self.input_texts), self.predicted_texts[1])
+        self.assertEqual(registry.get_loaded_names(), ['second'])
+        self.assertEqual(first_model.predict(self.input_texts), self.predicted_texts[0])
+        self.assertEqual(registry.get('first').predict(self.input_texts), self.predicted_texts[0])
+        self.assertEqual(registry.get_loaded_names(), ['first'])
+        self.assertEqual(registry.get_stats()['evictions'], 2)
+        registry.unregister('first')
+        self.assertNotIn('first', registry)
+        self.assertEqual(registry.get_loaded_names(), [])
+
+    def test_get_negative01(self):
+        registry = ModelRegistry(1000)
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        true_err_msg = re.escape('The model `first` is not registered!')
+        with checking_method(ValueError, true_err_msg):
+            registry.get('first')
+        with checking_method(ValueError, true_err_msg):
+            registry.unregister('first')
+        true_err_msg = re.escape('The file "{0}" does not exist!'.format(self.model_names[0] + '.unknown'))
+        with checking_method(ValueError, true_err_msg):
+            registry.register('first', self.model_names[0] + '.unknown')
+
+    @staticmethod
+    def load_text_pairs(file_name):
+        input_texts = list()
+        target_texts = list()
+        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            for cur_line in fp:
+                line_parts = cur_line.strip().split('\t')
+                if len(line_parts) == 2:
+                    input_texts.append(TestModelRegistry.tokenize_text(line_parts[0]))
+                    target_texts.append(TestModelRegistry.tokenize_text(line_parts[1]))
+        return input_texts, target_texts
+
+    @staticmethod
+    def tokenize_text(src):
+        tokens = list()
+        for cur in src.split():
+            tokens += list(cur)
+            tokens.append('<space>')
+        return ' '.join(tokens[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,34 +1,51 @@
 # -*- coding: utf-8 -*-
 
 import codecs
+from concurrent.futures import ProcessPoolExecutor
 import os
 import pickle
 import random
 import re
+import subprocess
 import sys
 import unittest
+from unittest import mock
 
+import tensorflow as tf
 from tensorflow.keras import Model
 import numpy as np
 from sklearn.utils.validation import NotFittedError
 
 try:
     from seq2seq_lstm import Seq2SeqLSTM
-    from seq2seq_lstm.seq2seq_lstm import TextPairSequence
+    from seq2seq_lstm.seq2seq_lstm import TextPairSequence, EncodedTexts, TextPairCorpus, TextPairStream, \
+        InferenceModelPool
+    from seq2seq_lstm.caching import DiskCache
+    from seq2seq_lstm.serialization import pack_arrays, unpack_arrays
 except:
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from seq2seq_lstm import Seq2SeqLSTM
-    from seq2seq_lstm.seq2seq_lstm import TextPairSequence
+    from seq2seq_lstm.seq2seq_lstm import TextPairSequence, EncodedTexts, TextPairCorpus, TextPairStream, \
+        InferenceModelPool
+    from seq2seq_lstm.caching import DiskCache
+    from seq2seq_lstm.serialization import pack_arrays, unpack_arrays
 
 
 class TestSeq2SeqLSTM(unittest.TestCase):
     def setUp(self):
         self.data_set_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'eng_rus_for_testing.txt')
         self.model_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'seq2seq_lstm.pkl')
+        self.corpus_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'seq2seq_lstm_corpus.bin')
+        self.cache_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'seq2seq_lstm_cache.sqlite')
 
     def tearDown(self):
         if os.path.isfile(self.model_name):
             os.remove(self.model_name)
+        if os.path.isfile(self.corpus_name):
+            os.remove(self.corpus_name)
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.isfile(self.cache_name + suffix):
+                os.remove(self.cache_name + suffix)
 
     def test_creation(self):
         seq2seq = Seq2SeqLSTM(batch_size=256, epochs=200, latent_dim=500, validation_split=0.1,
@@ -54,6 +71,36 @@ class TestSeq2SeqLSTM(unittest.TestCase):
         self.assertTrue(seq2seq.verbose)
         self.assertTrue(hasattr(seq2seq, 'random_state'))
         self.assertIsNone(seq2seq.random_state)
+        self.assertTrue(hasattr(seq2seq, 'embedding_size'))
+        self.assertIsNone(seq2seq.embedding_size)
+        self.assertTrue(hasattr(seq2seq, 'beam_size'))
+        self.assertEqual(seq2seq.beam_size, 1)
+        self.assertTrue(hasattr(seq2seq, 'bucketing'))
+        self.assertFalse(seq2seq.bucketing)
+        self.assertTrue(hasattr(seq2seq, 'use_tf_data'))
+        self.assertFalse(seq2seq.use_tf_data)
+        self.assertTrue(hasattr(seq2seq, 'workers'))
+        self.assertIsNone(seq2seq.workers)
+        self.assertTrue(hasattr(seq2seq, 'cache_batches'))
+        self.assertFalse(seq2seq.cache_batches)
+        self.assertTrue(hasattr(seq2seq, 'use_multiprocessing'))
+        self.assertFalse(seq2seq.use_multiprocessing)
+        self.assertTrue(hasattr(seq2seq, 'sparse_targets'))
+        self.assertFalse(seq2seq.sparse_targets)
+        self.assertTrue(hasattr(seq2seq, 'sampled_softmax'))
+        self.assertIsNone(seq2seq.sampled_softmax)
+        self.assertTrue(hasattr(seq2seq, 'max_input_vocab'))
+        self.assertIsNone(seq2seq.max_input_vocab)
+        self.assertTrue(hasattr(seq2seq, 'max_target_vocab'))
+        self.assertIsNone(seq2seq.max_target_vocab)
+        self.assertTrue(hasattr(seq2seq, 'min_token_freq'))
+        self.assertEqual(seq2seq.min_token_freq, 1)
+        self.assertTrue(hasattr(seq2seq, 'prediction_cache_size'))
+        self.assertIsNone(seq2seq.prediction_cache_size)
+        self.assertTrue(hasattr(seq2seq, 'cache_encoder_states'))
+        self.assertFalse(seq2seq.cache_encoder_states)
+        self.assertTrue(hasattr(seq2seq, 'prediction_cache_file'))
+        self.assertIsNone(seq2seq.prediction_cache_file)
 
     def test_fit_positive01(self):
         """ Input and target texts for training are the Python tuples. """
@@ -171,6 +218,330 @@ class TestSeq2SeqLSTM(unittest.TestCase):
         self.assertTrue(hasattr(res, 'decoder_model_'))
         self.assertIsInstance(res.decoder_model_, Model)
 
+    def test_fit_positive06(self):
+        """ Tokens are fed into the neural network as integer indices via the embedding layer. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=3, latent_dim=32, embedding_size=16, lr=1e-2)
+        res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertEqual(len(res.encoder_model_.inputs[0].shape), 2)
+        self.assertEqual(len(res.decoder_model_.inputs[0].shape), 2)
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_positive07(self):
+        """ Training mini-batches are composed from text pairs of similar lengths. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        text_pairs = list(zip(input_texts_for_training, target_texts_for_training))
+        random.Random(42).shuffle(text_pairs)
+        input_texts_for_training = [input_text for input_text, _ in text_pairs]
+        target_texts_for_training = [target_text for _, target_text in text_pairs]
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, bucketing=True, lr=1e-2)
+        train_neural_network = Seq2SeqLSTM.train_neural_network
+        training_batches = []
+        corpus_input_lengths = []
+
+        def train_on_batches(model, training_set_generator, *args, **kwargs):
+            corpus_input_lengths.append(training_set_generator.input_lengths.copy())
+            for batch_idx in range(len(training_set_generator)):
+                text_pair_indices = training_set_generator.batches[batch_idx]
+                training_batches.append((training_set_generator.input_lengths[text_pair_indices].copy(),
+                                         training_set_generator.target_lengths[text_pair_indices].copy(),
+                                         training_set_generator[batch_idx]))
+            return train_neural_network(model, training_set_generator, *args, **kwargs)
+
+        with mock.patch.object(Seq2SeqLSTM, 'train_neural_network', autospec=True, side_effect=train_on_batches):
+            res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertGreater(len(training_batches), 1)
+        all_input_lengths = corpus_input_lengths[0]
+        bucketed_spread = 0
+        for input_lengths, target_lengths, ((encoder_input_data, decoder_input_data), _) in training_batches:
+            self.assertEqual(encoder_input_data.shape[1], input_lengths.max())
+            self.assertEqual(decoder_input_data.shape[1], target_lengths.max())
+            bucketed_spread += input_lengths.max() - input_lengths.min()
+        self.assertLessEqual(bucketed_spread, all_input_lengths.max() - all_input_lengths.min())
+        unbucketed_spread = 0
+        for batch_start in range(0, len(training_batches) * seq2seq.batch_size, seq2seq.batch_size):
+            input_lengths = all_input_lengths[batch_start:(batch_start + seq2seq.batch_size)]
+            unbucketed_spread += input_lengths.max() - input_lengths.min()
+        self.assertLess(bucketed_spread, unbucketed_spread)
+        self.assertLess(min([batch[2][0][0].shape[1] for batch in training_batches]), res.max_encoder_seq_length_)
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_positive08(self):
+        """ Training set is loaded from the corpus file with memory mapping. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        TextPairCorpus.create(input_texts_for_training, target_texts_for_training, lowercase=True).save(
+            self.corpus_name
+        )
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2)
+        res = seq2seq.fit(self.corpus_name)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertEqual(res.max_encoder_seq_length_,
+                         max([len(cur.split()) for cur in input_texts_for_training]))
+        self.assertEqual(res.max_decoder_seq_length_,
+                         max([len(cur.split()) for cur in target_texts_for_training]) + 2)
+        self.assertEqual(set(res.input_token_index_.keys()),
+                         set(' '.join(input_texts_for_training).lower().split()))
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_positive09(self):
+        """ Training mini-batches are fed via the `tf.data` pipeline with parallel workers. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, bucketing=True,
+                              use_tf_data=True, workers=2)
+        train_neural_network = Seq2SeqLSTM.train_neural_network
+        training_batches = []
+
+        def train_on_dataset(model, training_set_generator, evaluation_set_generator=None, *args, **kwargs):
+            self.assertIsInstance(training_set_generator, tf.data.Dataset)
+            self.assertIsInstance(evaluation_set_generator, tf.data.Dataset)
+            for (encoder_input_data, decoder_input_data), decoder_target_data in training_set_generator:
+                training_batches.append((encoder_input_data.shape, decoder_input_data.shape,
+                                         decoder_target_data.shape))
+            return train_neural_network(model, training_set_generator, evaluation_set_generator, *args, **kwargs)
+
+        with mock.patch.object(Seq2SeqLSTM, 'train_neural_network', autospec=True,
+                               side_effect=train_on_dataset) as patched_train_neural_network:
+            res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        patched_train_neural_network.assert_called_once()
+        self.assertIn('LambdaCallback', [type(cur).__name__ for cur in
+                                         patched_train_neural_network.call_args.kwargs['callbacks']])
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertGreater(len(training_batches), 1)
+        self.assertGreater(len(set([encoder_input_shape[1] for encoder_input_shape, _, _ in training_batches])), 1)
+        for encoder_input_shape, decoder_input_shape, decoder_target_shape in training_batches:
+            self.assertEqual(encoder_input_shape[2], len(res.input_token_index_))
+            self.assertEqual(decoder_input_shape[2], len(res.target_token_index_))
+            self.assertEqual(decoder_target_shape, decoder_input_shape)
+            self.assertLessEqual(encoder_input_shape[1], res.max_encoder_seq_length_)
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_positive10(self):
+        """ Training mini-batches are generated by worker processes from texts in the shared memory. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, workers=2,
+                              use_multiprocessing=True)
+        train_neural_network = Seq2SeqLSTM.train_neural_network
+        storage_kinds = []
+        in_process_batches = []
+        worker_batches = []
+
+        def train_in_workers(model, training_set_generator, *args, **kwargs):
+            storage_kinds.append(training_set_generator.encoded_input_texts.storage['kind'])
+            storage_kinds.append(training_set_generator.encoded_target_texts.storage['kind'])
+            batch_indices = list(range(len(training_set_generator)))
+            in_process_batches.extend([training_set_generator[batch_idx] for batch_idx in batch_indices])
+            with ProcessPoolExecutor(max_workers=2) as pool:
+                worker_batches.extend(pool.map(training_set_generator.__getitem__, batch_indices))
+            return train_neural_network(model, training_set_generator, *args, **kwargs)
+
+        with mock.patch.object(Seq2SeqLSTM, 'train_neural_network', autospec=True, side_effect=train_in_workers):
+            res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertEqual(storage_kinds, ['shared_memory', 'shared_memory'])
+        self.assertGreater(len(in_process_batches), 1)
+        self.assertEqual(len(worker_batches), len(in_process_batches))
+        for (worker_inputs, worker_targets), (true_inputs, true_targets) in zip(worker_batches, in_process_batches):
+            self.assertEqual(len(worker_inputs), len(true_inputs))
+            for worker_data, true_data in zip(worker_inputs, true_inputs):
+                np.testing.assert_array_equal(worker_data, true_data)
+            np.testing.assert_array_equal(worker_targets, true_targets)
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_positive11(self):
+        """ Desired outputs are token indices, and the loss is the sparse categorical cross-entropy. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, sparse_targets=True,
+                              bucketing=True)
+        build_neural_network = Seq2SeqLSTM.build_neural_network
+        train_neural_network = Seq2SeqLSTM.train_neural_network
+        training_models = []
+        training_batches = []
+
+        def build_and_keep(model, *args, **kwargs):
+            neural_networks = build_neural_network(model, *args, **kwargs)
+            training_models.append(neural_networks[0])
+            return neural_networks
+
+        def train_on_batches(model, training_set_generator, *args, **kwargs):
+            training_batches.extend([training_set_generator[idx] for idx in range(len(training_set_generator))])
+            return train_neural_network(model, training_set_generator, *args, **kwargs)
+
+        with mock.patch.object(Seq2SeqLSTM, 'build_neural_network', autospec=True, side_effect=build_and_keep), \
+                mock.patch.object(Seq2SeqLSTM, 'train_neural_network', autospec=True, side_effect=train_on_batches):
+            res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertEqual(len(training_models), 1)
+        self.assertGreater(len(training_batches), 1)
+        for (encoder_input_data, decoder_input_data), decoder_target_data in training_batches:
+            self.assertEqual(decoder_target_data.shape, decoder_input_data.shape[0:2])
+            self.assertEqual(decoder_target_data.dtype, np.int32)
+            self.assertGreaterEqual(decoder_target_data.min(), -1)
+        (encoder_input_data, decoder_input_data), decoder_target_data = max(
+            training_batches, key=lambda batch: int(np.sum(batch[1] < 0))
+        )
+        self.assertGreater(int(np.sum(decoder_target_data < 0)), 0)
+        probabilities = training_models[0].predict([encoder_input_data, decoder_input_data], verbose=0)
+        sample_indices, time_indices = np.nonzero(decoder_target_data >= 0)
+        true_loss = -np.mean(np.log(
+            probabilities[sample_indices, time_indices, decoder_target_data[sample_indices, time_indices]]
+        ))
+        calculated_loss = training_models[0].evaluate([encoder_input_data, decoder_input_data], decoder_target_data,
+                                                      verbose=0)
+        self.assertAlmostEqual(calculated_loss, float(true_loss), places=3)
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_positive12(self):
+        """ The sampled softmax is used for training, and the full softmax is used for evaluation and prediction. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, embedding_size=16,
+                              sampled_softmax=5)
+        res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        self.assertEqual(res.decoder_model_.outputs[0].shape[-1], len(res.target_token_index_))
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+        with open(self.model_name, 'wb') as fp:
+            pickle.dump(res, fp)
+        with open(self.model_name, 'rb') as fp:
+            seq2seq = pickle.load(fp)
+        self.assertEqual(seq2seq.sampled_softmax, 5)
+        self.assertEqual(seq2seq.predict(input_texts_for_training[:10]), predicted_texts)
+
+    def test_fit_positive13(self):
+        """ Vocabularies are limited, and pruned tokens are replaced with the `<unk>` token. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, max_input_vocab=20,
+                              max_target_vocab=25, min_token_freq=2)
+        res = seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertEqual(len(res.input_token_index_), 21)
+        self.assertIn('<unk>', res.input_token_index_)
+        self.assertEqual(len(res.target_token_index_), 28)
+        self.assertIn('<unk>', res.target_token_index_)
+        self.assertIn('\t', res.target_token_index_)
+        self.assertIn('\n', res.target_token_index_)
+        self.assertEqual(list(res.input_token_index_.keys()), sorted(list(res.input_token_index_.keys())))
+        predicted_texts = res.predict(input_texts_for_training[:10] + ['Ж Щ Ы'])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 11)
+
+    def test_fit_positive14(self):
+        """ Fitting of another model does not affect the fitted model in the same process. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts_1 = seq2seq.predict(input_texts_for_training[:20])
+        another_seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=16, lr=1e-2)
+        another_seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts_2 = seq2seq.predict(input_texts_for_training[:20])
+        self.assertEqual(predicted_texts_1, predicted_texts_2)
+        self.assertIsInstance(another_seq2seq.predict(input_texts_for_training[:20]), list)
+
+    def test_fit_stream_positive01(self):
+        """ Text pairs for training are read from the TSV file by chunks. """
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, bucketing=True)
+        res = seq2seq.fit_stream(self.data_set_name)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+        with codecs.open(self.data_set_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            text_pairs = [cur_line.strip().split('\t') for cur_line in fp if len(cur_line.strip()) > 0]
+        self.assertEqual(res.max_encoder_seq_length_, max([len(cur[0].split()) for cur in text_pairs]))
+        self.assertEqual(res.max_decoder_seq_length_, max([len(cur[1].split()) for cur in text_pairs]) + 2)
+        self.assertEqual(set(res.input_token_index_.keys()),
+                         set(' '.join([cur[0] for cur in text_pairs]).lower().split()))
+        predicted_texts = res.predict([cur[0] for cur in text_pairs[:10]])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_stream_positive02(self):
+        """ Text pairs for training and evaluation are read from lists of tuples. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(epochs=3, latent_dim=32, lr=1e-2)
+        res = seq2seq.fit_stream(list(zip(input_texts_for_training[:-20], target_texts_for_training[:-20])),
+                                 eval_set=list(zip(input_texts_for_training[-20:], target_texts_for_training[-20:])))
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertEqual(res.max_encoder_seq_length_, max([len(cur.split()) for cur in input_texts_for_training]))
+        predicted_texts = res.predict(input_texts_for_training[:10])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 10)
+
+    def test_fit_stream_positive03(self):
+        """ The sampled softmax is used for training on the stream of text pairs. """
+        seq2seq = Seq2SeqLSTM(validation_split=0.1, epochs=3, latent_dim=32, lr=1e-2, sampled_softmax=5)
+        res = seq2seq.fit_stream(self.data_set_name)
+        self.assertIsInstance(res, Seq2SeqLSTM)
+        self.assertIsInstance(res.encoder_model_, Model)
+        self.assertIsInstance(res.decoder_model_, Model)
+
+    def test_fit_stream_positive04(self):
+        """ Vocabularies are limited by the minimal token frequency, which is counted at the first pass. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2, min_token_freq=50)
+        res = seq2seq.fit_stream(list(zip(input_texts_for_training, target_texts_for_training)))
+        input_token_counts = dict()
+        for cur_text in input_texts_for_training:
+            for cur_token in cur_text.lower().split():
+                input_token_counts[cur_token] = input_token_counts.get(cur_token, 0) + 1
+        self.assertEqual(set(res.input_token_index_.keys()),
+                         set([cur for cur in input_token_counts if input_token_counts[cur] >= 50]) | {'<unk>'})
+        self.assertIn('<unk>', res.target_token_index_)
+
+    def test_fit_stream_negative01(self):
+        """ Text pairs are specified by an iterator, which cannot be read repeatedly. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM()
+        true_err_msg = re.escape('`text_pairs` must be a re-iterable object, but it is an iterator!')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.fit_stream(zip(input_texts_for_training, target_texts_for_training))
+
+    def test_fit_stream_negative02(self):
+        """ One of text pairs contains an empty target text. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        text_pairs = list(zip(input_texts_for_training, target_texts_for_training))
+        text_pairs[3] = (text_pairs[3][0], ' ')
+        seq2seq = Seq2SeqLSTM()
+        true_err_msg = re.escape('Sample 3 of `text_pairs` is wrong! Target text of this sample is empty.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.fit_stream(text_pairs)
+
     def test_fit_negative01(self):
         """ Object with input texts is not one of the basic sequence types. """
         input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
@@ -284,6 +655,70 @@ class TestSeq2SeqLSTM(unittest.TestCase):
             seq2seq.fit(input_texts_for_training[:-20], target_texts_for_training[:-20],
                         eval_set=(input_texts_for_training[-20:], target_texts_for_training[-19:]))
 
+    def test_fit_negative10(self):
+        """ The corpus file does not correspond to the `lowercase` parameter. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        TextPairCorpus.create(input_texts_for_training, target_texts_for_training, lowercase=False).save(
+            self.corpus_name
+        )
+        seq2seq = Seq2SeqLSTM(lowercase=True)
+        true_err_msg = re.escape(f'The corpus file "{self.corpus_name}" does not correspond to the `lowercase` '
+                                 f'parameter! False != True.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.fit(self.corpus_name)
+
+    def test_fit_negative11(self):
+        """ The minimal token frequency is not positive. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(min_token_freq=0)
+        true_err_msg = re.escape('`min_token_freq` must be a positive number! 0 is not positive.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.fit(input_texts_for_training, target_texts_for_training)
+
+    def test_fit_negative12(self):
+        """ The size of the prediction cache is not positive. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(prediction_cache_size=0)
+        true_err_msg = re.escape('`prediction_cache_size` must be a positive number! 0 is not positive.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.fit(input_texts_for_training, target_texts_for_training)
+
+    def test_build_vocabulary_positive01(self):
+        tokens = ['c', 'a', 'b', 'd', 'e']
+        token_counts = {'a': 3, 'b': 1, 'c': 3, 'd': 2}
+        self.assertEqual(Seq2SeqLSTM.build_vocabulary(tokens), ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(Seq2SeqLSTM.build_vocabulary(tokens, token_counts, min_token_freq=2),
+                         ['<unk>', 'a', 'c', 'd'])
+        self.assertEqual(Seq2SeqLSTM.build_vocabulary(tokens, token_counts, max_vocabulary_size=3),
+                         ['<unk>', 'a', 'c', 'd'])
+        self.assertEqual(Seq2SeqLSTM.build_vocabulary(tokens, token_counts, ('\t', '\n'), max_vocabulary_size=1),
+                         ['\t', '\n', '<unk>', 'a'])
+
+    def test_generate_data_for_prediction_with_unknown_token(self):
+        input_token_index = {'<unk>': 0, 'a': 1, 'b': 2}
+        input_data = Seq2SeqLSTM.generate_data_for_prediction(
+            input_texts=['a c b', 'd'], batch_start=0, batch_end=2, max_encoder_seq_length=3,
+            input_token_index=input_token_index, lowercase=False, use_token_ids=True
+        )
+        self.assertEqual(input_data.tolist(), [[2, 1, 3], [1, 0, 0]])
+        input_data = Seq2SeqLSTM.generate_data_for_prediction(
+            input_texts=['a c b', 'd'], batch_start=0, batch_end=2, max_encoder_seq_length=3,
+            input_token_index={'a': 0, 'b': 1}, lowercase=False, use_token_ids=True
+        )
+        self.assertEqual(input_data.tolist(), [[1, 2, 0], [0, 0, 0]])
+
     def test_predict_positive001(self):
         """ Part of correctly predicted texts must be greater than 0.1. """
         input_texts, target_texts = self.load_text_pairs(self.data_set_name)
@@ -300,6 +735,74 @@ class TestSeq2SeqLSTM(unittest.TestCase):
                   '\t Predicted: ' + self.detokenize_text(predicted_texts[indices[ind]]))
         self.assertGreater(self.estimate(predicted_texts, target_texts), 0.0001)
 
+    def test_predict_positive002(self):
+        """ Sorting of source texts by their lengths does not change the order and the content of predicted texts. """
+        input_texts, target_texts = self.load_text_pairs(self.data_set_name)
+        indices = list(range(len(input_texts)))
+        random.shuffle(indices)
+        input_texts_for_testing = [input_texts[idx] for idx in indices[:100]]
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=3, latent_dim=32, lr=1e-2, lowercase=False)
+        seq2seq.fit(input_texts, target_texts)
+        predicted_texts_1 = seq2seq.predict(input_texts_for_testing)
+        seq2seq.set_params(bucketing=True)
+        predicted_texts_2 = seq2seq.predict(input_texts_for_testing)
+        self.assertIsInstance(predicted_texts_2, list)
+        self.assertEqual(predicted_texts_1, predicted_texts_2)
+        predicted_texts_3 = seq2seq.predict(tuple(input_texts_for_testing))
+        self.assertIsInstance(predicted_texts_3, tuple)
+        self.assertEqual(predicted_texts_1, list(predicted_texts_3))
+        predicted_texts_4 = seq2seq.predict(np.array(input_texts_for_testing, dtype=object))
+        self.assertIsInstance(predicted_texts_4, np.ndarray)
+        self.assertEqual(predicted_texts_1, predicted_texts_4.tolist())
+
+    def test_predict_positive003(self):
+        """ Repeated source texts are decoded once, and their predictions are taken from the cache. """
+        input_texts, target_texts = self.load_text_pairs(self.data_set_name)
+        input_texts_for_testing = input_texts[:10] + input_texts[:5] + [input_texts[0].upper()]
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=3, latent_dim=32, lr=1e-2, prediction_cache_size=100)
+        seq2seq.fit(input_texts, target_texts)
+        n_unique = len(set([seq2seq.get_cache_key(cur) for cur in input_texts_for_testing]))
+        n_unique_in_tail = len(set([seq2seq.get_cache_key(cur) for cur in input_texts_for_testing[5:]]))
+        predicted_texts_1 = seq2seq.predict(input_texts_for_testing)
+        self.assertEqual(predicted_texts_1[10:15], predicted_texts_1[:5])
+        self.assertEqual(predicted_texts_1[15], predicted_texts_1[0])
+        self.assertEqual(seq2seq.get_prediction_cache_stats(), {'hits': 0, 'misses': n_unique, 'entries': n_unique})
+        predicted_texts_2 = seq2seq.predict(input_texts_for_testing[5:])
+        self.assertEqual(predicted_texts_2, predicted_texts_1[5:])
+        self.assertEqual(seq2seq.get_prediction_cache_stats(),
+                         {'hits': n_unique_in_tail, 'misses': n_unique, 'entries': n_unique})
+        seq2seq.set_params(prediction_cache_size=None)
+        self.assertEqual(seq2seq.predict(input_texts_for_testing), predicted_texts_1)
+        seq2seq.set_params(prediction_cache_size=2)
+        seq2seq.predict(input_texts_for_testing)
+        self.assertEqual(seq2seq.get_prediction_cache_stats(), {'hits': 0, 'misses': n_unique, 'entries': 2})
+        seq2seq.load_weights(seq2seq.dump_weights())
+        self.assertEqual(seq2seq.get_prediction_cache_stats(), {'hits': 0, 'misses': 0, 'entries': 0})
+
+    def test_predict_positive004(self):
+        """ Predictions are saved into the persistent cache, which is shared by copies of the same model only. """
+        input_texts, target_texts = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=3, latent_dim=32, lr=1e-2,
+                              prediction_cache_file=self.cache_name)
+        seq2seq.fit(input_texts, target_texts)
+        n_unique = len(set([seq2seq.get_cache_key(cur) for cur in input_texts[:20]]))
+        predicted_texts_1 = seq2seq.predict(input_texts[:20])
+        self.assertEqual(seq2seq.get_prediction_cache_stats(),
+                         {'hits': 0, 'misses': 0, 'entries': 0, 'disk_hits': 0, 'disk_misses': n_unique})
+        another_seq2seq = pickle.loads(pickle.dumps(seq2seq))
+        self.assertEqual(another_seq2seq.get_model_fingerprint(), seq2seq.get_model_fingerprint())
+        predicted_texts_2 = another_seq2seq.predict(input_texts[:20])
+        self.assertEqual(predicted_texts_1, predicted_texts_2)
+        self.assertEqual(another_seq2seq.get_prediction_cache_stats()['disk_hits'], n_unique)
+        old_fingerprint = seq2seq.get_model_fingerprint()
+        seq2seq.set_params(epochs=1)
+        seq2seq.fit(input_texts, target_texts)
+        self.assertNotEqual(seq2seq.get_model_fingerprint(), old_fingerprint)
+        seq2seq.predict(input_texts[:5])
+        self.assertEqual(seq2seq.get_prediction_cache_stats()['disk_hits'], 0)
+        self.assertEqual(len(DiskCache(self.cache_name)), len(set([seq2seq.get_cache_key(cur)
+                                                                   for cur in input_texts[:5]])))
+
     def test_predict_negative001(self):
         """ Usage of the seq2seq model for prediction without training. """
         input_texts_for_testing, _ = self.load_text_pairs(self.data_set_name)
@@ -320,6 +823,66 @@ class TestSeq2SeqLSTM(unittest.TestCase):
         with checking_method(ValueError, true_err_msg):
             _ = seq2seq.predict(set(input_texts_for_testing))
 
+    def test_predict_nbest_positive001(self):
+        """ The beam search returns sorted hypotheses, and its single best hypothesis for the unit beam is greedy. """
+        input_texts, target_texts = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=3, latent_dim=32, lr=1e-2, lowercase=False)
+        seq2seq.fit(input_texts, target_texts)
+        greedy_texts = seq2seq.predict(input_texts[:20])
+        best_hypotheses = seq2seq.predict_nbest(input_texts[:20], n_best=1)
+        self.assertIsInstance(best_hypotheses, list)
+        self.assertEqual(len(best_hypotheses), 20)
+        self.assertEqual([cur[0][0] for cur in best_hypotheses], greedy_texts)
+        seq2seq.set_params(beam_size=3)
+        hypotheses = seq2seq.predict_nbest(input_texts[:20])
+        self.assertIsInstance(hypotheses, list)
+        self.assertEqual(len(hypotheses), 20)
+        for text_idx, cur in enumerate(hypotheses):
+            self.assertIsInstance(cur, list, msg=f'text_idx={text_idx}')
+            self.assertGreater(len(cur), 0, msg=f'text_idx={text_idx}')
+            self.assertLessEqual(len(cur), 3, msg=f'text_idx={text_idx}')
+            for predicted_text, log_probability in cur:
+                self.assertIsInstance(predicted_text, str, msg=f'text_idx={text_idx}')
+                self.assertIsInstance(log_probability, float, msg=f'text_idx={text_idx}')
+                self.assertLessEqual(log_probability, 0.0, msg=f'text_idx={text_idx}')
+            normalized_scores = [log_probability / len(predicted_text.split(' '))
+                                 for predicted_text, log_probability in cur]
+            self.assertEqual(normalized_scores, sorted(normalized_scores, reverse=True), msg=f'text_idx={text_idx}')
+        predicted_texts = seq2seq.predict(input_texts[:20])
+        self.assertEqual(predicted_texts, [cur[0][0] for cur in hypotheses])
+
+    def test_predict_nbest_positive002(self):
+        """ Cached states of the encoder are reused by the beam search. """
+        input_texts, target_texts = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=3, latent_dim=32, lr=1e-2, beam_size=3,
+                              prediction_cache_size=100, cache_encoder_states=True)
+        seq2seq.fit(input_texts, target_texts)
+        n_unique = len(set([seq2seq.get_cache_key(cur) for cur in input_texts[:20]]))
+        predicted_texts = seq2seq.predict(input_texts[:20])
+        self.assertEqual(seq2seq.get_prediction_cache_stats(),
+                         {'hits': 0, 'misses': 2 * n_unique, 'entries': 2 * n_unique})
+        hypotheses_1 = seq2seq.predict_nbest(input_texts[:20])
+        self.assertEqual(seq2seq.get_prediction_cache_stats(),
+                         {'hits': 20, 'misses': 2 * n_unique, 'entries': 2 * n_unique})
+        self.assertEqual([cur[0][0] for cur in hypotheses_1], predicted_texts)
+        seq2seq.set_params(cache_encoder_states=False)
+        hypotheses_2 = seq2seq.predict_nbest(input_texts[:20])
+        self.assertEqual([[text for text, _ in cur] for cur in hypotheses_1],
+                         [[text for text, _ in cur] for cur in hypotheses_2])
+
+    def test_predict_nbest_negative001(self):
+        """ Number of the best hypotheses must be a positive integer. """
+        input_texts, target_texts = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=16)
+        seq2seq.fit(input_texts, target_texts)
+        true_err_msg = re.escape('`n_best` must be a positive number! 0 is not positive.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            _ = seq2seq.predict_nbest(input_texts[:5], n_best=0)
+
     def test_check_X_negative001(self):
         """ All texts must be a string and have a `split` method. """
         texts = ['123', 4, '567']
@@ -399,6 +962,265 @@ class TestSeq2SeqLSTM(unittest.TestCase):
         predicted_texts_2 = another_seq2seq.predict(input_texts_for_testing)
         self.assertEqual(predicted_texts_1, predicted_texts_2)
 
+    def test_dump_load_weights_positive01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts_1 = seq2seq.predict(input_texts_for_training[:20])
+        weights_as_bytes = seq2seq.dump_weights()
+        self.assertIsInstance(weights_as_bytes, bytes)
+        encoder_weights = seq2seq.encoder_model_.get_weights()
+        decoder_weights = seq2seq.decoder_model_.get_weights()
+        seq2seq.load_weights(weights_as_bytes)
+        for old_weights, new_weights in zip(encoder_weights + decoder_weights,
+                                            seq2seq.encoder_model_.get_weights() + seq2seq.decoder_model_.get_weights()):
+            self.assertTrue(np.array_equal(old_weights, new_weights))
+        predicted_texts_2 = seq2seq.predict(input_texts_for_training[:20])
+        self.assertEqual(predicted_texts_1, predicted_texts_2)
+
+    def test_dump_load_weights_positive02(self):
+        """ Models with the same architecture are loaded into inference models from the pool. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16,
+                              random_state=42)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts_1 = seq2seq.predict(input_texts_for_training[:20])
+        weights_1 = seq2seq.dump_weights()
+        seq2seq.set_params(random_state=0, lr=1e-3)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts_2 = seq2seq.predict(input_texts_for_training[:20])
+        weights_2 = seq2seq.dump_weights()
+        InferenceModelPool.clear()
+        seq2seq.load_weights(weights_1)
+        another_seq2seq = pickle.loads(pickle.dumps(seq2seq))
+        another_seq2seq.load_weights(weights_2)
+        self.assertIsNot(seq2seq.encoder_model_, another_seq2seq.encoder_model_)
+        self.assertIsNot(seq2seq.decoder_model_, another_seq2seq.decoder_model_)
+        self.assertEqual(predicted_texts_1, seq2seq.predict(input_texts_for_training[:20]))
+        self.assertEqual(predicted_texts_2, another_seq2seq.predict(input_texts_for_training[:20]))
+        encoder_model = another_seq2seq.encoder_model_
+        del another_seq2seq
+        another_seq2seq = pickle.loads(pickle.dumps(seq2seq))
+        self.assertIs(another_seq2seq.encoder_model_, encoder_model)
+        self.assertEqual(predicted_texts_1, another_seq2seq.predict(input_texts_for_training[:20]))
+        another_seq2seq.load_weights(weights_2)
+        self.assertIs(another_seq2seq.encoder_model_, encoder_model)
+        self.assertEqual(predicted_texts_2, another_seq2seq.predict(input_texts_for_training[:20]))
+        self.assertEqual(predicted_texts_1, seq2seq.predict(input_texts_for_training[:20]))
+
+    def test_save_load_positive01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts_1 = seq2seq.predict(input_texts_for_training[:20])
+        seq2seq.save(self.model_name)
+        another_seq2seq = Seq2SeqLSTM.load(self.model_name)
+        self.assertIsInstance(another_seq2seq, Seq2SeqLSTM)
+        self.assertEqual(seq2seq.get_params(), another_seq2seq.get_params())
+        self.assertEqual(seq2seq.input_token_index_, another_seq2seq.input_token_index_)
+        self.assertEqual(seq2seq.target_token_index_, another_seq2seq.target_token_index_)
+        self.assertEqual(seq2seq.reverse_target_char_index_, another_seq2seq.reverse_target_char_index_)
+        self.assertEqual(seq2seq.max_encoder_seq_length_, another_seq2seq.max_encoder_seq_length_)
+        self.assertEqual(seq2seq.max_decoder_seq_length_, another_seq2seq.max_decoder_seq_length_)
+        predicted_texts_2 = another_seq2seq.predict(input_texts_for_training[:20])
+        self.assertEqual(predicted_texts_1, predicted_texts_2)
+        with open(self.model_name, 'rb') as fp:
+            self.assertEqual(fp.read(), seq2seq.dump_artifact())
+
+    def test_save_load_positive02(self):
+        seq2seq = Seq2SeqLSTM(latent_dim=32, embedding_size=16, lowercase=False)
+        seq2seq.save(self.model_name)
+        another_seq2seq = Seq2SeqLSTM.load(self.model_name)
+        self.assertEqual(seq2seq.get_params(), another_seq2seq.get_params())
+        self.assertFalse(hasattr(another_seq2seq, 'encoder_model_'))
+
+    def test_load_artifact_negative01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        true_err_msg = re.escape('The buffer does not contain the sequence-to-sequence model!')
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.load_artifact(seq2seq.dump_weights())
+
+    def test_quantize_positive01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16,
+                              random_state=42)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        quantized_seq2seq = seq2seq.quantize()
+        self.assertIsInstance(quantized_seq2seq, Seq2SeqLSTM)
+        self.assertEqual(seq2seq.get_params(), quantized_seq2seq.get_params())
+        self.assertEqual(seq2seq.input_token_index_, quantized_seq2seq.input_token_index_)
+        self.assertEqual(seq2seq.target_token_index_, quantized_seq2seq.target_token_index_)
+        self.assertFalse(hasattr(quantized_seq2seq, 'encoder_model_'))
+        self.assertNotEqual(seq2seq.get_model_fingerprint(), quantized_seq2seq.get_model_fingerprint())
+        float_size = sum([cur.nbytes for cur in seq2seq.encoder_model_.get_weights() +
+                          seq2seq.decoder_model_.get_weights()])
+        self.assertLess(quantized_seq2seq.inference_engine_.nbytes, float_size / 2)
+        input_seq = next(seq2seq.generate_batches_for_prediction(input_texts_for_training[:20]))[1]
+        state_h, state_c = seq2seq.encode(input_seq)
+        quantized_state_h, quantized_state_c = quantized_seq2seq.encode(input_seq)
+        self.assertTrue(np.allclose(state_h, quantized_state_h, atol=0.05))
+        self.assertTrue(np.allclose(state_c, quantized_state_c, atol=0.05))
+        predicted_texts = quantized_seq2seq.predict(input_texts_for_training[:20])
+        self.assertIsInstance(predicted_texts, list)
+        self.assertEqual(len(predicted_texts), 20)
+        quantized_seq2seq.save(self.model_name)
+        self.assertLess(os.path.getsize(self.model_name), len(seq2seq.dump_artifact()) / 2)
+        another_seq2seq = Seq2SeqLSTM.load(self.model_name)
+        self.assertTrue(hasattr(another_seq2seq, 'inference_engine_'))
+        self.assertEqual(predicted_texts, another_seq2seq.predict(input_texts_for_training[:20]))
+        self.assertEqual(quantized_seq2seq.get_model_fingerprint(), another_seq2seq.get_model_fingerprint())
+        another_seq2seq = pickle.loads(pickle.dumps(quantized_seq2seq))
+        self.assertEqual(predicted_texts, another_seq2seq.predict(input_texts_for_training[:20]))
+        state = quantized_seq2seq.dump_all()
+        self.assertIsNotNone(state.get('weights'))
+        another_seq2seq = Seq2SeqLSTM().load_all(state)
+        self.assertTrue(hasattr(another_seq2seq, 'inference_engine_'))
+        self.assertEqual(predicted_texts, another_seq2seq.predict(input_texts_for_training[:20]))
+        self.assertEqual(quantized_seq2seq.get_model_fingerprint(), another_seq2seq.get_model_fingerprint())
+        quantized_seq2seq.beam_size = 3
+        self.assertEqual(len(quantized_seq2seq.predict_nbest(input_texts_for_training[:5], 2)), 5)
+
+    def test_quantize_negative01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2)
+        with self.assertRaises(NotFittedError):
+            seq2seq.quantize()
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, re.escape('The model is quantized already!')):
+            seq2seq.quantize().quantize()
+
+    def test_import_time_positive01(self):
+        """ The package is imported quickly, because TensorFlow and scikit-learn are not imported. """
+        code = 'import sys\nsys.path.insert(0, {0!r})\nfrom seq2seq_lstm import Seq2SeqLSTM'.format(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+        output = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], check=True,
+                                stderr=subprocess.PIPE).stderr.decode('utf-8')
+        imported_modules = dict()
+        for cur_line in output.split('\n'):
+            line_parts = cur_line.split('|')
+            if (len(line_parts) == 3) and line_parts[1].strip().isdigit():
+                imported_modules[line_parts[2].strip()] = int(line_parts[1])
+        self.assertIn('seq2seq_lstm', imported_modules)
+        for module_name in imported_modules:
+            self.assertNotIn(module_name.split('.')[0], {'tensorflow', 'tensorflow_addons', 'keras', 'sklearn'})
+        self.assertLess(imported_modules['seq2seq_lstm'], 1000000)
+
+    def test_sklearn_protocol_positive01(self):
+        from sklearn.base import clone, is_classifier
+
+        seq2seq = Seq2SeqLSTM(latent_dim=32, lr=1e-2)
+        another_seq2seq = clone(seq2seq)
+        self.assertIsNot(seq2seq, another_seq2seq)
+        self.assertEqual(seq2seq.get_params(), another_seq2seq.get_params())
+        self.assertTrue(is_classifier(another_seq2seq))
+        self.assertTrue(another_seq2seq._get_tags()['requires_y'])
+        self.assertEqual(repr(another_seq2seq), 'Seq2SeqLSTM(latent_dim=32, lr=0.01)')
+
+    def test_score_positive01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts = seq2seq.predict(input_texts_for_training[:20])
+        true_texts = predicted_texts[:10] + [cur + ' x' for cur in predicted_texts[10:]]
+        self.assertAlmostEqual(seq2seq.score(input_texts_for_training[:20], true_texts), 0.5)
+        self.assertAlmostEqual(seq2seq.score(input_texts_for_training[:20], true_texts, [1.0] * 10 + [3.0] * 10), 0.25)
+
+    def test_load_weights_negative01(self):
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        weights_as_bytes = seq2seq.dump_weights()
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        true_err_msg = re.escape(f'`weights_as_bytes` must be an array of bytes, not `{type([1, 2])}`!')
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.load_weights([weights_as_bytes, weights_as_bytes])
+        true_err_msg = re.escape('First element of `weights_as_bytes` is not the HDF5 file with weights!')
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.load_weights((weights_as_bytes, weights_as_bytes))
+        true_err_msg = re.escape('`weights_as_bytes` must be a 2-element tuple, but it is a 1-element tuple!')
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.load_weights((weights_as_bytes,))
+        another_seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2, embedding_size=16)
+        another_seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        true_err_msg = re.escape('`weights_as_bytes` does not correspond to the neural model!')
+        with checking_method(ValueError, true_err_msg):
+            seq2seq.load_weights(another_seq2seq.dump_weights())
+
+    def test_load_legacy_state_positive01(self):
+        """ The state, which is created by `dump_all` of the previous version (weights in HDF5 files), is loaded. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        predicted_texts = seq2seq.predict(input_texts_for_training[:20])
+        legacy_weights = []
+        for model in [seq2seq.encoder_model_, seq2seq.decoder_model_]:
+            model.save_weights(self.model_name + '.h5')
+            with open(self.model_name + '.h5', 'rb') as fp:
+                legacy_weights.append(fp.read())
+            os.remove(self.model_name + '.h5')
+        legacy_state = {'batch_size': 64, 'epochs': 1, 'latent_dim': 32, 'validation_split': None, 'lr': 1e-2,
+                        'weight_decay': 1e-5, 'lowercase': True, 'verbose': False, 'grad_clipping': None,
+                        'random_state': None, 'weights': tuple(legacy_weights),
+                        'input_token_index_': seq2seq.input_token_index_,
+                        'target_token_index_': seq2seq.target_token_index_,
+                        'reverse_target_char_index_': seq2seq.reverse_target_char_index_,
+                        'max_encoder_seq_length_': seq2seq.max_encoder_seq_length_,
+                        'max_decoder_seq_length_': seq2seq.max_decoder_seq_length_}
+        another_seq2seq = Seq2SeqLSTM.__new__(Seq2SeqLSTM)
+        another_seq2seq.__setstate__(legacy_state)
+        self.assertEqual(another_seq2seq.get_params(), Seq2SeqLSTM(epochs=1, latent_dim=32, lr=1e-2,
+                                                                   validation_split=None).get_params())
+        self.assertEqual(predicted_texts, another_seq2seq.predict(input_texts_for_training[:20]))
+        self.assertEqual(predicted_texts, pickle.loads(pickle.dumps(another_seq2seq)).predict(
+            input_texts_for_training[:20]))
+
+    def test_load_weights_negative02(self):
+        """ The failed loading of weights does not leave references to pooled models, which are taken by others. """
+        input_texts_for_training, target_texts_for_training = self.load_text_pairs(self.data_set_name)
+        seq2seq = Seq2SeqLSTM(validation_split=None, epochs=1, latent_dim=32, lr=1e-2, embedding_size=16,
+                              random_state=42)
+        seq2seq.fit(input_texts_for_training, target_texts_for_training)
+        weights_as_bytes = seq2seq.dump_weights()
+        predicted_texts = seq2seq.predict(input_texts_for_training[:20])
+        weights, description = unpack_arrays(weights_as_bytes)
+        InferenceModelPool.clear()
+        seq2seq.load_weights(weights_as_bytes)
+        another_seq2seq = pickle.loads(pickle.dumps(seq2seq))
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        true_err_msg = re.escape('`weights_as_bytes` does not correspond to the neural model!')
+        for wrong_weights in [pack_arrays(weights[:-1], description), pack_arrays(weights + weights[-1:], description)]:
+            with checking_method(ValueError, true_err_msg):
+                seq2seq.load_weights(wrong_weights)
+            with checking_method(ValueError, true_err_msg):
+                another_seq2seq.load_weights(wrong_weights)
+        for cur in [seq2seq, another_seq2seq]:
+            self.assertFalse(hasattr(cur, 'encoder_model_'))
+            self.assertFalse(hasattr(cur, 'decoder_model_'))
+            with self.assertRaises(NotFittedError):
+                cur.predict(input_texts_for_training[:20])
+        seq2seq.load_weights(weights_as_bytes)
+        another_seq2seq.load_weights(weights_as_bytes)
+        self.assertIsNot(seq2seq.encoder_model_, another_seq2seq.encoder_model_)
+        self.assertIsNot(seq2seq.decoder_model_, another_seq2seq.decoder_model_)
+        self.assertEqual(predicted_texts, seq2seq.predict(input_texts_for_training[:20]))
+        self.assertEqual(predicted_texts, another_seq2seq.predict(input_texts_for_training[:20]))
+
     def test_tokenize_text_positive01(self):
         """ Tokenization with saving of the characters register. """
         src = 'a\t B  c Мама мыла \n\r раму 1\n'
@@ -688,6 +1510,495 @@ class TestTextPairSequence(unittest.TestCase):
             self.assertTrue(np.array_equal(predicted_batch[1], true_batches[batch_ind][1]),
                             msg=f'batch_ind={batch_ind}, decoder_target_data')
 
+    def test_generate_data_for_training_with_token_ids(self):
+        input_texts = [
+            'a b c',
+            'a c',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2 3',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        true_encoder_input_data = [
+            np.array([[3, 4, 5], [3, 5, 0]], dtype=np.int32),
+            np.array([[1, 2, 4], [4, 3, 0]], dtype=np.int32),
+            np.array([[4, 5, 0], [3, 4, 5]], dtype=np.int32)
+        ]
+        true_decoder_input_data = [
+            np.array([[1, 5, 6, 5, 3, 2], [1, 3, 4, 2, 0, 0]], dtype=np.int32),
+            np.array([[1, 5, 6, 5, 2, 0], [1, 6, 5, 2, 0, 0]], dtype=np.int32),
+            np.array([[1, 6, 4, 2, 0, 0], [1, 5, 6, 5, 3, 2]], dtype=np.int32)
+        ]
+        training_set_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False,
+            use_token_ids=True
+        )
+        one_hot_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False
+        )
+        self.assertTrue(training_set_generator.use_token_ids)
+        self.assertFalse(one_hot_generator.use_token_ids)
+        self.assertEqual(len(training_set_generator), 3)
+        for batch_ind in range(len(training_set_generator)):
+            predicted_batch = training_set_generator[batch_ind]
+            self.assertEqual(predicted_batch[0][0].dtype, np.int32, msg=f'batch_ind={batch_ind}')
+            self.assertEqual(predicted_batch[0][1].dtype, np.int32, msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[0][0], true_encoder_input_data[batch_ind]),
+                            msg=f'batch_ind={batch_ind}, encoder_input_data')
+            self.assertTrue(np.array_equal(predicted_batch[0][1], true_decoder_input_data[batch_ind]),
+                            msg=f'batch_ind={batch_ind}, decoder_input_data')
+            self.assertTrue(np.array_equal(predicted_batch[1], one_hot_generator[batch_ind][1]),
+                            msg=f'batch_ind={batch_ind}, decoder_target_data')
+
+    def test_generate_data_for_training_with_bucketing(self):
+        input_texts = [
+            'a b c',
+            'a',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        training_set_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False,
+            bucketing=True
+        )
+        self.assertTrue(training_set_generator.bucketing)
+        self.assertEqual(len(training_set_generator), 3)
+        self.assertEqual(training_set_generator.input_lengths.tolist(), [3, 1, 3, 2, 2])
+        self.assertEqual(training_set_generator.target_lengths.tolist(), [6, 3, 5, 4, 4])
+        for epoch in range(3):
+            text_pair_indices = []
+            for batch_ind in range(len(training_set_generator)):
+                predicted_batch = training_set_generator[batch_ind]
+                batch = training_set_generator.batches[batch_ind]
+                text_pair_indices += batch.tolist()
+                max_encoder_seq_length = max([len(input_texts[idx].split()) for idx in batch])
+                max_decoder_seq_length = max([len(target_texts[idx].split()) for idx in batch]) + 2
+                self.assertEqual(predicted_batch[0][0].shape, (len(batch), max_encoder_seq_length, 5),
+                                 msg=f'epoch={epoch}, batch_ind={batch_ind}')
+                self.assertEqual(predicted_batch[0][1].shape, (len(batch), max_decoder_seq_length, 6),
+                                 msg=f'epoch={epoch}, batch_ind={batch_ind}')
+                self.assertEqual(predicted_batch[1].shape, (len(batch), max_decoder_seq_length, 6),
+                                 msg=f'epoch={epoch}, batch_ind={batch_ind}')
+                for idx_in_batch, text_pair_idx in enumerate(batch):
+                    self.assertEqual(
+                        int(predicted_batch[0][0][idx_in_batch].sum()), len(input_texts[text_pair_idx].split()),
+                        msg=f'epoch={epoch}, batch_ind={batch_ind}'
+                    )
+            self.assertEqual(sorted(text_pair_indices), list(range(len(input_texts))), msg=f'epoch={epoch}')
+            training_set_generator.on_epoch_end()
+
+    def test_generate_data_for_training_with_encoded_texts(self):
+        input_texts = [
+            'a b c',
+            'a c',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2 3',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        encoded_generator = TextPairSequence(
+            input_texts=EncodedTexts.encode(input_texts, input_token_index, False),
+            target_texts=EncodedTexts.encode(target_texts, target_token_index, False), batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False
+        )
+        text_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False
+        )
+        self.assertEqual(len(encoded_generator), 3)
+        for batch_ind in range(len(encoded_generator)):
+            predicted_batch = encoded_generator[batch_ind]
+            true_batch = text_generator[batch_ind]
+            self.assertTrue(np.array_equal(predicted_batch[0][0], true_batch[0][0]), msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[0][1], true_batch[0][1]), msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[1], true_batch[1]), msg=f'batch_ind={batch_ind}')
+
+
+    def test_generate_data_for_training_as_dataset(self):
+        input_texts = [
+            'a b c',
+            'a c',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2 3',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        for use_token_ids in (False, True):
+            training_set_generator = TextPairSequence(
+                input_texts=input_texts, target_texts=target_texts, batch_size=2,
+                max_encoder_seq_length=3, max_decoder_seq_length=6,
+                input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False,
+                use_token_ids=use_token_ids
+            )
+            true_batches = [training_set_generator[batch_ind] for batch_ind in range(len(training_set_generator))]
+            for cache in (False, True):
+                dataset = training_set_generator.as_dataset(workers=2, cache=cache)
+                for epoch in range(2):
+                    n_batches = 0
+                    for (encoder_input_data, decoder_input_data), decoder_target_data in dataset:
+                        n_batches += 1
+                        self.assertTrue(
+                            any([np.array_equal(encoder_input_data.numpy(), true_batch[0][0]) and
+                                 np.array_equal(decoder_input_data.numpy(), true_batch[0][1]) and
+                                 np.array_equal(decoder_target_data.numpy(), true_batch[1])
+                                 for true_batch in true_batches]),
+                            msg=f'use_token_ids={use_token_ids}, cache={cache}, epoch={epoch}'
+                        )
+                    self.assertEqual(n_batches, len(true_batches),
+                                     msg=f'use_token_ids={use_token_ids}, cache={cache}, epoch={epoch}')
+
+
+    def test_generate_data_for_training_with_sparse_targets(self):
+        input_texts = [
+            'a b c',
+            'a c',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2 3',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        true_decoder_target_data = [
+            np.array([[4, 5, 4, 2, 1, -1], [2, 3, 1, -1, -1, -1]], dtype=np.int32),
+            np.array([[4, 5, 4, 1, -1, -1], [5, 4, 1, -1, -1, -1]], dtype=np.int32),
+            np.array([[5, 3, 1, -1, -1, -1], [4, 5, 4, 2, 1, -1]], dtype=np.int32)
+        ]
+        training_set_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False,
+            sparse_targets=True
+        )
+        one_hot_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False
+        )
+        self.assertTrue(training_set_generator.sparse_targets)
+        self.assertFalse(one_hot_generator.sparse_targets)
+        self.assertEqual(len(training_set_generator), 3)
+        for batch_ind in range(len(training_set_generator)):
+            predicted_batch = training_set_generator[batch_ind]
+            true_batch = one_hot_generator[batch_ind]
+            self.assertTrue(np.array_equal(predicted_batch[0][0], true_batch[0][0]), msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[0][1], true_batch[0][1]), msg=f'batch_ind={batch_ind}')
+            self.assertEqual(predicted_batch[1].dtype, np.int32, msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[1], true_decoder_target_data[batch_ind]),
+                            msg=f'batch_ind={batch_ind}')
+
+    def test_generate_data_for_training_with_targets_as_inputs(self):
+        input_texts = [
+            'a b c',
+            'a c',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2 3',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        training_set_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False,
+            use_token_ids=True, sparse_targets=True, targets_as_inputs=True
+        )
+        sparse_generator = TextPairSequence(
+            input_texts=input_texts, target_texts=target_texts, batch_size=2,
+            max_encoder_seq_length=3, max_decoder_seq_length=6,
+            input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False,
+            use_token_ids=True, sparse_targets=True
+        )
+        self.assertEqual(len(training_set_generator), 3)
+        for batch_ind in range(len(training_set_generator)):
+            predicted_batch = training_set_generator[batch_ind]
+            true_batch = sparse_generator[batch_ind]
+            self.assertIsInstance(predicted_batch, tuple, msg=f'batch_ind={batch_ind}')
+            self.assertEqual(len(predicted_batch), 1, msg=f'batch_ind={batch_ind}')
+            self.assertEqual(len(predicted_batch[0]), 3, msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[0][0], true_batch[0][0]), msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[0][1], true_batch[0][1]), msg=f'batch_ind={batch_ind}')
+            self.assertTrue(np.array_equal(predicted_batch[0][2], true_batch[1]), msg=f'batch_ind={batch_ind}')
+        dataset_batches = list(training_set_generator.as_dataset(workers=1))
+        self.assertEqual(len(dataset_batches), 3)
+        for cur_batch in dataset_batches:
+            self.assertEqual(len(cur_batch), 1)
+            self.assertEqual(len(cur_batch[0]), 3)
+
+    def test_pickle_with_shared_memory(self):
+        input_texts = [
+            'a b c',
+            'a c',
+            '0 1 b',
+            'b a',
+            'b c'
+        ]
+        target_texts = [
+            'а б а 2',
+            '2 3',
+            'а б а',
+            'б а',
+            'б 3'
+        ]
+        input_token_index = {'0': 0, '1': 1, 'a': 2, 'b': 3, 'c': 4}
+        target_token_index = {'\t': 0, '\n': 1, '2': 2, '3': 3, 'а': 4, 'б': 5}
+        shared_input_texts = EncodedTexts.encode(input_texts, input_token_index, False).share()
+        shared_target_texts = EncodedTexts.encode(target_texts, target_token_index, False).share()
+        try:
+            training_set_generator = TextPairSequence(
+                input_texts=shared_input_texts, target_texts=shared_target_texts, batch_size=2,
+                max_encoder_seq_length=3, max_decoder_seq_length=6,
+                input_token_index=input_token_index, target_token_index=target_token_index, lowercase=False
+            )
+            unpickled_generator = pickle.loads(pickle.dumps(training_set_generator))
+            self.assertIsNone(unpickled_generator.input_token_index)
+            self.assertIsNone(unpickled_generator.target_token_index)
+            self.assertEqual(unpickled_generator.encoded_input_texts.storage['kind'], 'shared_memory')
+            self.assertEqual(len(unpickled_generator), len(training_set_generator))
+            for batch_ind in range(len(training_set_generator)):
+                true_batch = training_set_generator[batch_ind]
+                predicted_batch = unpickled_generator[batch_ind]
+                self.assertTrue(np.array_equal(predicted_batch[0][0], true_batch[0][0]), msg=f'batch_ind={batch_ind}')
+                self.assertTrue(np.array_equal(predicted_batch[0][1], true_batch[0][1]), msg=f'batch_ind={batch_ind}')
+                self.assertTrue(np.array_equal(predicted_batch[1], true_batch[1]), msg=f'batch_ind={batch_ind}')
+            unpickled_generator.encoded_input_texts.release()
+            unpickled_generator.encoded_target_texts.release()
+        finally:
+            shared_input_texts.release()
+            shared_target_texts.release()
+
+
+class TestTextPairCorpus(unittest.TestCase):
+    def setUp(self):
+        self.corpus_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'seq2seq_lstm_corpus.bin')
+
+    def tearDown(self):
+        if os.path.isfile(self.corpus_name):
+            os.remove(self.corpus_name)
+
+    def test_save_load_positive01(self):
+        input_texts = ['a b c', 'a c', '0 1 b', 'B a', 'b c']
+        target_texts = ['а б а 2', '2 3', 'а б а', 'б а', 'б 3']
+        TextPairCorpus.create(input_texts, target_texts, lowercase=True).save(self.corpus_name)
+        corpus = TextPairCorpus.load(self.corpus_name)
+        self.assertIsInstance(corpus, TextPairCorpus)
+        self.assertEqual(len(corpus), 5)
+        self.assertTrue(corpus.lowercase)
+        self.assertEqual(corpus.input_vocabulary, ['0', '1', 'a', 'b', 'c'])
+        self.assertEqual(corpus.target_vocabulary, ['\t', '\n', '2', '3', 'а', 'б'])
+        self.assertEqual(corpus.max_input_length, 3)
+        self.assertEqual(corpus.max_target_length, 4)
+        self.assertIsInstance(corpus.input_texts.tokens, np.memmap)
+        self.assertIsInstance(corpus.target_texts.tokens, np.memmap)
+        self.assertEqual(corpus.input_texts.tokens.dtype, np.int32)
+        self.assertEqual([corpus.input_texts[idx].tolist() for idx in range(5)],
+                         [[2, 3, 4], [2, 4], [0, 1, 3], [3, 2], [3, 4]])
+        self.assertEqual([corpus.target_texts[idx].tolist() for idx in range(5)],
+                         [[4, 5, 4, 2], [2, 3], [4, 5, 4], [5, 4], [5, 3]])
+
+    def test_save_load_positive02(self):
+        input_texts = ['a b c', 'a c', '0 1 b', 'B a', 'b c']
+        target_texts = ['а б а 2', '2 3', 'а б а', 'б а', 'б 3']
+        TextPairCorpus.create(input_texts, target_texts, lowercase=False).subset(1, 4).save(self.corpus_name)
+        corpus = TextPairCorpus.load(self.corpus_name)
+        self.assertEqual(len(corpus), 3)
+        self.assertFalse(corpus.lowercase)
+        self.assertEqual(corpus.input_vocabulary, ['0', '1', 'B', 'a', 'b', 'c'])
+        self.assertEqual(corpus.input_texts.offsets.tolist(), [0, 2, 5, 7])
+        self.assertEqual([corpus.input_texts[idx].tolist() for idx in range(3)], [[3, 5], [0, 1, 4], [2, 3]])
+
+    def test_pickle_positive01(self):
+        input_texts = ['a b c', 'a c', '0 1 b', 'B a', 'b c']
+        target_texts = ['а б а 2', '2 3', 'а б а', 'б а', 'б 3']
+        TextPairCorpus.create(input_texts, target_texts, lowercase=True).save(self.corpus_name)
+        input_texts = TextPairCorpus.load(self.corpus_name).subset(2, 5).input_texts
+        data = pickle.dumps(input_texts)
+        self.assertLess(len(data), 1000)
+        unpickled_texts = pickle.loads(data)
+        self.assertIsInstance(unpickled_texts.tokens, np.memmap)
+        self.assertEqual(len(unpickled_texts), 3)
+        self.assertEqual([unpickled_texts[idx].tolist() for idx in range(3)], [[0, 1, 3], [3, 2], [3, 4]])
+
+    def test_load_negative01(self):
+        with open(self.corpus_name, 'wb') as fp:
+            fp.write(b'0123456789abcdef')
+        true_err_msg = re.escape(f'The file "{self.corpus_name}" is not a corpus file!')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            TextPairCorpus.load(self.corpus_name)
+
+
+class TestTextPairStream(unittest.TestCase):
+    def test_read_chunks_positive01(self):
+        text_pairs = [('a b', 'а'), ('b', 'б б'), ('c', 'в'), ('a c', 'а в'), ('b c', 'б в')]
+        stream = TextPairStream(text_pairs)
+        self.assertEqual(list(stream), text_pairs)
+        self.assertEqual(list(stream.read_chunks(1, 5, 3)),
+                         [(['b', 'c', 'a c'], ['б б', 'в', 'а в']), (['b c'], ['б в'])])
+        self.assertEqual(list(stream.read_chunks(0, 2, 3)), [(['a b', 'b'], ['а', 'б б'])])
+
+    def test_scan_positive01(self):
+        input_token_index = dict()
+        target_token_index = dict()
+        stream = TextPairStream([('a B', 'а'), ('b', 'б б в')])
+        self.assertEqual(stream.scan(input_token_index, target_token_index, True), (2, 2, 3))
+        self.assertEqual(input_token_index, {'a': 0, 'b': 1})
+        self.assertEqual(target_token_index, {'а': 0, 'б': 1, 'в': 2})
+
+    def test_scan_positive02(self):
+        target_token_counts = dict()
+        input_token_counts = dict()
+        stream = TextPairStream([('a B', 'а'), ('b', 'б б в')])
+        self.assertEqual(stream.scan(dict(), dict(), True, input_token_counts=input_token_counts,
+                                     target_token_counts=target_token_counts), (2, 2, 3))
+        self.assertEqual(input_token_counts, {'a': 1, 'b': 2})
+        self.assertEqual(target_token_counts, {'а': 1, 'б': 2, 'в': 1})
+
+    def test_calculate_number_of_batches_positive01(self):
+        self.assertEqual(TextPairStream.calculate_number_of_batches(100, 10), 10)
+        self.assertEqual(TextPairStream.calculate_number_of_batches(101, 10), 11)
+        chunk_size = 10 * TextPairStream.BATCHES_PER_CHUNK
+        self.assertEqual(TextPairStream.calculate_number_of_batches(2 * chunk_size + 5, 10),
+                         2 * TextPairStream.BATCHES_PER_CHUNK + 1)
+
+    def test_creation_negative01(self):
+        true_err_msg = re.escape(f'`{type(1)}` is wrong type for `text_pairs`.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            TextPairStream(1)
+
+
+class TestEncodedTexts(unittest.TestCase):
+    def test_encode_positive01(self):
+        texts = ['a b c', 'B a', 'c']
+        token_index = dict()
+        encoded_texts = EncodedTexts.encode(texts, token_index, lowercase=True, update_index=True)
+        self.assertEqual(token_index, {'a': 0, 'b': 1, 'c': 2})
+        self.assertIsInstance(encoded_texts.tokens, np.ndarray)
+        self.assertEqual(encoded_texts.tokens.dtype, np.int32)
+        self.assertEqual(encoded_texts.tokens.tolist(), [0, 1, 2, 1, 0, 2])
+        self.assertEqual(encoded_texts.offsets.tolist(), [0, 3, 5, 6])
+        self.assertEqual(len(encoded_texts), 3)
+        self.assertEqual(encoded_texts[1].tolist(), [1, 0])
+        self.assertEqual(encoded_texts.get_lengths().tolist(), [3, 2, 1])
+
+    def test_encode_positive02(self):
+        texts = ['a b c', 'B a', 'd']
+        token_index = {'a': 0, 'c': 1}
+        encoded_texts = EncodedTexts.encode(texts, token_index, lowercase=False)
+        self.assertEqual(token_index, {'a': 0, 'c': 1})
+        self.assertEqual(encoded_texts.tokens.tolist(), [0, 1, 0])
+        self.assertEqual(encoded_texts.get_lengths().tolist(), [2, 1, 0])
+
+    def test_encode_positive03(self):
+        texts = ['a b c', 'B a', 'd']
+        token_index = {'<unk>': 0, 'a': 1, 'c': 2}
+        encoded_texts = EncodedTexts.encode(texts, token_index, lowercase=False)
+        self.assertEqual(token_index, {'<unk>': 0, 'a': 1, 'c': 2})
+        self.assertEqual(encoded_texts.tokens.tolist(), [1, 0, 2, 0, 1, 0])
+        self.assertEqual(encoded_texts.get_lengths().tolist(), [3, 2, 1])
+
+    def test_share_positive01(self):
+        encoded_texts = EncodedTexts.encode(['a b c', 'b a', 'c', 'a c'], {'a': 0, 'b': 1, 'c': 2}, lowercase=False)
+        shared_texts = encoded_texts.subset(1, 4).share()
+        try:
+            self.assertEqual(shared_texts.tokens.tolist(), [1, 0, 2, 0, 2])
+            self.assertEqual(shared_texts.offsets.tolist(), [0, 2, 3, 5])
+            unpickled_texts = pickle.loads(pickle.dumps(shared_texts.subset(1, 3)))
+            self.assertIsNotNone(unpickled_texts.shared_memory)
+            self.assertEqual([unpickled_texts[idx].tolist() for idx in range(len(unpickled_texts))], [[2], [0, 2]])
+            unpickled_texts.release()
+            self.assertIsNone(unpickled_texts.tokens)
+        finally:
+            shared_texts.release()
+        self.assertIsNone(shared_texts.shared_memory)
+
+    def test_remap_positive01(self):
+        old_token_index = {'c': 0, 'a': 1, 'b': 2}
+        new_token_index = {'a': 0, 'b': 1, 'c': 2}
+        encoded_texts = EncodedTexts.encode(['c a', 'b'], old_token_index, lowercase=False)
+        remapped_texts = encoded_texts.remap(EncodedTexts.get_index_mapping(old_token_index, new_token_index))
+        self.assertEqual(remapped_texts.tokens.dtype, np.int32)
+        self.assertEqual(remapped_texts.tokens.tolist(), [2, 0, 1])
+        self.assertEqual(remapped_texts.offsets.tolist(), [0, 2, 3])
+
+    def test_remap_positive02(self):
+        old_token_index = {'c': 0, 'a': 1, 'b': 2}
+        new_token_index = {'<unk>': 0, 'a': 1}
+        encoded_texts = EncodedTexts.encode(['c a', 'b', 'a a'], old_token_index, lowercase=False)
+        index_mapping = EncodedTexts.get_index_mapping(old_token_index, new_token_index, 0)
+        self.assertEqual(index_mapping.tolist(), [0, 1, 0])
+        remapped_texts = encoded_texts.subset(1, 3).remap(index_mapping)
+        self.assertEqual(remapped_texts.tokens.tolist(), [0, 1, 1])
+        self.assertEqual(remapped_texts.offsets.tolist(), [0, 1, 3])
+
+    def test_count_tokens_positive01(self):
+        encoded_texts = EncodedTexts.encode(['a b c', 'b a', 'c', 'a c'], {'a': 0, 'b': 1, 'c': 2, 'd': 3},
+                                            lowercase=False)
+        self.assertEqual(encoded_texts.count_tokens(4).tolist(), [3, 2, 3, 0])
+        self.assertEqual(encoded_texts.subset(1, 3).count_tokens(4).tolist(), [1, 1, 1, 0])
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
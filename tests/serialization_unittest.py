@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import unittest
+
+import numpy as np
+
+try:
+    from seq2seq_lstm.serialization import pack_arrays, unpack_arrays, save_arrays, map_arrays, calculate_padded_size, \
+        ALIGNMENT
+except:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from seq2seq_lstm.serialization import pack_arrays, unpack_arrays, save_arrays, map_arrays, calculate_padded_size, \
+        ALIGNMENT
+
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.file_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'packed_arrays.bin')
+
+    def tearDown(self):
+        if os.path.isfile(self.file_name):
+            os.remove(self.file_name)
+
+    def test_pack_unpack_positive01(self):
+        arrays = [
+            np.random.uniform(-1.0, 1.0, size=(3, 5)).astype(np.float32),
+            np.arange(7, dtype=np.int64),
+            np.zeros((0, 4), dtype=np.float32),
+            np.random.uniform(-1.0, 1.0, size=(4, 3)).astype(np.float64).T
+        ]
+        buffer = pack_arrays(arrays, {'n_encoder_weights': 2})
+        self.assertIsInstance(buffer, bytes)
+        unpacked_arrays, description = unpack_arrays(buffer)
+        self.assertEqual(description, {'n_encoder_weights': 2})
+        self.assertEqual(len(unpacked_arrays), len(arrays))
+        for array_idx in range(len(arrays)):
+            self.assertEqual(unpacked_arrays[array_idx].dtype, arrays[array_idx].dtype, msg=f'array_idx={array_idx}')
+            self.assertEqual(unpacked_arrays[array_idx].shape, arrays[array_idx].shape, msg=f'array_idx={array_idx}')
+            self.assertTrue(np.array_equal(unpacked_arrays[array_idx], arrays[array_idx]), msg=f'array_idx={array_idx}')
+            self.assertFalse(unpacked_arrays[array_idx].flags.writeable, msg=f'array_idx={array_idx}')
+
+    def test_pack_unpack_positive02(self):
+        buffer = pack_arrays([])
+        unpacked_arrays, description = unpack_arrays(bytearray(buffer))
+        self.assertEqual(unpacked_arrays, [])
+        self.assertEqual(description, dict())
+
+    def test_save_map_positive01(self):
+        arrays = [
+            np.random.uniform(-1.0, 1.0, size=(3, 5)).astype(np.float32),
+            np.arange(7, dtype=np.int64),
+            np.random.uniform(-1.0, 1.0, size=(4, 3)).astype(np.float64).T
+        ]
+        save_arrays(self.file_name, arrays, {'vocabulary': ['a', 'б']})
+        with open(self.file_name, 'rb') as fp:
+            self.assertEqual(fp.read(), pack_arrays(arrays, {'vocabulary': ['a', 'б']}))
+        mapped_arrays, description = map_arrays(self.file_name)
+        self.assertEqual(description, {'vocabulary': ['a', 'б']})
+        self.assertEqual(len(mapped_arrays), len(arrays))
+        for array_idx in range(len(arrays)):
+            self.assertTrue(np.array_equal(mapped_arrays[array_idx], arrays[array_idx]), msg=f'array_idx={array_idx}')
+            self.assertFalse(mapped_arrays[array_idx].flags.writeable, msg=f'array_idx={array_idx}')
+            self.assertEqual(mapped_arrays[array_idx].ctypes.data % ALIGNMENT, 0, msg=f'array_idx={array_idx}')
+        del mapped_arrays
+
+    def test_calculate_padded_size_positive01(self):
+        self.assertEqual(calculate_padded_size(0), 0)
+        self.assertEqual(calculate_padded_size(1), ALIGNMENT)
+        self.assertEqual(calculate_padded_size(ALIGNMENT), ALIGNMENT)
+        self.assertEqual(calculate_padded_size(ALIGNMENT + 1), 2 * ALIGNMENT)
+
+    def test_unpack_negative01(self):
+        true_err_msg = re.escape('The buffer does not contain packed arrays! Its signature is wrong.')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            unpack_arrays(b'\x89HDF\r\n\x1a\n' + b'\0' * 64)
+
+    def test_unpack_negative02(self):
+        buffer = pack_arrays([np.ones((10, 10), dtype=np.float32)])
+        true_err_msg = re.escape('The buffer with packed arrays is truncated!')
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(ValueError, true_err_msg):
+            unpack_arrays(buffer[:-100])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
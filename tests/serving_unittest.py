@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import codecs
+import json
+import os
+import re
+import sys
+import time
+import unittest
+
+try:
+    from seq2seq_lstm import Seq2SeqLSTM
+    from seq2seq_lstm.serving import MicroBatcher, create_http_server
+except:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from seq2seq_lstm import Seq2SeqLSTM
+    from seq2seq_lstm.serving import MicroBatcher, create_http_server
+
+
+class TestMicroBatcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data_set_name = os.path.join(os.path.dirname(__file__), '..', 'data', 'eng_rus_for_testing.txt')
+        input_texts, target_texts = cls.load_text_pairs(data_set_name)
+        cls.input_texts = input_texts[:8]
+        cls.seq2seq = Seq2SeqLSTM(validation_split=None, epochs=2, latent_dim=32, lr=1e-2, embedding_size=16,
+                                  random_state=42)
+        cls.seq2seq.fit(input_texts, target_texts)
+
+    def test_predict_positive01(self):
+        """ All concurrent requests are predicted in one batch. """
+        async def run():
+            async with MicroBatcher(self.seq2seq, max_batch_size=len(self.input_texts), max_latency_ms=50.0) as batcher:
+                predicted_texts = await asyncio.gather(*[batcher.predict(cur) for cur in self.input_texts])
+                return list(predicted_texts), batcher.get_metrics()
+
+        predicted_texts, metrics = asyncio.run(run())
+        self.assertEqual(predicted_texts, self.seq2seq.predict(self.input_texts))
+        self.assertEqual(metrics['requests'], len(self.input_texts))
+        self.assertEqual(metrics['batches'], 1)
+        self.assertEqual(metrics['max_batch_size'], len(self.input_texts))
+        self.assertEqual(metrics['max_queue_depth'], len(self.input_texts))
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    def test_predict_positive02(self):
+        """ Concurrent requests are split into batches, whose size does not exceed the maximal batch size. """
+        async def run():
+            async with MicroBatcher(self.seq2seq, max_batch_size=3, max_latency_ms=50.0) as batcher:
+                predicted_texts = await asyncio.gather(*[batcher.predict(cur) for cur in self.input_texts])
+                return list(predicted_texts), batcher.get_metrics()
+
+        predicted_texts, metrics = asyncio.run(run())
+        true_texts = []
+        for batch_start in range(0, len(self.input_texts), 3):
+            true_texts += self.seq2seq.predict(self.input_texts[batch_start:(batch_start + 3)])
+        self.assertEqual(predicted_texts, true_texts)
+        self.assertEqual(metrics['batches'], 3)
+        self.assertEqual(metrics['max_batch_size'], 3)
+        self.assertAlmostEqual(metrics['mean_batch_size'], len(self.input_texts) / 3.0)
+
+    def test_predict_positive03(self):
+        """ The single request is predicted after the maximal latency. """
+        async def run():
+            async with MicroBatcher(self.seq2seq, max_batch_size=32, max_latency_ms=20.0) as batcher:
+                predicted_text = await batcher.predict(self.input_texts[0])
+                return predicted_text, batcher.get_metrics()
+
+        predicted_text, metrics = asyncio.run(run())
+        self.assertEqual(predicted_text, self.seq2seq.predict(self.input_texts[0:1])[0])
+        self.assertEqual(metrics['batches'], 1)
+        self.assertGreaterEqual(metrics['max_waiting_time_ms'], 20.0)
+
+    def test_predict_negative01(self):
+        async def run():
+            batcher = MicroBatcher(self.seq2seq)
+            try:
+                await batcher.predict(self.input_texts[0])
+            finally:
+                await batcher.stop()
+
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        with checking_method(RuntimeError, re.escape('The batcher is not started!')):
+            asyncio.run(run())
+
+    def test_predict_negative02(self):
+        """ The request, whose batch is being predicted, is cancelled by the stopping of the batcher. """
+        class SlowModel(object):
+            def predict(self, X):
+                time.sleep(0.5)
+                return list(X)
+
+        async def run():
+            batcher = MicroBatcher(SlowModel(), max_batch_size=1, max_latency_ms=0.0)
+            await batcher.start()
+            request = asyncio.ensure_future(batcher.predict(self.input_texts[0]))
+            await asyncio.sleep(0.1)
+            await batcher.stop()
+            return await asyncio.wait_for(request, 1.0)
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(run())
+
+    def test_predict_negative03(self):
+        """ The event loop is not blocked while the batcher waits for the end of the current prediction. """
+        class SlowModel(object):
+            def predict(self, X):
+                time.sleep(0.5)
+                return list(X)
+
+        async def tick(moments):
+            while True:
+                moments.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        async def run():
+            batcher = MicroBatcher(SlowModel(), max_batch_size=1, max_latency_ms=0.0)
+            await batcher.start()
+            request = asyncio.ensure_future(batcher.predict(self.input_texts[0]))
+            await asyncio.sleep(0.1)
+            moments = []
+            ticker = asyncio.ensure_future(tick(moments))
+            started = time.monotonic()
+            await batcher.stop()
+            finished = time.monotonic()
+            ticker.cancel()
+            request.cancel()
+            return started, finished, moments
+
+        started, finished, moments = asyncio.run(run())
+        self.assertGreater(finished - started, 0.2)
+        self.assertGreater(len([it for it in moments if it < finished]), 5)
+
+    def test_creation_negative01(self):
+        try:
+            checking_method = self.assertRaisesRegex
+        except:
+            checking_method = self.assertRaisesRegexp
+        true_err_msg = re.escape('`max_batch_size` is wrong! Expected a positive integer value, but 0 is not '
+                                 'positive.')
+        with checking_method(ValueError, true_err_msg):
+            _ = MicroBatcher(self.seq2seq, max_batch_size=0)
+        true_err_msg = re.escape('`max_latency_ms` is wrong! Expected a non-negative value, but -1.0 is negative.')
+        with checking_method(ValueError, true_err_msg):
+            _ = MicroBatcher(self.seq2seq, max_latency_ms=-1.0)
+        true_err_msg = re.escape('`model` is wrong! It has not the `predict` method.')
+        with checking_method(ValueError, true_err_msg):
+            _ = MicroBatcher('model')
+
+    def test_http_server_positive01(self):
+        async def send_request(port, method, path, data=None):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            body = b'' if data is None else json.dumps(data).encode('utf-8')
+            writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode(
+                'latin-1') + body)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            status_line, _, response_body = response.partition(b'\r\n')
+            return int(status_line.split()[1]), json.loads(response_body.partition(b'\r\n\r\n')[2].decode('utf-8'))
+
+        async def run():
+            async with MicroBatcher(self.seq2seq, max_batch_size=32, max_latency_ms=5.0) as batcher:
+                server = await create_http_server(batcher, port=0)
+                port = server.sockets[0].getsockname()[1]
+                async with server:
+                    return [
+                        await send_request(port, 'POST', '/predict', {'text': self.input_texts[0]}),
+                        await send_request(port, 'POST', '/predict', {'texts': self.input_texts}),
+                        await send_request(port, 'POST', '/predict', {'text': 3}),
+                        await send_request(port, 'GET', '/unknown'),
+                        await send_request(port, 'GET', '/metrics')
+                    ]
+
+        responses = asyncio.run(run())
+        self.assertEqual(responses[0], (200, {'prediction': self.seq2seq.predict(self.input_texts[0:1])[0]}))
+        self.assertEqual(responses[1], (200, {'predictions': self.seq2seq.predict(self.input_texts)}))
+        self.assertEqual(responses[2][0], 400)
+        self.assertEqual(responses[3][0], 404)
+        self.assertEqual(responses[4][0], 200)
+        self.assertEqual(responses[4][1]['requests'], len(self.input_texts) + 1)
+        self.assertEqual(responses[4][1]['batches'], 2)
+
+    @staticmethod
+    def load_text_pairs(file_name):
+        input_texts = list()
+        target_texts = list()
+        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            for cur_line in fp:
+                line_parts = cur_line.strip().split('\t')
+                if len(line_parts) == 2:
+                    input_texts.append(TestMicroBatcher.tokenize_text(line_parts[0]))
+                    target_texts.append(TestMicroBatcher.tokenize_text(line_parts[1]))
+        return input_texts, target_texts
+
+    @staticmethod
+    def tokenize_text(src):
+        tokens = list()
+        for cur in src.split():
+            tokens += list(cur)
+            tokens.append('<space>')
+        return ' '.join(tokens[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)